@@ -2,6 +2,7 @@
 
 set -o pipefail
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 CONFIG_DIR="$HOME/.config/FastTubeDownloader"
 CONFIG_FILE="$CONFIG_DIR/config.json"
 
@@ -99,147 +100,12 @@ if [ $# -ge 1 ]; then
     PY_ENV_ARIA_CONN="$ARIA_CONNECTIONS" \
     PY_ENV_ARIA_SPLITS="$ARIA_SPLITS" \
     PY_ENV_FRAG_CONC="$FRAGMENT_CONCURRENCY" \
+    PY_ENV_PROGRESS_HZ="${PY_ENV_PROGRESS_HZ:-4}" \
         PY_ENV_BASE_DIR="$(pwd)" \
-        python3 - "$URL" <<'PY'
-import os, sys
-try:
-        import yt_dlp
-except Exception as e:
-        print(f"ERROR: yt-dlp not installed: {e}", file=sys.stderr)
-        sys.exit(1)
-import shutil
-
-def coerce(val, default):
-        try:
-                iv = int(val); return iv if iv > 0 else default
-        except Exception: return default
-
-outtmpl = os.environ.get('PY_ENV_OUTTMPL','%(title)s.%(ext)s')
-fmt = os.environ.get('PY_ENV_FORMAT','Best (default)')
-quality = os.environ.get('PY_ENV_QUALITY','')
-subs_flag = os.environ.get('PY_ENV_SUBS','n').lower()
-speed_arg = os.environ.get('PY_ENV_SPEED_ARG','')
-aria_conn = str(coerce(os.environ.get('PY_ENV_ARIA_CONN','32'),32))
-aria_splits = str(coerce(os.environ.get('PY_ENV_ARIA_SPLITS','32'),32))
-frag_conc = coerce(os.environ.get('PY_ENV_FRAG_CONC','16'),16)
-base_dir = os.environ.get('PY_ENV_BASE_DIR', os.getcwd())
-
-external_args = None
-# Only configure aria2c if present, else let yt-dlp use its internal downloader
-if shutil.which('aria2c'):
-        external_args = ['-x', aria_conn, '-s', aria_splits, '-k','1M','--min-split-size=1M','--file-allocation=none']
-        if speed_arg:
-                external_args.append(speed_arg)
-
-ydl_opts = {
-        'outtmpl': outtmpl,
-        # Configure external downloader only if available
-        **({'external_downloader': 'aria2c', 'external_downloader_args': external_args} if external_args else {}),
-        'continuedl': True,
-        'ignoreerrors': True,
-        'yesplaylist': True,
-        'concurrent_fragment_downloads': frag_conc,
-}
-
-if subs_flag in ('y','yes','true','1'):
-        ydl_opts['writesubtitles'] = True
-        ydl_opts['subtitleslangs'] = ['en']
-        pp = ydl_opts.get('postprocessors', [])
-        pp.append({'key':'FFmpegSubtitlesConvertor','format':'srt'})
-        ydl_opts['postprocessors'] = pp
-
-fmt_clean = fmt.strip()
-fmt_lower = fmt_clean.lower()
-qual_digits = ''.join(ch for ch in quality if ch.isdigit())
-if fmt_clean == 'Best Video + Audio':
-        ydl_opts['format'] = 'bestvideo+bestaudio'
-        ydl_opts['merge_output_format'] = 'mp4'
-elif fmt_clean == 'Audio Only':
-        ydl_opts['format'] = 'bestaudio/best'
-        pp = ydl_opts.get('postprocessors', [])
-        pp.append({'key':'FFmpegExtractAudio','preferredcodec':'mp3'})
-        ydl_opts['postprocessors'] = pp
-elif fmt_clean and fmt_clean != 'Best (default)':
-        ydl_opts['format'] = fmt_clean
-elif qual_digits and 'audio' not in fmt_lower:
-        ydl_opts['format'] = f'best[height<={qual_digits}]'
-
-def hook(d):
-        st = d.get('status')
-        if st == 'downloading':
-                pct = d.get('_percent_str','0%')
-                title = d.get('title') or (d.get('info_dict') or {}).get('title') or 'Unknown'
-                print(f'PROGRESS: {pct}')
-                print(f'TITLE: {title}')
-                sp = d.get('_speed_str') or ''
-                eta = d.get('_eta_str') or ''
-                total = d.get('_total_bytes_str') or d.get('_total_bytes_estimate_str') or ''
-                down = d.get('_downloaded_bytes_str') or ''
-                meta=[]
-                if sp: meta.append(f'speed={sp}')
-                if eta: meta.append(f'eta={eta}')
-                if down: meta.append(f'downloaded={down}')
-                if total: meta.append(f'total={total}')
-                if meta: print('META: ' + ' '.join(meta))
-                sys.stdout.flush()
-        elif st == 'finished':
-                fn = d.get('filename') or (d.get('info_dict') or {}).get('_filename') or ''
-                if fn and not os.path.isabs(fn): fn = os.path.join(base_dir, fn)
-                if fn:
-                        print(f'FILE: {fn}')
-                        sys.stdout.flush()
-
-ydl_opts['progress_hooks'] = [hook]
-
-# Graceful format fallback logic: retry with safer formats if the requested one isn't available
-import copy
-try:
-        url = sys.argv[1]
-        candidates = []
-        base_fmt = ydl_opts.get('format')
-        if base_fmt:
-                candidates.append(base_fmt)
-        # Build sensible fallbacks
-        if fmt_clean == 'Audio Only':
-                candidates += ['bestaudio/best', 'best']
-        elif fmt_clean == 'Best Video + Audio' or qual_digits:
-                candidates += ['bestvideo+bestaudio/best', 'best']
-        else:
-                candidates += ['bestvideo+bestaudio/best', 'best']
-        # de-duplicate while preserving order
-        seen = set(); fmt_chain = []
-        for f in candidates:
-                if f and f not in seen:
-                        seen.add(f); fmt_chain.append(f)
-
-        last_err = None
-        success = False
-        for f in fmt_chain:
-                try_opts = copy.deepcopy(ydl_opts)
-                try_opts['format'] = f
-                # Only enforce mp4 merge when asking explicit bestvideo+bestaudio
-                if 'bestvideo+bestaudio' in f:
-                        try_opts['merge_output_format'] = 'mp4'
-                else:
-                        try_opts.pop('merge_output_format', None)
-                print(f'RETRY: format={f}')
-                with yt_dlp.YoutubeDL(try_opts) as ydl:
-                        ret = ydl.download([url])
-                        if ret == 0:
-                                success = True
-                                last_err = None
-                                break
-                        else:
-                                last_err = RuntimeError(f'yt-dlp exited with code {ret}')
-                                continue
-        if last_err or not success:
-                raise last_err
-except Exception as e:
-        print(f'ERROR: {e}', file=sys.stderr)
-        sys.exit(1)
-PY
+        python3 "$SCRIPT_DIR/gui/ytdl_worker.py" --once "$URL"
     status=$?
-        if [ $status -ne 0 ]; then
+        # 3 = extraction failed in Python; format/download failures would fail the CLI too
+        if [ $status -eq 3 ]; then
                 # Last-resort fallback via yt-dlp CLI (no custom PROGRESS/TITLE markers, but UI can parse standard output)
                 echo "[FastTube] Python path failed; attempting CLI fallback..."
                 # If aria2c isn't available, don't instruct yt-dlp to use it
@@ -0,0 +1,343 @@
+"""
+Control server for the browser bridge and local scripts.
+
+Newline-delimited JSON on 127.0.0.1:47653. One asyncio loop on its own
+thread serves every connection, replacing a listen(5) socket with a
+thread per connection, and the accept backlog is large enough for bursty
+enqueues ("download all links on page").
+
+Two kinds of clients share the port:
+    - A request without "requestId" gets one response line, then the
+      connection is closed (the original protocol; plain URL lines are
+      treated as {"action": "enqueue", "url": ...}).
+    - Requests carrying a "requestId" get it echoed on their response and
+      the connection stays open. Several requests may be in flight at once;
+      responses arrive in completion order.
+
+A persistent client can send {"action": "subscribe", "items": [ids] | "*"}
+and then receives {"event": ...} lines pushed with publish(). Pushes are
+coalesced per item and kind, so a client that reads slowly gets the latest
+state instead of a growing backlog. Responses are written with drain() and
+each connection has a cap on requests in flight, so a client that stops
+reading only stalls itself.
+
+Handlers are plain functions run on a thread pool (some actions hit the
+network): they take the request dict and return the response dict.
+
+batch_entries() validates and normalizes the "enqueue_batch" action:
+    {"action": "enqueue_batch", "format": "Audio Only",
+     "entries": ["https://...", {"url": "https://...", "quality": "720", "priority": 5}]}
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from .queue_journal import is_terminal
+except ImportError:
+    from queue_journal import is_terminal
+
+HOST = '127.0.0.1'
+PORT = 47653
+BACKLOG = 128
+# Longest request line accepted (batch enqueues carry many URLs)
+MAX_LINE = 4 * 1024 * 1024
+# Requests one connection may have in flight before its reads pause
+MAX_INFLIGHT = 32
+# Entries accepted in one enqueue_batch request
+MAX_BATCH = 1000
+# Extension fileType values that mean "not a media page"
+GENERIC_FILE_TYPES = ('document', 'archive', 'program', 'image', 'other', 'unknown')
+# Per-entry options; the same names at request level apply to every entry
+BATCH_OPTIONS = ('format', 'formatId', 'quality', 'subs', 'title', 'folder', 'category',
+                 'fileType', 'priority')
+
+
+def parse_request(line: str) -> Dict:
+    """A request line as a dict; anything that isn't JSON is a URL to enqueue."""
+    try:
+        req = json.loads(line)
+    except ValueError:
+        return {'action': 'enqueue', 'url': line}
+    return req if isinstance(req, dict) else {}
+
+
+def _flag(val) -> bool:
+    if isinstance(val, str):
+        return val.lower().startswith('y') or val.lower() == 'true'
+    return bool(val)
+
+
+def batch_entries(req: Dict, defaults: Dict) -> List[Dict]:
+    """
+    Normalized entries of an enqueue_batch request.
+
+    Args:
+        req: The request; "entries" (or "urls") lists URL strings or option dicts
+        defaults: 'format', 'quality' and 'subs' for options nobody set
+
+    Returns one dict per entry with url, format, quality, subs (bool),
+    title, folder, category, priority and generic (bool); entries without
+    a usable URL come back as {'error': message}. Raises ValueError if the
+    batch itself is malformed.
+    """
+    entries = req.get('entries', req.get('urls'))
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("entries must be a non-empty list")
+    if len(entries) > MAX_BATCH:
+        raise ValueError(f"at most {MAX_BATCH} entries per batch")
+    shared = {k: req[k] for k in BATCH_OPTIONS if req.get(k) is not None}
+    out = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {'url': entry}
+        url = entry.get('url') if isinstance(entry, dict) else None
+        if not isinstance(url, str) or not url.strip():
+            out.append({'error': "No URL"})
+            continue
+        opts = dict(shared)
+        opts.update({k: entry[k] for k in BATCH_OPTIONS if entry.get(k) is not None})
+        prio = opts.get('priority')
+        if prio is not None and prio not in ('top', 'bottom') and not isinstance(prio, int):
+            out.append({'url': url.strip(), 'error': "priority must be an integer, 'top' or 'bottom'"})
+            continue
+        fmt_id = opts.get('formatId')
+        fmt = fmt_id or opts.get('format') or defaults.get('format')
+        generic = (fmt == 'Generic File' or (not fmt_id and opts.get('fileType') in GENERIC_FILE_TYPES
+                                             and fmt not in ("Best Video + Audio", "Audio Only")))
+        out.append({
+            'url': url.strip(),
+            'format': 'Generic File' if generic else fmt,
+            'quality': "" if fmt_id else str(opts.get('quality') or defaults.get('quality') or ""),
+            'subs': _flag(opts['subs'] if 'subs' in opts else defaults.get('subs')),
+            'title': opts.get('title'),
+            'folder': opts.get('folder'),
+            'category': opts.get('category'),
+            'priority': prio,
+            'generic': generic,
+        })
+    return out
+
+
+def terminal_event(status: str, **fields) -> Optional[Dict]:
+    """Push payload for a finished item status; None while the item is still live.
+
+    "Completed" becomes status "finished"; "Failed" and every "Error: ..." become
+    status "error" with the message.
+    """
+    if not is_terminal(status):
+        return None
+    if status == 'Completed':
+        return dict(fields, status='finished')
+    message = status.split(':', 1)[1].strip() if ':' in status else status
+    return dict(fields, status='error', message=message or status)
+
+
+def _encode(obj: Dict) -> bytes:
+    return (json.dumps(obj) + '\n').encode('utf-8')
+
+
+class _Connection:
+    """One client: serialized writes plus its coalesced push backlog"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.write_lock = asyncio.Lock()
+        self.inflight = asyncio.Semaphore(MAX_INFLIGHT)
+        self.topics: Set[str] = set()
+        # (topic, kind) -> latest event; dicts keep first-pending order
+        self.pushes: Dict[Tuple[str, str], Dict] = {}
+        self.push_ready = asyncio.Event()
+
+    def wants(self, topic: str) -> bool:
+        return '*' in self.topics or topic in self.topics
+
+    def push(self, key: Tuple[str, str], obj: Dict) -> None:
+        self.pushes[key] = obj
+        self.push_ready.set()
+
+    async def send(self, obj: Dict) -> None:
+        async with self.write_lock:
+            self.writer.write(_encode(obj))
+            await self.writer.drain()
+
+    async def pump(self) -> None:
+        """Write pending pushes, as fast as the client reads them."""
+        while True:
+            await self.push_ready.wait()
+            self.push_ready.clear()
+            while self.pushes:
+                key = next(iter(self.pushes))
+                await self.send(self.pushes.pop(key))
+
+
+class ControlServer:
+    """asyncio JSON-lines server running on a background thread"""
+
+    def __init__(self, handler: Callable[[Dict], Dict], host: str = HOST, port: int = PORT,
+                 backlog: int = BACKLOG, workers: int = 16):
+        """
+        Args:
+            handler: Called on a pool thread with each request; returns the response
+            host: Address to bind
+            port: Port to bind (0 picks a free one, see .port after start())
+            backlog: Pending connections the kernel may queue
+            workers: Handler threads
+        """
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.error: Optional[Exception] = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='control')
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._conns: Set[_Connection] = set()
+        self._subscribers = 0
+        self._ready = threading.Event()
+
+    def start(self) -> bool:
+        """Bind and start serving; False if the port could not be bound."""
+        threading.Thread(target=self._run, name='control-server', daemon=True).start()
+        self._ready.wait()
+        return self._server is not None
+
+    def stop(self) -> None:
+        loop = self._loop
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop)
+
+    def publish(self, topic, obj: Dict, kind: str = 'status') -> None:
+        """Push obj to connections subscribed to topic (an item id). Any thread.
+
+        Only the latest event per (topic, kind) waits for a slow client.
+        """
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(self._fanout, str(topic), kind, obj)
+        except RuntimeError:
+            pass  # loop closed during shutdown
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(asyncio.start_server(
+                self._client, self.host, self.port, backlog=self.backlog,
+                limit=MAX_LINE, reuse_address=True))
+        except OSError as e:
+            print(f"Control server bind failed: {e}")
+            self.error = e
+            self._ready.set()
+            loop.close()
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._loop = loop
+        print(f"Control server listening on {self.host}:{self.port}")
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._loop = None
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+            self._pool.shutdown(wait=False)
+
+    async def _shutdown(self) -> None:
+        self._server.close()
+        conns = list(self._conns)
+        for conn in conns:
+            conn.writer.close()
+        # Let the transports actually close so clients see EOF
+        if conns:
+            await asyncio.wait([asyncio.ensure_future(c.writer.wait_closed()) for c in conns], timeout=1.0)
+        asyncio.get_running_loop().stop()
+
+    def _fanout(self, topic: str, kind: str, obj: Dict) -> None:
+        for conn in self._conns:
+            if conn.wants(topic):
+                conn.push((topic, kind), obj)
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        conn = _Connection(writer)
+        self._conns.add(conn)
+        pump = asyncio.ensure_future(conn.pump())
+        tasks: Set[asyncio.Future] = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError) as e:
+                    # ValueError: line longer than MAX_LINE
+                    await self._reply(conn, {}, {"status": "error", "message": str(e)})
+                    break
+                if not line:
+                    break
+                text = line.decode('utf-8', errors='ignore').strip()
+                if not text:
+                    continue
+                req = parse_request(text)
+                if req.get('requestId') is None:
+                    # Original protocol: one response, then close
+                    await self._serve(conn, req)
+                    break
+                await conn.inflight.acquire()
+                task = asyncio.ensure_future(self._serve(conn, req))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: conn.inflight.release())
+            if tasks:
+                # Answer what was already sent, even after the client half-closes
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            pump.cancel()
+            self._conns.discard(conn)
+            if conn.topics:
+                self._subscribers -= 1
+            writer.close()
+
+    async def _serve(self, conn: _Connection, req: Dict) -> None:
+        action = req.get('action')
+        if action in ('subscribe', 'unsubscribe'):
+            resp = self._subscribe(conn, req, action == 'subscribe')
+        else:
+            try:
+                resp = await asyncio.get_running_loop().run_in_executor(self._pool, self.handler, req)
+            except Exception as e:
+                resp = {"status": "error", "message": str(e)}
+        if not isinstance(resp, dict):
+            resp = {"status": "error", "message": "Invalid request"}
+        await self._reply(conn, req, resp)
+
+    async def _reply(self, conn: _Connection, req: Dict, resp: Dict) -> None:
+        if req.get('requestId') is not None:
+            resp = dict(resp, requestId=req['requestId'])
+        try:
+            await conn.send(resp)
+        except (ConnectionError, OSError):
+            pass  # client went away; the read loop sees EOF
+
+    def _subscribe(self, conn: _Connection, req: Dict, on: bool) -> Dict:
+        items = req.get('items', '*')
+        topics = {'*'} if items == '*' else {str(i) for i in (items or [])}
+        had = bool(conn.topics)
+        if on:
+            conn.topics |= topics
+        elif items == '*':
+            conn.topics.clear()
+        else:
+            conn.topics -= topics
+        self._subscribers += bool(conn.topics) - had
+        return {"status": "subscribed" if on else "unsubscribed", "items": sorted(conn.topics)}
+
+
+__all__ = ["ControlServer", "parse_request", "batch_entries", "terminal_event", "HOST", "PORT", "BACKLOG", "MAX_BATCH"]
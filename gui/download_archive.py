@@ -0,0 +1,114 @@
+"""
+Download archive of completed video IDs.
+
+Uses yt-dlp's --download-archive format (one "<extractor> <id>" line per
+video, extractor lower-cased) so the same file can be shared with yt-dlp.
+Playlist/channel sync uses it to queue only entries not downloaded yet.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import urllib.parse
+from typing import Optional, Set, Tuple
+
+_YT_ID = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+
+def archive_key(url: str) -> Optional[Tuple[str, str]]:
+    """(extractor, video id) for URLs whose ID can be read without extraction."""
+    try:
+        p = urllib.parse.urlparse(url)
+    except ValueError:
+        return None
+    host = (p.netloc or '').lower().split(':')[0]
+    if host.startswith('www.') or host.startswith('m.'):
+        host = host.split('.', 1)[1]
+    vid = None
+    if host == 'youtu.be':
+        vid = p.path.strip('/').split('/')[0]
+    elif host in ('youtube.com', 'music.youtube.com', 'youtube-nocookie.com'):
+        qs = urllib.parse.parse_qs(p.query or '')
+        if qs.get('v'):
+            vid = qs['v'][0]
+        else:
+            parts = p.path.strip('/').split('/')
+            if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live', 'v'):
+                vid = parts[1]
+    if vid and _YT_ID.match(vid):
+        return ('youtube', vid)
+    return None
+
+
+class DownloadArchive:
+    """Set of completed video IDs persisted as an append-only text file"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Archive file location (yt-dlp --download-archive format)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._ids: Optional[Set[str]] = None
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return self._entry(*key) in self._load()
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def contains(self, extractor: str, video_id: str) -> bool:
+        return self._entry(extractor, video_id) in self._load()
+
+    def add(self, extractor: str, video_id: str) -> bool:
+        """Record a completed video. Returns False if it was already archived."""
+        entry = self._entry(extractor, video_id)
+        with self._lock:
+            ids = self._load_locked()
+            if entry in ids:
+                return False
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as fh:
+                    fh.write(entry + '\n')
+            except OSError as e:
+                print(f"[archive] write failed: {e}")
+                return False
+            ids.add(entry)
+            return True
+
+    def add_url(self, url: str) -> bool:
+        key = archive_key(url)
+        return self.add(*key) if key else False
+
+    def reload(self) -> None:
+        """Drop the in-memory index so external changes (e.g. yt-dlp runs) are seen."""
+        with self._lock:
+            self._ids = None
+
+    @staticmethod
+    def _entry(extractor: str, video_id: str) -> str:
+        return f"{(extractor or '').lower()} {video_id}"
+
+    def _load(self) -> Set[str]:
+        with self._lock:
+            return self._load_locked()
+
+    def _load_locked(self) -> Set[str]:
+        if self._ids is None:
+            ids = set()
+            try:
+                with open(self.path, 'r', encoding='utf-8') as fh:
+                    for line in fh:
+                        line = line.strip()
+                        if line:
+                            ids.add(line)
+            except OSError:
+                pass
+            self._ids = ids
+        return self._ids
+
+
+__all__ = ["DownloadArchive", "archive_key"]
@@ -0,0 +1,382 @@
+"""
+Priority-ordered download queue for FastTubeDownloader.
+
+Keeps the display order used by the queue view alongside one binary heap
+per host ordered by (priority, enqueue order), so picking the next item to
+download costs O(hosts + log n) no matter how long the queue is, and hosts
+or extractors that are at their concurrency cap can be skipped cheaply.
+Items are also indexed by id and URL, and per-status counts are maintained
+incrementally so the UI never has to scan the queue.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import urllib.parse
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Statuses the spooler is allowed to (re)start
+READY_STATES = ("Queued", "Paused")
+DEFAULT_PRIORITY = 0
+
+# Hosts that belong to the same extractor / origin pool
+_EXTRACTOR_HOSTS = {
+    'youtube': ('youtube.com', 'youtu.be', 'youtube-nocookie.com', 'googlevideo.com'),
+    'vimeo': ('vimeo.com', 'vimeocdn.com'),
+    'dailymotion': ('dailymotion.com', 'dai.ly'),
+    'twitch': ('twitch.tv',),
+    'soundcloud': ('soundcloud.com',),
+}
+
+
+def host_key(url: str) -> str:
+    """Normalized host name used for per-host concurrency accounting."""
+    try:
+        host = (urllib.parse.urlparse(url).hostname or '').lower()
+    except Exception:
+        host = ''
+    for prefix in ('www.', 'm.', 'music.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return host or 'unknown'
+
+
+def extractor_key(url: str, kind: str = 'media') -> str:
+    """Extractor name for an URL ('youtube', 'vimeo', ..., 'generic')."""
+    host = host_key(url)
+    for name, domains in _EXTRACTOR_HOSTS.items():
+        for dom in domains:
+            if host == dom or host.endswith('.' + dom):
+                return name
+    if kind == 'generic':
+        return 'generic'
+    return host
+
+
+class DownloadQueue:
+    """List-like queue of DownloadItem objects with priority dispatch.
+
+    All status changes must go through set_status() so the per-status
+    counters stay exact.
+
+    Higher priority values are dispatched first; items with equal priority
+    are dispatched in enqueue order. Heap entries are invalidated lazily:
+    each push stamps the item with a fresh token and stale entries are
+    discarded when they reach the top of the heap.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._items: List = []
+        self._by_id: Dict[str, object] = {}
+        self._by_url: Dict[str, List] = {}
+        self._counts: Dict[str, int] = {}
+        self._heaps: Dict[str, List] = {}
+        self._seq = itertools.count(1)
+        self._top_seq = itertools.count(-1, -1)
+        self._tokens = itertools.count(1)
+        self._max_priority = DEFAULT_PRIORITY
+        self._min_priority = DEFAULT_PRIORITY
+        self._playlist_priority: Dict[str, int] = {}
+        self._by_playlist: Dict[str, set] = {}
+        self._running: set = set()
+        self._running_hosts: Dict[str, int] = {}
+        self._running_extractors: Dict[str, int] = {}
+        self._per_host_limit = 0
+        self._limits: Dict[str, int] = {}
+
+    # -- list-like access (display order) ---------------------------------
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator:
+        with self._lock:
+            return iter(list(self._items))
+
+    def __getitem__(self, idx):
+        return self._items[idx]
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def __contains__(self, item) -> bool:
+        return self._by_id.get(getattr(item, 'id', None)) is item
+
+    def index(self, item) -> int:
+        return self._items.index(item)
+
+    def get(self, item_id: str):
+        """Item with the given id, or None."""
+        return self._by_id.get(item_id)
+
+    def find_url(self, url: str):
+        """Oldest queued item with the given URL, or None."""
+        items = self._by_url.get(url)
+        return items[0] if items else None
+
+    def count(self, status: str) -> int:
+        return self._counts.get(status, 0)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def append(self, item) -> None:
+        with self._lock:
+            item.queue_seq = next(self._seq)
+            if not getattr(item, 'host', None):
+                item.host = host_key(item.url)
+            if not getattr(item, 'extractor', None):
+                item.extractor = extractor_key(item.url, getattr(item, 'kind', 'media'))
+            key = self.playlist_key(item)
+            if key:
+                self._by_playlist.setdefault(key, set()).add(item)
+                if key in self._playlist_priority:
+                    item.priority = self._playlist_priority[key]
+            self._note_priority(item.priority)
+            self._items.append(item)
+            self._by_id[item.id] = item
+            self._by_url.setdefault(item.url, []).append(item)
+            self._count(item.status, 1)
+            if item.status in READY_STATES:
+                self._push(item)
+
+    def remove(self, item) -> None:
+        with self._lock:
+            if item not in self:
+                return
+            self._items.remove(item)
+            del self._by_id[item.id]
+            same_url = self._by_url.get(item.url, [])
+            if item in same_url:
+                same_url.remove(item)
+            if not same_url:
+                self._by_url.pop(item.url, None)
+            self._count(item.status, -1)
+            item.heap_token = None
+            self._stop_running(item)
+            key = self.playlist_key(item)
+            if key and key in self._by_playlist:
+                self._by_playlist[key].discard(item)
+                if not self._by_playlist[key]:
+                    del self._by_playlist[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            for item in self._items:
+                item.heap_token = None
+            self._items.clear()
+            self._by_id.clear()
+            self._by_url.clear()
+            self._counts.clear()
+            self._heaps.clear()
+            self._by_playlist.clear()
+            self._running.clear()
+            self._running_hosts.clear()
+            self._running_extractors.clear()
+
+    # -- status / dispatch ------------------------------------------------
+
+    def set_status(self, item, status: str) -> None:
+        """Set item.status and keep the ready heap in sync."""
+        with self._lock:
+            listed = item in self
+            if listed:
+                self._count(item.status, -1)
+                self._count(status, 1)
+            item.status = status
+            if status in READY_STATES:
+                if item.heap_token is None and listed:
+                    self._push(item)
+            else:
+                item.heap_token = None
+
+    def pop_next(self):
+        """Pop the highest-priority ready item whose host and extractor have a free slot.
+
+        Returns None when nothing is ready or every ready item is capped.
+        """
+        with self._lock:
+            best = None
+            for host in list(self._heaps):
+                heap = self._heaps[host]
+                self._discard_stale(heap)
+                if not heap:
+                    del self._heaps[host]
+                    continue
+                if not self._has_slot(heap[0][3]):
+                    continue
+                if best is None or heap[0] < best[0]:
+                    best = heap
+            if best is None:
+                return None
+            item = heapq.heappop(best)[3]
+            item.heap_token = None
+            return item
+
+    def requeue(self, item) -> None:
+        """Put a popped item back without changing its position."""
+        with self._lock:
+            if item.status in READY_STATES and item.heap_token is None:
+                self._push(item)
+
+    def has_ready(self) -> bool:
+        with self._lock:
+            for heap in self._heaps.values():
+                self._discard_stale(heap)
+                if heap:
+                    return True
+            return False
+
+    def mark_running(self, item) -> None:
+        with self._lock:
+            if item in self._running:
+                return
+            self._running.add(item)
+            self._running_hosts[item.host] = self._running_hosts.get(item.host, 0) + 1
+            self._running_extractors[item.extractor] = self._running_extractors.get(item.extractor, 0) + 1
+
+    def prune_running(self, is_active: Callable[[object], bool]) -> int:
+        """Drop items that are no longer active and return the active count."""
+        with self._lock:
+            for item in [it for it in self._running if not is_active(it)]:
+                self._stop_running(item)
+            return len(self._running)
+
+    def set_limits(self, per_host: int = 0, limits: Optional[Dict[str, int]] = None) -> None:
+        """Configure concurrency caps.
+
+        Args:
+            per_host: Default cap for every host (0 = only the global cap applies)
+            limits: Explicit caps keyed by host name or extractor name
+        """
+        with self._lock:
+            try:
+                self._per_host_limit = max(0, int(per_host or 0))
+            except (TypeError, ValueError):
+                self._per_host_limit = 0
+            clean: Dict[str, int] = {}
+            for key, val in (limits or {}).items():
+                try:
+                    clean[str(key).lower()] = max(0, int(val))
+                except (TypeError, ValueError):
+                    continue
+            self._limits = clean
+
+    def active_count(self, host: Optional[str] = None, extractor: Optional[str] = None) -> int:
+        with self._lock:
+            if host is not None:
+                return self._running_hosts.get(host, 0)
+            if extractor is not None:
+                return self._running_extractors.get(extractor, 0)
+            return len(self._running)
+
+    def running(self) -> List:
+        with self._lock:
+            return list(self._running)
+
+    # -- priorities -------------------------------------------------------
+
+    def set_priority(self, item, priority: int) -> None:
+        with self._lock:
+            item.priority = int(priority)
+            self._note_priority(item.priority)
+            self._repush(item)
+
+    def move_to_top(self, item) -> None:
+        """Dispatch item before everything currently queued."""
+        with self._lock:
+            item.priority = max(self._max_priority, item.priority)
+            item.queue_seq = next(self._top_seq)
+            self._move_display(item, 0)
+            self._repush(item)
+
+    def move_to_bottom(self, item) -> None:
+        """Dispatch item after everything currently queued."""
+        with self._lock:
+            item.priority = min(self._min_priority, item.priority)
+            item.queue_seq = next(self._seq)
+            self._move_display(item, None)
+            self._repush(item)
+
+    def set_playlist_priority(self, key: str, priority: int) -> int:
+        """Set the priority of every item in a playlist, including ones added later.
+
+        Returns:
+            Number of queued items that were updated
+        """
+        with self._lock:
+            self._playlist_priority[key] = int(priority)
+            members = list(self._by_playlist.get(key, ()))
+            for item in members:
+                self.set_priority(item, priority)
+            return len(members)
+
+    @staticmethod
+    def playlist_key(item) -> Optional[str]:
+        return getattr(item, 'playlist_id', None) or getattr(item, 'playlist_name', None)
+
+    # -- internals --------------------------------------------------------
+
+    def _count(self, status: str, delta: int) -> None:
+        left = self._counts.get(status, 0) + delta
+        if left > 0:
+            self._counts[status] = left
+        else:
+            self._counts.pop(status, None)
+
+    def _note_priority(self, priority: int) -> None:
+        if priority > self._max_priority:
+            self._max_priority = priority
+        if priority < self._min_priority:
+            self._min_priority = priority
+
+    def _push(self, item) -> None:
+        token = next(self._tokens)
+        item.heap_token = token
+        heap = self._heaps.setdefault(item.host, [])
+        heapq.heappush(heap, (-item.priority, item.queue_seq, token, item))
+
+    def _repush(self, item) -> None:
+        if item.heap_token is not None:
+            self._push(item)
+
+    @staticmethod
+    def _discard_stale(heap: List) -> None:
+        while heap and heap[0][3].heap_token != heap[0][2]:
+            heapq.heappop(heap)
+
+    def _has_slot(self, item) -> bool:
+        host_cap = self._limits.get(item.host, self._per_host_limit)
+        if host_cap and self._running_hosts.get(item.host, 0) >= host_cap:
+            return False
+        ext_cap = self._limits.get(item.extractor, 0)
+        if ext_cap and self._running_extractors.get(item.extractor, 0) >= ext_cap:
+            return False
+        return True
+
+    def _stop_running(self, item) -> None:
+        if item not in self._running:
+            return
+        self._running.discard(item)
+        for counts, key in ((self._running_hosts, item.host), (self._running_extractors, item.extractor)):
+            left = counts.get(key, 0) - 1
+            if left > 0:
+                counts[key] = left
+            else:
+                counts.pop(key, None)
+
+    def _move_display(self, item, position) -> None:
+        if item not in self:
+            return
+        self._items.remove(item)
+        if position is None:
+            self._items.append(item)
+        else:
+            self._items.insert(position, item)
+
+
+__all__ = ["DownloadQueue", "READY_STATES", "DEFAULT_PRIORITY", "host_key", "extractor_key"]
@@ -0,0 +1,369 @@
+"""
+Download history in SQLite.
+
+history.json used to be rewritten in full after every finished download.
+Here each completion is one INSERT into a WAL-mode database (crash-safe,
+O(1) per record) with indexes on time, status, URL and path so counts and
+lookups don't scan the whole history. An existing history.json is imported
+once on first open and then renamed to history.json.migrated.
+
+The History tab reads it a page at a time through page(). Title/URL search
+uses an FTS5 index kept in sync by triggers when SQLite has FTS5, and
+falls back to LIKE otherwise.
+
+Per-day totals (completions, failures, bytes, transfer time) for each
+host and backend live in daily_stats. An insert trigger keeps that table
+current, so dashboard counts and throughput trends are read from a few
+summary rows instead of scanning history. compact() drops detail rows
+past a retention age while their totals stay in daily_stats.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from typing import Dict, Iterator, List, Optional
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id     INTEGER PRIMARY KEY,
+    ts     REAL NOT NULL,
+    title  TEXT NOT NULL DEFAULT '',
+    url    TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    path   TEXT NOT NULL DEFAULT '',
+    host   TEXT NOT NULL DEFAULT '',
+    bytes    INTEGER NOT NULL DEFAULT 0,
+    duration REAL NOT NULL DEFAULT 0,
+    backend  TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS history_ts ON history(ts);
+CREATE INDEX IF NOT EXISTS history_status ON history(status, ts);
+CREATE INDEX IF NOT EXISTS history_url ON history(url);
+CREATE INDEX IF NOT EXISTS history_path ON history(path);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    title, url, content='history', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS history_fts_ai AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+END;
+CREATE TRIGGER IF NOT EXISTS history_fts_ad AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts(history_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+END;
+"""
+
+# Columns added after the first release of history.db
+_LATE_COLUMNS = {
+    'bytes': "INTEGER NOT NULL DEFAULT 0",
+    'duration': "REAL NOT NULL DEFAULT 0",
+    'backend': "TEXT NOT NULL DEFAULT ''",
+}
+
+# Throughput only counts rows that report both bytes and a duration
+_STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_stats (
+    day         TEXT NOT NULL,
+    host        TEXT NOT NULL,
+    backend     TEXT NOT NULL,
+    completed   INTEGER NOT NULL DEFAULT 0,
+    failed      INTEGER NOT NULL DEFAULT 0,
+    bytes       INTEGER NOT NULL DEFAULT 0,
+    timed_bytes INTEGER NOT NULL DEFAULT 0,
+    seconds     REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, host, backend)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS history_stats_ai AFTER INSERT ON history BEGIN
+    INSERT INTO daily_stats (day, host, backend, completed, failed, bytes, timed_bytes, seconds)
+    VALUES (date(new.ts, 'unixepoch', 'localtime'), new.host, new.backend,
+            new.status = 'Completed', new.status != 'Completed', new.bytes,
+            CASE WHEN new.duration > 0 AND new.bytes > 0 THEN new.bytes ELSE 0 END,
+            CASE WHEN new.duration > 0 AND new.bytes > 0 THEN new.duration ELSE 0 END)
+    ON CONFLICT (day, host, backend) DO UPDATE SET
+        completed = completed + excluded.completed,
+        failed = failed + excluded.failed,
+        bytes = bytes + excluded.bytes,
+        timed_bytes = timed_bytes + excluded.timed_bytes,
+        seconds = seconds + excluded.seconds;
+END;
+"""
+
+_STATS_BACKFILL = """
+INSERT INTO daily_stats (day, host, backend, completed, failed, bytes, timed_bytes, seconds)
+SELECT date(ts, 'unixepoch', 'localtime'), host, backend,
+       SUM(status = 'Completed'), SUM(status != 'Completed'), SUM(bytes),
+       SUM(CASE WHEN duration > 0 AND bytes > 0 THEN bytes ELSE 0 END),
+       SUM(CASE WHEN duration > 0 AND bytes > 0 THEN duration ELSE 0 END)
+FROM history GROUP BY 1, 2, 3
+"""
+
+_WORD = re.compile(r"\w+")
+
+
+def _host(url: str) -> str:
+    try:
+        return (urllib.parse.urlparse(url).hostname or '').lower()
+    except ValueError:
+        return ''
+
+
+def _parse_time(val) -> float:
+    if isinstance(val, (int, float)):
+        return float(val)
+    try:
+        return time.mktime(time.strptime(str(val), TIME_FORMAT))
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def _terms(query: str) -> List[str]:
+    return _WORD.findall(query or '')
+
+
+def format_time(ts: float) -> str:
+    return time.strftime(TIME_FORMAT, time.localtime(ts))
+
+
+def _summary(row) -> Dict:
+    rec = dict(row)
+    for key in ('completed', 'failed', 'bytes', 'timed_bytes'):
+        rec[key] = int(rec.get(key) or 0)
+    rec['seconds'] = float(rec.get('seconds') or 0)
+    rec['throughput'] = rec['timed_bytes'] / rec['seconds'] if rec['seconds'] > 0 else 0.0
+    return rec
+
+
+class HistoryStore:
+    """Append-mostly history table shared by all threads"""
+
+    def __init__(self, path: str, legacy_json: Optional[str] = None):
+        """
+        Args:
+            path: SQLite database file
+            legacy_json: history.json to import on first open (renamed afterwards)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self._add_late_columns()
+        self._init_stats()
+        self.fts = self._init_fts()
+        if legacy_json:
+            self.migrate_json(legacy_json)
+
+    def add(self, title: str, url: str, status: str, path: str = '', ts: Optional[float] = None,
+            size: int = 0, duration: float = 0.0, backend: str = '') -> Dict:
+        """
+        Record one finished download; returns the stored record.
+
+        Args:
+            size: Bytes transferred
+            duration: Seconds spent transferring them (0 if unknown)
+            backend: Downloader that ran it, e.g. 'yt-dlp', 'aria2c'
+        """
+        rec = {'ts': time.time() if ts is None else ts, 'title': title or 'Unknown', 'url': url or '',
+               'status': status or '', 'path': path or '', 'host': _host(url or ''),
+               'bytes': int(size or 0), 'duration': float(duration or 0), 'backend': backend or ''}
+        with self._lock:
+            cur = self._db.execute(
+                'INSERT INTO history (ts, title, url, status, path, host, bytes, duration, backend) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (rec['ts'], rec['title'], rec['url'], rec['status'], rec['path'], rec['host'],
+                 rec['bytes'], rec['duration'], rec['backend']))
+        rec['id'] = cur.lastrowid
+        rec['time'] = format_time(rec['ts'])
+        return rec
+
+    def count(self, status: Optional[str] = None) -> int:
+        with self._lock:
+            if status is None:
+                row = self._db.execute('SELECT COUNT(*) FROM history').fetchone()
+            else:
+                row = self._db.execute('SELECT COUNT(*) FROM history WHERE status = ?', (status,)).fetchone()
+        return row[0]
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def rows(self) -> Iterator[Dict]:
+        """All records, oldest first."""
+        with self._lock:
+            fetched = self._db.execute('SELECT * FROM history ORDER BY ts, id').fetchall()
+        for row in fetched:
+            yield self._record(row)
+
+    def page(self, offset: int = 0, limit: int = 200, query: str = '', status: Optional[str] = None,
+             since: Optional[float] = None, until: Optional[float] = None) -> List[Dict]:
+        """
+        One page of records, newest first.
+
+        Args:
+            offset: Rows to skip
+            limit: Page size
+            query: Words that must all appear in the title or URL (prefix match)
+            status: Exact status, e.g. 'Completed'
+            since: Earliest timestamp (inclusive)
+            until: Latest timestamp (exclusive)
+        """
+        where, args = [], []
+        terms = _terms(query)
+        if terms and self.fts:
+            where.append('id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)')
+            args.append(' '.join('"%s"*' % t for t in terms))
+        elif terms:
+            for t in terms:
+                like = '%' + t.replace('_', '\\_') + '%'
+                where.append("(title LIKE ? ESCAPE '\\' OR url LIKE ? ESCAPE '\\')")
+                args += [like, like]
+        if status:
+            where.append('status = ?')
+            args.append(status)
+        if since is not None:
+            where.append('ts >= ?')
+            args.append(since)
+        if until is not None:
+            where.append('ts < ?')
+            args.append(until)
+        sql = 'SELECT * FROM history'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?'
+        with self._lock:
+            fetched = self._db.execute(sql, args + [int(limit), int(offset)]).fetchall()
+        return [self._record(r) for r in fetched]
+
+    def totals(self) -> Dict:
+        """All-time completed/failed/bytes/throughput, from the daily summaries."""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT SUM(completed) AS completed, SUM(failed) AS failed, SUM(bytes) AS bytes, '
+                'SUM(timed_bytes) AS timed_bytes, SUM(seconds) AS seconds FROM daily_stats').fetchone()
+        return _summary(row)
+
+    def daily(self, since: Optional[str] = None, host: Optional[str] = None,
+              backend: Optional[str] = None) -> List[Dict]:
+        """
+        Per-day, per-host, per-backend summaries, newest day first.
+
+        Args:
+            since: First day to include, 'YYYY-MM-DD'
+            host: Only this host
+            backend: Only this backend
+        """
+        where, args = [], []
+        for col, val in (('day >= ?', since), ('host = ?', host), ('backend = ?', backend)):
+            if val is not None:
+                where.append(col)
+                args.append(val)
+        sql = 'SELECT * FROM daily_stats'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY day DESC, host, backend'
+        with self._lock:
+            fetched = self._db.execute(sql, args).fetchall()
+        return [_summary(r) for r in fetched]
+
+    def compact(self, keep_days: int, now: Optional[float] = None) -> int:
+        """Delete detail rows older than keep_days; their totals stay in daily_stats. Returns rows removed."""
+        if keep_days <= 0:
+            return 0
+        cutoff = (time.time() if now is None else now) - keep_days * 86400
+        with self._lock:
+            cur = self._db.execute('DELETE FROM history WHERE ts < ?', (cutoff,))
+        return cur.rowcount
+
+    def find_url(self, url: str) -> List[Dict]:
+        with self._lock:
+            fetched = self._db.execute('SELECT * FROM history WHERE url = ? ORDER BY ts', (url,)).fetchall()
+        return [self._record(r) for r in fetched]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.execute('DELETE FROM history')
+                self._db.execute('DELETE FROM daily_stats')
+                self._db.execute('COMMIT')
+            except sqlite3.Error:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def migrate_json(self, json_path: str) -> int:
+        """Import a legacy history.json in one transaction. Returns the rows imported."""
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, 'r', encoding='utf-8') as fh:
+                records = json.load(fh) or []
+        except (OSError, ValueError) as e:
+            print(f"[history] cannot read {json_path}: {e}")
+            return 0
+        rows = [(_parse_time(r.get('time')), r.get('title') or 'Unknown', r.get('url') or '',
+                 r.get('status') or '', r.get('path') or '', _host(r.get('url') or ''))
+                for r in records if isinstance(r, dict)]
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany(
+                    'INSERT INTO history (ts, title, url, status, path, host) VALUES (?, ?, ?, ?, ?, ?)', rows)
+                self._db.execute('COMMIT')
+            except sqlite3.Error:
+                self._db.execute('ROLLBACK')
+                raise
+        try:
+            os.replace(json_path, json_path + '.migrated')
+        except OSError:
+            pass
+        return len(rows)
+
+    def _add_late_columns(self) -> None:
+        have = {r['name'] for r in self._db.execute('PRAGMA table_info(history)')}
+        for name, decl in _LATE_COLUMNS.items():
+            if name not in have:
+                self._db.execute(f'ALTER TABLE history ADD COLUMN {name} {decl}')
+
+    def _init_stats(self) -> None:
+        """Create daily_stats; summarize the rows already present on first creation."""
+        fresh = not self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'daily_stats'").fetchone()
+        self._db.executescript(_STATS_SCHEMA)
+        if fresh:
+            self._db.execute(_STATS_BACKFILL)
+
+    def _init_fts(self) -> bool:
+        """Create the FTS5 index if this SQLite has it; populate it on first creation."""
+        try:
+            fresh = not self._db.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'history_fts'").fetchone()
+            self._db.executescript(_FTS_SCHEMA)
+            if fresh:
+                self._db.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict:
+        rec = dict(row)
+        rec['time'] = format_time(rec['ts'])
+        return rec
+
+
+__all__ = ["HistoryStore", "format_time"]
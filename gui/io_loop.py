@@ -0,0 +1,184 @@
+"""
+Single reader loop for child-process pipes.
+
+Every download child (fast_ytdl.sh, aria2c, pool workers and their event
+pipes) used to get its own thread doing blocking text-mode readline. The
+IoLoop runs one selector thread instead: fds are switched to non-blocking,
+read in binary, and split into lines on both "\\n" and "\\r" (aria2c and
+yt-dlp redraw progress with bare carriage returns). Only complete lines
+are decoded, one chunk at a time.
+
+Handlers run on the loop thread and must not block.
+"""
+from __future__ import annotations
+
+import os
+import re
+import selectors
+import threading
+from typing import Callable, List, Optional, Tuple
+
+_NEWLINES = re.compile(r"[\r\n]+")
+
+
+class LineSplitter:
+    """Turns raw reads into stripped, non-empty text lines"""
+
+    def __init__(self):
+        self._buf = b""
+
+    def feed(self, data: bytes) -> List[str]:
+        buf = self._buf + data
+        cut = max(buf.rfind(b"\n"), buf.rfind(b"\r"))
+        if cut < 0:
+            self._buf = buf
+            return []
+        self._buf = buf[cut + 1:]
+        return self._split(buf[:cut])
+
+    def flush(self) -> List[str]:
+        """Whatever is left after end of file."""
+        rest, self._buf = self._buf, b""
+        return self._split(rest)
+
+    @staticmethod
+    def _split(chunk: bytes) -> List[str]:
+        text = chunk.decode("utf-8", errors="replace")
+        return [l.strip() for l in _NEWLINES.split(text) if l.strip()]
+
+
+_Handler = Tuple[LineSplitter, Callable[[List[str]], None], Optional[Callable[[], None]]]
+
+
+class IoLoop:
+    """One thread multiplexing line-oriented reads from many pipes"""
+
+    def __init__(self, name: str = "io-loop"):
+        self.name = name
+        self._sel = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._ops: List[Tuple[str, int, Optional[_Handler]]] = []
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def add(self, fd: int, on_lines: Callable[[List[str]], None],
+            on_eof: Optional[Callable[[], None]] = None) -> None:
+        """Watch fd; on_lines gets each batch of complete lines, on_eof runs once at EOF."""
+        os.set_blocking(fd, False)
+        self._submit(("add", fd, (LineSplitter(), on_lines, on_eof)))
+
+    def remove(self, fd: int) -> None:
+        """Stop watching fd (call before closing it)."""
+        self._submit(("remove", fd, None))
+
+    def drain(self, fd: int) -> None:
+        """Deliver everything fd has buffered right now. Loop thread only."""
+        key = self._sel.get_map().get(fd)
+        if key is None or key.data is None:
+            return
+        while self._read(fd, key.data):
+            pass
+
+    def stop(self) -> None:
+        with self._lock:
+            self._closed = True
+        self._wake()
+
+    def _submit(self, op) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._ops.append(op)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"x")
+        except (BlockingIOError, OSError):
+            pass  # already pending (or shutting down)
+
+    def _apply_ops(self) -> None:
+        with self._lock:
+            ops, self._ops = self._ops, []
+        for op, fd, handler in ops:
+            registered = fd in self._sel.get_map()
+            if registered:
+                self._sel.unregister(fd)
+            if op == "add":
+                try:
+                    self._sel.register(fd, selectors.EVENT_READ, handler)
+                except (OSError, ValueError) as e:
+                    print(f"[io] cannot watch fd {fd}: {e}")
+
+    def _run(self) -> None:
+        while True:
+            self._apply_ops()
+            with self._lock:
+                if self._closed:
+                    break
+            for key, _ in self._sel.select():
+                if key.data is None:
+                    try:
+                        while os.read(self._wake_r, 4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                if key.fd in self._sel.get_map():
+                    self._read(key.fd, key.data)
+        self._sel.close()
+
+    def _read(self, fd: int, handler: _Handler) -> bool:
+        """One read from fd. Returns True if more data may be waiting."""
+        splitter, on_lines, on_eof = handler
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return False
+        except OSError:
+            data = b""
+        if data:
+            lines = splitter.feed(data)
+            if lines:
+                self._call(on_lines, lines)
+            return True
+        try:
+            self._sel.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+        rest = splitter.flush()
+        if rest:
+            self._call(on_lines, rest)
+        if on_eof is not None:
+            self._call(on_eof)
+        return False
+
+    @staticmethod
+    def _call(fn, *args) -> None:
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"[io] handler failed: {e}")
+
+
+_default: Optional[IoLoop] = None
+_default_lock = threading.Lock()
+
+
+def get_loop() -> IoLoop:
+    """Process-wide shared loop."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = IoLoop()
+        return _default
+
+
+__all__ = ["IoLoop", "LineSplitter", "get_loop"]
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
-import os, sys, json, subprocess, threading, gi, re, urllib.request, urllib.parse, socket, time
+import os, sys, json, subprocess, threading, gi, re, urllib.request, urllib.parse, socket, time, uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 gi.require_version("Gtk", "3.0")
 gi.require_version("Gdk", "3.0")
@@ -24,6 +25,64 @@ try:
     from .file_organizer import FileOrganizer
 except Exception:
     FileOrganizer = None
+try:
+    from .download_queue import DownloadQueue
+except ImportError:
+    from download_queue import DownloadQueue
+try:
+    from .metadata_resolver import ResolverPool
+except ImportError:
+    from metadata_resolver import ResolverPool
+try:
+    from .metadata_service import MetadataService
+except ImportError:
+    from metadata_service import MetadataService
+try:
+    from .worker_pool import WorkerPool
+except ImportError:
+    from worker_pool import WorkerPool
+try:
+    from .download_archive import DownloadArchive, archive_key
+except ImportError:
+    from download_archive import DownloadArchive, archive_key
+try:
+    from .playlist_cache import PlaylistCache
+except ImportError:
+    from playlist_cache import PlaylistCache
+try:
+    from .postprocess import PostProcessPool, ffmpeg_available
+except ImportError:
+    from postprocess import PostProcessPool, ffmpeg_available
+try:
+    from .progress_model import (TransferStats, aggregate as aggregate_stats, format_bytes, format_eta,
+                                 format_speed, parse_eta, size_to_bytes)
+except ImportError:
+    from progress_model import (TransferStats, aggregate as aggregate_stats, format_bytes, format_eta,
+                                format_speed, parse_eta, size_to_bytes)
+try:
+    from .progress_protocol import ARIA_ETA, ARIA_PERCENT, ARIA_SIZES, ARIA_SPEED, PERCENT, percent as event_percent
+except ImportError:
+    from progress_protocol import ARIA_ETA, ARIA_PERCENT, ARIA_SIZES, ARIA_SPEED, PERCENT, percent as event_percent
+try:
+    from .history_store import HistoryStore
+except ImportError:
+    from history_store import HistoryStore
+try:
+    from .control_server import ControlServer, batch_entries, terminal_event
+except ImportError:
+    from control_server import ControlServer, batch_entries, terminal_event
+try:
+    from .io_loop import IoLoop
+except ImportError:
+    from io_loop import IoLoop
+try:
+    from .ui_coalescer import UpdateCoalescer
+except ImportError:
+    from ui_coalescer import UpdateCoalescer
+try:
+    from .queue_journal import QueueJournal, is_terminal, snapshot as item_snapshot
+except ImportError:
+    from queue_journal import QueueJournal, is_terminal, snapshot as item_snapshot
 
 try:
     from .download_engine import get_engine
@@ -49,7 +108,12 @@ except Exception:
 
 CONFIG_DIR = os.path.expanduser("~/.config/FastTubeDownloader")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
-HISTORY_FILE = os.path.join(CONFIG_DIR, "history.json")
+HISTORY_FILE = os.path.join(CONFIG_DIR, "history.json")  # legacy, imported into HISTORY_DB
+HISTORY_DB = os.path.join(CONFIG_DIR, "history.db")
+HISTORY_PAGE_SIZE = 200
+QUEUE_JOURNAL_FILE = os.path.join(CONFIG_DIR, "queue.journal")
+ARCHIVE_FILE = os.path.join(CONFIG_DIR, "archive.txt")
+PLAYLIST_CACHE_FILE = os.path.join(CONFIG_DIR, "playlist_cache.json")
 
 _BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 FAST_YTDL_LOCAL = os.path.join(_BASE_DIR, "fast_ytdl.sh")
@@ -69,6 +133,7 @@ else:
 
 class DownloadItem:
     def __init__(self, url: str, title: str):
+        self.id = uuid.uuid4().hex[:12]
         self.url = url
         self.title = title or "Unknown"
         self.progress = 0
@@ -80,17 +145,64 @@ class DownloadItem:
         self.req_format = None
         self.req_quality = None
         self.req_subs = None
-        self.speed = ''
-        self.eta = ''
-        self.total = ''
-        self.downloaded = ''
+        self.stats = TransferStats()
         self.gid = None
-        self.client_conn = None
-        self.client_req_id = None
         self.playlist_name = None
         self.playlist_id = None
         self.custom_folder = None
         self.custom_category = None
+        self.priority = 0
+        self.queue_seq = 0
+        self.heap_token = None
+        self.host = None
+        self.extractor = None
+        self.archive_key = None
+        self.pp_tasks = []
+        # Bumped per download start; completion callbacks of an older run check it
+        self.run_id = 0
+
+    # Progress is stored as numbers in self.stats; these render it for display and
+    # accept the strings the download tools print (parsed back into numbers).
+    @property
+    def bytes_done(self):
+        return self.stats.done
+
+    @bytes_done.setter
+    def bytes_done(self, val):
+        self.stats.done = int(val or 0)
+
+    @property
+    def downloaded(self):
+        return format_bytes(self.stats.done) if self.stats.done else ''
+
+    @downloaded.setter
+    def downloaded(self, val):
+        if str(val or '').strip():
+            self.stats.update(done=size_to_bytes(val))
+
+    @property
+    def total(self):
+        return format_bytes(self.stats.total) if self.stats.total else ''
+
+    @total.setter
+    def total(self, val):
+        self.stats.update(total=size_to_bytes(val))
+
+    @property
+    def speed(self):
+        return format_speed(self.stats.speed)
+
+    @speed.setter
+    def speed(self, val):
+        self.stats.hint(speed=size_to_bytes(str(val or '').split('/')[0]))
+
+    @property
+    def eta(self):
+        return format_eta(self.stats.eta)
+
+    @eta.setter
+    def eta(self, val):
+        self.stats.hint(eta=parse_eta(val))
 
     def __repr__(self):
         return f"<DownloadItem {self.title!r} {self.progress}% {self.status}>"
@@ -291,6 +403,8 @@ class MainWindow(Gtk.Window):
             "clipboard_auto": False,
             "speed_limit_kbps": "",
             "max_concurrent": 2,
+            "per_host_limit": 0,
+            "host_limits": {"youtube": 3},
             "aria_connections": 32,
             "aria_splits": 32,
             "fragment_concurrency": 16,
@@ -302,6 +416,18 @@ class MainWindow(Gtk.Window):
             "minimize_to_tray": True,
             "auto_start": True,
             "show_download_options": True,
+            "persist_queue": True,
+            "resolver_workers": 4,
+            "metadata_cache_ttl": 1800,
+            "warm_workers": 2,
+            "parallel_streams": True,
+            "defer_postprocess": True,
+            "postprocess_workers": 0,
+            "progress_hz": 4,
+            "ui_refresh_hz": 20,
+            "history_retention_days": 0,
+            "archive_file": ARCHIVE_FILE,
+            "playlist_cache_ttl": 21600,
             "generic_extensions_map": {
                 "Videos": [".mp4", ".mkv", ".webm", ".avi", ".mov", ".flv", ".wmv"],
                 "Music": [".mp3", ".m4a", ".aac", ".flac", ".wav", ".ogg"],
@@ -334,6 +460,32 @@ class MainWindow(Gtk.Window):
             self.config["fragment_concurrency"] = int(self.config.get("fragment_concurrency", 16))
         except Exception:
             self.config["fragment_concurrency"] = 16
+        try:
+            self.config["per_host_limit"] = max(0, int(self.config.get("per_host_limit", 0)))
+        except Exception:
+            self.config["per_host_limit"] = 0
+        try:
+            self.config["resolver_workers"] = min(16, max(1, int(self.config.get("resolver_workers", 4))))
+        except Exception:
+            self.config["resolver_workers"] = 4
+        try:
+            self.config["warm_workers"] = min(10, max(0, int(self.config.get("warm_workers", 2))))
+        except Exception:
+            self.config["warm_workers"] = 2
+        try:
+            self.config["progress_hz"] = min(30, max(1, int(self.config.get("progress_hz", 4))))
+        except Exception:
+            self.config["progress_hz"] = 4
+        try:
+            self.config["ui_refresh_hz"] = min(30, max(10, int(self.config.get("ui_refresh_hz", 20))))
+        except Exception:
+            self.config["ui_refresh_hz"] = 20
+        try:
+            self.config["history_retention_days"] = max(0, int(self.config.get("history_retention_days", 0)))
+        except Exception:
+            self.config["history_retention_days"] = 0
+        if not isinstance(self.config.get("host_limits"), dict):
+            self.config["host_limits"] = {}
         if self.config.get("category_mode") not in ("idm", "flat"):
             self.config["category_mode"] = "idm"
             
@@ -379,6 +531,9 @@ class MainWindow(Gtk.Window):
         add_btn = Gtk.Button(label="Add to Queue")
         add_btn.get_style_context().add_class("suggested-action")
         add_btn.connect("clicked", self.on_add_download)
+        sync_btn = Gtk.Button(label="Sync Playlist")
+        sync_btn.set_tooltip_text("Queue only playlist/channel entries not in the download archive")
+        sync_btn.connect("clicked", self.on_sync_playlist)
         start_btn = Gtk.Button(label="Start Downloads")
         start_btn.get_style_context().add_class("suggested-action")
         start_btn.connect("clicked", self.on_start_downloads)
@@ -398,6 +553,7 @@ class MainWindow(Gtk.Window):
         open_folder_btn.connect("clicked", self.on_open_folder)
         hbox_top.pack_start(self.url_entry, True, True, 0)
         hbox_top.pack_start(add_btn, False, False, 0)
+        hbox_top.pack_start(sync_btn, False, False, 0)
         hbox_top.pack_start(start_btn, False, False, 0)
         hbox_top.pack_start(stop_btn, False, False, 0)
         hbox_top.pack_start(remove_btn, False, False, 0)
@@ -479,7 +635,8 @@ class MainWindow(Gtk.Window):
         sc_settings.set_min_content_height(70)
         queue_page.pack_start(sc_settings, False, False, 0)
 
-        self.liststore = Gtk.ListStore(str, str, int, str, str, str, str, str)
+        # url, title, progress, progress text, status, speed, eta, size, item id
+        self.liststore = Gtk.ListStore(str, str, int, str, str, str, str, str, str)
         self.treeview = Gtk.TreeView(model=self.liststore)
         self.treeview.set_rules_hint(True)
         title_renderer = Gtk.CellRendererText()
@@ -547,6 +704,28 @@ class MainWindow(Gtk.Window):
         hist_actions.pack_end(btn_hist_clear, False, False, 0)
         history_page.pack_start(hist_actions, False, False, 0)
 
+        hist_filters = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        self.hist_search = Gtk.SearchEntry()
+        self.hist_search.set_placeholder_text("Search title or URL")
+        self.hist_search.connect("search-changed", self._on_history_filter_changed)
+        self.hist_status_combo = Gtk.ComboBoxText()
+        self.hist_status_combo.append("", "Any status")
+        self.hist_status_combo.append("Completed", "Completed")
+        self.hist_status_combo.append("Failed", "Failed")
+        self.hist_status_combo.set_active_id("")
+        self.hist_status_combo.connect("changed", self._on_history_filter_changed)
+        self.hist_range_combo = Gtk.ComboBoxText()
+        self.hist_range_combo.append("", "Any time")
+        self.hist_range_combo.append("1", "Today")
+        self.hist_range_combo.append("7", "Last 7 days")
+        self.hist_range_combo.append("30", "Last 30 days")
+        self.hist_range_combo.set_active_id("")
+        self.hist_range_combo.connect("changed", self._on_history_filter_changed)
+        hist_filters.pack_start(self.hist_search, True, True, 0)
+        hist_filters.pack_start(self.hist_status_combo, False, False, 0)
+        hist_filters.pack_start(self.hist_range_combo, False, False, 0)
+        history_page.pack_start(hist_filters, False, False, 0)
+
         self.hist_store = Gtk.ListStore(str, str, str, str, str)
         self.hist_view = Gtk.TreeView(model=self.hist_store)
         for (title_txt, idx) in [("Time", 0), ("Title", 1), ("Status", 2), ("Path", 3)]:
@@ -557,8 +736,16 @@ class MainWindow(Gtk.Window):
             self.hist_view.append_column(col)
         sc_hist = Gtk.ScrolledWindow()
         sc_hist.add(self.hist_view)
+        # Rows are fetched a page at a time as the list is scrolled towards the end
+        sc_hist.get_vadjustment().connect("value-changed", self._on_history_scrolled)
         history_page.pack_start(sc_hist, True, True, 0)
         self.notebook.append_page(history_page, Gtk.Label(label="History"))
+        self._history_page = history_page
+        self._hist_loaded = False
+        self._hist_offset = 0
+        self._hist_exhausted = False
+        # Nothing is read from the history database until the tab is first shown
+        self.notebook.connect("switch-page", self._on_notebook_switch_page)
 
         help_page = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
         help_page.set_border_width(10)
@@ -596,7 +783,8 @@ class MainWindow(Gtk.Window):
                 "1. Paste a YouTube link and press 'Add to Queue'.",
                 "2. Press 'Start Downloads' to begin.",
                 "3. Use 'Pause', 'Resume', or 'Remove Selected' as needed.",
-                "4. Generic File: choose 'Generic File' format before adding a direct URL (e.g. .zip, .mp4)."
+                "4. Generic File: choose 'Generic File' format before adding a direct URL (e.g. .zip, .mp4).",
+                "5. Sync Playlist: re-check a playlist/channel and queue only videos not downloaded yet."
             ]),
             ("Formats", [
                 "Best Video + Audio: Merges highest quality video+audio.",
@@ -607,7 +795,8 @@ class MainWindow(Gtk.Window):
             ("Speed & Concurrency", [
                 "Speed KB/s: Limit overall download rate; empty = unlimited.",
                 "Connections / Splits (generic): Parallel segments (aria2).",
-                "Max concurrent: Number of active items in queue simultaneously." 
+                "Max concurrent: Number of active items in queue simultaneously.",
+                "Per-host caps: 'per_host_limit' and 'host_limits' in config.json limit connections per site (e.g. youtube); other sites fill the remaining slots." 
             ]),
             ("Subtitles & Quality", [
                 "Quality: Enter resolution (e.g. 1080, 720). Empty = best.",
@@ -643,7 +832,10 @@ class MainWindow(Gtk.Window):
             ]),
             ("Where Things Are", [
                 f"Config: {CONFIG_FILE}",
-                f"History: {HISTORY_FILE}",
+                f"History: {HISTORY_DB}",
+                f"Queue journal: {QUEUE_JOURNAL_FILE}",
+                f"Download archive: {self.config.get('archive_file') or ARCHIVE_FILE}",
+                f"Playlist cache: {PLAYLIST_CACHE_FILE}",
                 f"Fast script: {FAST_YTDL}",
                 f"Icon: {os.path.join(_BASE_DIR,'icon128.png')}",
                 f"Extension root: {_BASE_DIR}" 
@@ -656,7 +848,7 @@ class MainWindow(Gtk.Window):
         copy_buttons_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
         path_map = {
             "Config": CONFIG_FILE,
-            "History": HISTORY_FILE,
+            "History": HISTORY_DB,
             "Extension Root": _BASE_DIR,
             "Native Host": native_host_path,
             "Manifest": manifest_hint
@@ -678,7 +870,26 @@ class MainWindow(Gtk.Window):
         help_page.pack_start(help_scrolled, True, True, 0)
         self.notebook.append_page(help_page, Gtk.Label(label="Help"))
 
-        self.queue = []
+        self.queue = DownloadQueue()
+        self.ui_updates = UpdateCoalescer(self._flush_ui_updates, GLib.timeout_add,
+                                          hz=self.config.get("ui_refresh_hz", 20))
+        self.metadata = MetadataService(ttl=self.config.get("metadata_cache_ttl", 1800))
+        # Preload the extractors off the main thread (lookup threads build their own instances)
+        threading.Thread(target=self.metadata.warm, daemon=True).start()
+        self.resolver = ResolverPool(self.fetch_title_background, workers=self.config.get("resolver_workers", 4))
+        self.io = IoLoop()
+        # Completion work (status/journal/history writes, process reaping) leaves the IoLoop thread
+        # here; one thread keeps each item's updates in order
+        self._finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="finish")
+        self._aria2_items = {}
+        self._aria2_lock = threading.Lock()
+        self._aria2_polling = False
+        self.workers = WorkerPool(size=self.config.get("warm_workers", 2), loop=self.io)
+        self.workers.prefork()
+        self.postprocessor = PostProcessPool(workers=self.config.get("postprocess_workers", 0))
+        self.playlist_cache = PlaylistCache(PLAYLIST_CACHE_FILE, ttl=self.config.get("playlist_cache_ttl", 21600))
+        self.archive = DownloadArchive(os.path.expanduser(self.config.get("archive_file") or ARCHIVE_FILE))
+        self.journal = QueueJournal(QUEUE_JOURNAL_FILE) if self.config.get("persist_queue", True) else None
         self.is_downloading = False
         self.already_seen_urls = set()
         self._last_clip_text = ""
@@ -687,13 +898,17 @@ class MainWindow(Gtk.Window):
         self._mini_title_lbl = None
         self._mini_status_lbl = None
         self._mini_progress_bar = None
-        self._mini_idx = None
+        self._mini_item = None
         self._big_popup = None
-        self._big_list = None
+        self._big_store = None
         self._big_rows = {}
         self._big_header_label = None
-        self.history = self.load_history()
-        self.populate_history_view()
+        self.history = HistoryStore(HISTORY_DB, legacy_json=HISTORY_FILE)
+        if self.config.get("history_retention_days"):
+            threading.Thread(target=self._compact_history, daemon=True).start()
+        if self.journal:
+            self._restore_queue()
+            GLib.timeout_add_seconds(60, self._compact_journal_periodic)
 
         targets = [Gtk.TargetEntry.new("text/uri-list", 0, 0), Gtk.TargetEntry.new("text/plain", 0, 1)]
         self.treeview.drag_dest_set(Gtk.DestDefaults.ALL, targets, Gdk.DragAction.COPY)
@@ -711,7 +926,7 @@ class MainWindow(Gtk.Window):
         self.update_dashboard_counts()
         # CSS styling is now applied later        self.update_dashboard_counts()
         GLib.timeout_add(2000, self.check_clipboard_periodic)
-        threading.Thread(target=self._start_control_server, daemon=True).start()
+        self._start_control_server()
         
         # Initialize tray icon and set up window close behavior
         # Temporarily disabled due to segfault - will fix in next update
@@ -816,47 +1031,87 @@ class MainWindow(Gtk.Window):
                 return json.load(f)
         return None
 
-    def load_history(self):
+    def populate_history_view(self):
+        """(Re)load the History tab from its first page with the current filters."""
+        self.hist_store.clear()
+        self._hist_loaded = True
+        self._hist_offset = 0
+        self._hist_exhausted = False
+        self._load_history_page()
+
+    def _history_filters(self):
+        status = self.hist_status_combo.get_active_id() or None
+        days = self.hist_range_combo.get_active_id()
+        since = None
+        if days:
+            midnight = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+            since = midnight - (int(days) - 1) * 86400
+        return {'query': self.hist_search.get_text().strip(), 'status': status, 'since': since}
+
+    def _load_history_page(self):
+        if self._hist_exhausted:
+            return
         try:
-            if os.path.exists(HISTORY_FILE):
-                with open(HISTORY_FILE, 'r') as f:
-                    return json.load(f) or []
-        except Exception:
-            pass
-        return []
-
-    def save_history(self):
+            recs = self.history.page(self._hist_offset, HISTORY_PAGE_SIZE, **self._history_filters())
+        except Exception as e:
+            print(f"[history] query failed: {e}")
+            recs = []
+        for rec in recs:
+            self.hist_store.append([rec['time'], rec['title'], rec['status'], rec['path'], rec['url']])
+        self._hist_offset += len(recs)
+        self._hist_exhausted = len(recs) < HISTORY_PAGE_SIZE
+
+    def _on_notebook_switch_page(self, notebook, page, page_num):
+        if page is self._history_page and not self._hist_loaded:
+            self.populate_history_view()
+
+    def _on_history_scrolled(self, adj):
+        if self._hist_loaded and adj.get_value() + 2 * adj.get_page_size() >= adj.get_upper():
+            self._load_history_page()
+
+    def _on_history_filter_changed(self, *_):
+        if self._hist_loaded:
+            self.populate_history_view()
+
+    def append_history(self, title, url, status, path, size=0, duration=0.0, backend=""):
+        # One INSERT, safe from any thread; the view is updated on the main loop
         try:
-            os.makedirs(CONFIG_DIR, exist_ok=True)
-            with open(HISTORY_FILE, 'w') as f:
-                json.dump(self.history, f, indent=2)
-        except Exception:
-            pass
+            rec = self.history.add(title, url, status, path, size=size, duration=duration, backend=backend)
+        except Exception as e:
+            print(f"[history] write failed: {e}")
+            return
+        GLib.idle_add(self._on_history_added, rec)
+
+    def _on_history_added(self, rec):
+        # Newest rows are on top; with a filter active the next reload picks it up
+        f = self._history_filters() if self._hist_loaded else None
+        if f and not f['query'] and f['status'] in (None, rec['status']):
+            self.hist_store.prepend([rec['time'], rec['title'], rec['status'], rec['path'], rec['url']])
+            self._hist_offset += 1
+        self.update_dashboard_counts()
+        return False
 
-    def populate_history_view(self):
-        self.hist_store.clear()
-        for rec in self.history:
-            self.hist_store.append([
-                rec.get('time',''),
-                rec.get('title','Unknown'),
-                rec.get('status',''),
-                rec.get('path',''),
-                rec.get('url',''),
-            ])
+    def _transfer_info(self, item, backend):
+        """History fields describing how much item transferred, and how fast."""
+        st = item.stats
+        return {'size': max(st.done, st.total if item.status == "Completed" else 0),
+                'duration': st.elapsed, 'backend': backend}
 
-    def append_history(self, title, url, status, path):
-        import datetime
-        ts = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        rec = { 'time': ts, 'title': title or 'Unknown', 'url': url, 'status': status, 'path': path or '' }
-        self.history.append(rec)
-        self.save_history()
-        self.hist_store.append([rec['time'], rec['title'], rec['status'], rec['path'], rec['url']])
-        self.update_dashboard_counts()
+    def _compact_history(self):
+        keep = self.config.get("history_retention_days", 0)
+        try:
+            removed = self.history.compact(keep)
+        except Exception as e:
+            print(f"[history] compaction failed: {e}")
+            return
+        if removed:
+            print(f"[history] removed {removed} records older than {keep} days (kept in daily totals)")
 
     def update_dashboard_counts(self):
-        queued = sum(1 for it in self.queue if it.status == 'Queued')
-        downloading = sum(1 for it in self.queue if it.status == 'Downloading...')
-        completed = sum(1 for rec in self.history if rec.get('status') == 'Completed')
+        queued = self.queue.count('Queued')
+        downloading = self.queue.count('Downloading...')
+        # Read from the per-day summaries, which also cover compacted records
+        completed = self.history.totals()['completed']
         try:
             self.lbl_counts.set_text(f"Queued: {queued} | Downloading: {downloading} | Completed: {completed}")
         except Exception:
@@ -900,9 +1155,9 @@ class MainWindow(Gtk.Window):
         self.notebook.set_current_page(0)
 
     def on_hist_clear(self, widget):
-        self.history = []
-        self.save_history()
-        self.populate_history_view()
+        self.history.clear()
+        if self._hist_loaded:
+            self.populate_history_view()
         self.update_dashboard_counts()
 
     def on_setup_complete(self, widget):
@@ -927,40 +1182,25 @@ class MainWindow(Gtk.Window):
                     return title
         except Exception:
             pass
-        try:
-            result = subprocess.run(["yt-dlp", "--no-playlist", "--get-title", url], capture_output=True, text=True, check=True, timeout=45)
-            title = result.stdout.strip()
-            return next((line for line in title.splitlines() if line.strip()), "Unknown") or "Unknown"
-        except Exception as e:
-            print(f"Title fetch error: {e}")
-            return "Unknown"
+        return self.metadata.title(url) or "Unknown"
 
     def fetch_title_background(self, item):
+        if item not in self.queue:
+            return
         try:
-            result = subprocess.run(["yt-dlp", "--no-playlist", "--get-title", item.url], capture_output=True, text=True, check=True, timeout=45)
-            title = result.stdout.strip()
-            title = next((line for line in title.splitlines() if line.strip()), None)
+            title = self.metadata.title(item.url)
             if title:
-                try:
-                    idx = self.queue.index(item)
-                except ValueError:
+                if item not in self.queue:
                     return
-                self.update_title(idx, title)
+                self._update_item_title(item, title)
             
             # If item has a playlist_id but no playlist_name, try to fetch it now
             if getattr(item, 'playlist_id', None) and not getattr(item, 'playlist_name', None):
-                try:
-                    # Use original URL with --yes-playlist to handle Mixes correctly
-                    pl_proc = subprocess.run(
-                        ["yt-dlp", "--yes-playlist", "--flat-playlist", "--print", "playlist_title", "--playlist-items", "1", item.url],
-                        capture_output=True, text=True, timeout=15
-                    )
-                    if pl_proc.returncode == 0:
-                        pl_title = pl_proc.stdout.strip()
-                        if pl_title and pl_title != "NA":
-                            item.playlist_name = pl_title
-                except Exception as e:
-                    pass
+                # Original URL resolves as a playlist, which handles Mixes correctly.
+                # The cache collapses lookups from every item of the same playlist into one.
+                pl_title = self.playlist_cache.title(item.playlist_id, lambda: self.metadata.playlist_title(item.url))
+                if pl_title:
+                    item.playlist_name = pl_title
 
             # Update status from Resolving to Queued once metadata is ready
             if item.status == "Resolving":
@@ -979,6 +1219,14 @@ class MainWindow(Gtk.Window):
         self.add_url(url)
         self.url_entry.set_text("")
 
+    def on_sync_playlist(self, widget):
+        url = self.url_entry.get_text().strip()
+        if not url:
+            self.show_message("Please enter a playlist or channel URL!")
+            return
+        self.add_playlist(url, sync=True)
+        self.url_entry.set_text("")
+
     def add_url(self, url: str, fmt: str = None, qual: str = None, subs_active: bool = None):
         url = url.strip()
         if not url: return
@@ -1054,74 +1302,65 @@ class MainWindow(Gtk.Window):
         except Exception:
             pass
 
-        self.queue.append(item)
-        item.treeiter = self.liststore.append([item.url, item.title, item.progress, f"{item.progress}%", item.status, "", "", ""])
-        threading.Thread(target=self.fetch_title_background, args=(item,), daemon=True).start()
+        self._enqueue_item(item)
+        self.resolver.submit(item)
         
         if self.config.get("auto_start", True) and not self.is_downloading:
             self.on_start_downloads(None)
 
     
-    def add_playlist(self, url, custom_folder=None, custom_category=None):
+    def add_playlist(self, url, custom_folder=None, custom_category=None, sync=False, notify=True):
+        # Enumerate in the background so the UI stays responsive; entries are
+        # queued as their lines arrive and can start downloading immediately.
+        # sync=True skips entries already in the download archive or queue.
+        threading.Thread(target=self._expand_playlist, args=(url, custom_folder, custom_category, sync, notify), daemon=True).start()
+
+    def _expand_playlist(self, url, custom_folder=None, custom_category=None, sync=False, notify=True):
         # We use --flat-playlist to get metadata quickly.
         # We need the playlist title to organize files.
         probe_cmd = ["yt-dlp", "--flat-playlist", "--dump-json", url]
-        added = 0
+        pending = []
+        lock = threading.Lock()
+
+        def _flush():
+            with lock:
+                batch = pending[:]
+                pending.clear()
+            for item in batch:
+                self._enqueue_item(item)
+                self.resolver.submit(item)
+            if batch and self.config.get("auto_start", True) and not self.is_downloading:
+                self.on_start_downloads(None)
+            return False
+
         try:
-            result = subprocess.run(probe_cmd, capture_output=True, text=True, check=True)
-            lines = result.stdout.strip().splitlines()
-            
-            # We will parse JSON manually here to extract playlist title
-            # instead of using playlist_utils.parse_flat_playlist_lines
-            
-            seen_ids = set()
-            playlist_title = None
-            
-            # Pre-scan for playlist title
-            for raw in lines:
-                if not raw.strip(): continue
-                try:
-                    data = json.loads(raw)
-                    if not playlist_title:
-                        playlist_title = data.get('playlist_title') or data.get('playlist')
-                        if playlist_title: break
-                except: pass
-            
-            # Fallback: If title not found in dump-json, try specific fetch or heuristics
-            if not playlist_title:
-                try:
-                    # Try fetching just the title
-                    title_proc = subprocess.run(
-                        ["yt-dlp", "--no-playlist", "--print", "playlist_title", "--playlist-items", "1", url],
-                        capture_output=True, text=True, timeout=15
-                    )
-                    if title_proc.returncode == 0:
-                        potential_title = title_proc.stdout.strip()
-                        if potential_title and potential_title != "NA":
-                            playlist_title = potential_title
-                except Exception:
-                    pass
+            url_list_id = (urllib.parse.parse_qs(urllib.parse.urlparse(url).query).get('list') or [None])[0]
+        except Exception:
+            url_list_id = None
 
-            if not playlist_title:
-                # Last resort fallback
-                import time
-                ts = int(time.time())
-                playlist_title = f"Playlist_{ts}"
-                # Try to extract ID if possible
-                try:
-                    import urllib.parse
-                    qs = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
-                    if 'list' in qs:
-                       playlist_title = f"Playlist_{qs['list'][0]}"
-                except: pass
-            
-            # If we didn't get passed custom settings (e.g. called from IDM dialog path already),
-            # we might want to ask NOW if it wasn't asked in add_url? 
-            # But add_url handles the dialog. 
-            # If add_playlist is called directly (e.g. CLI arg?), we might need to check.
-            # For simplicity, assume add_url handles it if configured.
-            
-            for raw in lines:
+        def _fallback_title(pid):
+            title = self.playlist_cache.title(pid, lambda: self.metadata.playlist_title(url))
+            if title:
+                return title, True
+            # Last resort fallback
+            if url_list_id:
+                return f"Playlist_{url_list_id}", False
+            return f"Playlist_{int(time.time())}", False
+
+        added = 0
+        skipped = 0
+        seen_ids = set()
+        entry_ids = []
+        playlist_id = None
+        playlist_title = None
+        title_known = False
+        try:
+            proc = subprocess.Popen(probe_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        except OSError as e:
+            print(f"[playlist] enumeration failed: {e}")
+            proc = None
+        if proc is not None:
+            for raw in iter(proc.stdout.readline, ""):
                 raw = raw.strip()
                 if not raw:
                     continue
@@ -1129,47 +1368,116 @@ class MainWindow(Gtk.Window):
                     data = json.loads(raw)
                 except Exception:
                     continue
-                
-                # Try to get playlist title from the first valid entry (fallback)
                 if not playlist_title:
-                   playlist_title = data.get('playlist_title') or data.get('playlist')
+                    playlist_id = data.get('playlist_id') or url_list_id
+                    playlist_title = data.get('playlist_title') or data.get('playlist')
+                    title_known = bool(playlist_title)
+                    if not playlist_title:
+                        playlist_title, title_known = _fallback_title(playlist_id)
 
                 vid_id = data.get('id') or data.get('url')
                 if not vid_id or vid_id in seen_ids:
                     continue
-                    
                 seen_ids.add(vid_id)
+                entry_ids.append(vid_id)
                 full_url = f"https://www.youtube.com/watch?v={vid_id}"
-                
+                key = ((data.get('ie_key') or 'youtube').lower(), data['id']) if data.get('id') else archive_key(full_url)
+                if sync and ((key and key in self.archive) or self.queue.find_url(full_url)):
+                    skipped += 1
+                    continue
+
                 item = DownloadItem(full_url, "Fetching title...")
                 item.kind = 'media'
+                item.archive_key = key
                 item.playlist_name = playlist_title
+                item.playlist_id = data.get('playlist_id') or None
                 item.custom_folder = custom_folder
                 item.custom_category = custom_category
-                
-                self.queue.append(item)
-                item.treeiter = self.liststore.append([item.url, item.title, item.progress, f"{item.progress}%", item.status, "", "", ""])
-                threading.Thread(target=self.fetch_title_background, args=(item,), daemon=True).start()
+                with lock:
+                    pending.append(item)
+                    first_in_batch = len(pending) == 1
+                if first_in_batch:
+                    GLib.idle_add(_flush)
                 added += 1
-                
-            if added == 0:
-                 self.show_message("Playlist appears empty or inaccessible.")
-                 return
+            proc.wait()
+            if proc.returncode == 0 and playlist_id and entry_ids:
+                self.playlist_cache.update(playlist_id, playlist_title if title_known else None, entry_ids)
 
-            if self.config.get("auto_start", True) and not self.is_downloading:
-                self.on_start_downloads(None)
-        except subprocess.CalledProcessError:
+        if sync:
+            print(f"[sync] {url}: {added} new, {skipped} already downloaded or queued")
+        if added:
+            return
+        if proc is not None and proc.returncode == 0:
+            if not notify:
+                return
+            if skipped:
+                GLib.idle_add(self.show_message, f"Playlist is up to date ({skipped} already downloaded or queued).")
+            else:
+                GLib.idle_add(self.show_message, "Playlist appears empty or inaccessible.")
+            return
+        if sync:
+            # Never fall back to a single-video download while mirroring
+            print(f"[sync] {url}: listing failed")
+            return
+
+        def _single():
             self.show_message("Error detecting playlist; treating as single video.")
             # Fallback: Treat as single video without calling add_url recursively
             item = DownloadItem(url, "Fetching title...")
             item.kind = 'media'
             item.custom_folder = custom_folder
             item.custom_category = custom_category
-            self.queue.append(item)
-            item.treeiter = self.liststore.append([item.url, item.title, item.progress, f"{item.progress}%", item.status, "", "", ""])
-            threading.Thread(target=self.fetch_title_background, args=(item,), daemon=True).start()
+            self._enqueue_item(item)
+            self.resolver.submit(item)
             if self.config.get("auto_start", True) and not self.is_downloading:
                 self.on_start_downloads(None)
+            return False
+        GLib.idle_add(_single)
+
+    def _enqueue_item(self, item, journal=True):
+        self.queue.append(item)
+        item.treeiter = self.liststore.append([item.url, item.title, item.progress, f"{item.progress}%", item.status, "", "", "", item.id])
+        if journal and self.journal:
+            self.journal.record_enqueue(item)
+
+    def _restore_queue(self):
+        try:
+            records = self.journal.replay()
+        except Exception as e:
+            print(f"[journal] replay failed: {e}")
+            return
+        restored = 0
+        for rec in records:
+            if not rec.get('url') or is_terminal(rec.get('status')):
+                continue
+            item = DownloadItem(rec['url'], rec.get('title'))
+            for key, val in rec.items():
+                if val is not None and key not in ('url', 'title', 'status'):
+                    setattr(item, key, val)
+            # Anything that was mid-flight resumes from its .part file
+            item.status = 'Paused' if rec.get('status') == 'Paused' else 'Queued'
+            self._enqueue_item(item, journal=False)
+            restored += 1
+            if item.title in ('Unknown', 'Fetching title...'):
+                self.resolver.submit(item, self._probe_generic_metadata if item.kind == 'generic' else None)
+        self._compact_journal()
+        if restored:
+            print(f"[journal] restored {restored} queued item(s)")
+            if self.config.get("auto_start", True):
+                GLib.idle_add(self.on_start_downloads, None)
+
+    def _compact_journal(self):
+        if not self.journal:
+            return
+        try:
+            self.journal.compact([item_snapshot(it) for it in self.queue])
+        except Exception as e:
+            print(f"[journal] compaction failed: {e}")
+
+    def _compact_journal_periodic(self):
+        if self.journal and self.journal.needs_compaction():
+            self._compact_journal()
+        return True
 
     def _is_playlist_url(self, url: str) -> bool:
         try:
@@ -1228,9 +1536,8 @@ class MainWindow(Gtk.Window):
         item = DownloadItem(url, title)
         item.kind = 'generic'
         item.req_format = 'Generic File'
-        self.queue.append(item)
-        item.treeiter = self.liststore.append([item.url, item.title, item.progress, f"{item.progress}%", item.status, "", "", ""])
-        threading.Thread(target=self._probe_generic_metadata, args=(item,), daemon=True).start()
+        self._enqueue_item(item)
+        self.resolver.submit(item, self._probe_generic_metadata)
         if self.config.get("auto_start", True) and not self.is_downloading:
             self.on_start_downloads(None)
 
@@ -1246,13 +1553,7 @@ class MainWindow(Gtk.Window):
                         self._update_item_title(item, fn)
                 clen = resp.headers.get('Content-Length')
                 if clen and clen.isdigit():
-                    sz = int(clen)
-                    units = ['B','KiB','MiB','GiB','TiB']
-                    u = 0
-                    val = float(sz)
-                    while val >= 1024 and u < len(units)-1:
-                        val /= 1024.0; u += 1
-                    item.total = f"{val:.1f}{units[u]}"
+                    item.stats.update(total=int(clen))
                     self._update_progress_text(item)
         except Exception:
             pass
@@ -1273,7 +1574,7 @@ class MainWindow(Gtk.Window):
                     pass
         for it in self.queue:
             if it.status == "Downloading...":
-                it.status = "Paused"
+                self.queue.set_status(it, "Paused")
                 if it.treeiter:
                     self.liststore.set(it.treeiter, 4, "Paused")
         self.update_dashboard_counts()
@@ -1283,16 +1584,17 @@ class MainWindow(Gtk.Window):
         model, treeiter = selection.get_selected()
         if treeiter is None:
             return
-        url = model[treeiter][0]
-        for i, qi in enumerate(list(self.queue)):
-            if qi.url == url:
-                if qi.process and qi.process.poll() is None:
-                    try:
-                        qi.process.terminate()
-                    except Exception:
-                        pass
-                self.queue.pop(i)
-                break
+        qi = self.queue.get(model[treeiter][8])
+        if qi is not None:
+            if qi.process and qi.process.poll() is None:
+                try:
+                    qi.process.terminate()
+                except Exception:
+                    pass
+            self.queue.remove(qi)
+            self.resolver.discard(qi)
+            if self.journal:
+                self.journal.record_remove(qi)
         self.liststore.remove(treeiter)
         self.update_dashboard_counts()
 
@@ -1371,6 +1673,14 @@ class MainWindow(Gtk.Window):
             stop_item.connect("activate", self.on_stop_download)
             menu.append(stop_item)
 
+            # Reorder
+            top_item = Gtk.MenuItem(label="Move to Top")
+            top_item.connect("activate", self.on_move_to_top)
+            menu.append(top_item)
+            bottom_item = Gtk.MenuItem(label="Move to Bottom")
+            bottom_item.connect("activate", self.on_move_to_bottom)
+            menu.append(bottom_item)
+
             # Separator
             menu.append(Gtk.SeparatorMenuItem())
             
@@ -1425,6 +1735,40 @@ class MainWindow(Gtk.Window):
         if item and item.status == "Downloading...":
              self._set_status(item, "Stopped")
              
+    def on_move_to_top(self, widget):
+        item = self._get_selected_item()
+        if item:
+            self._move_item(item, top=True)
+
+    def on_move_to_bottom(self, widget):
+        item = self._get_selected_item()
+        if item:
+            self._move_item(item, top=False)
+
+    def _move_item(self, item, top=True):
+        if top:
+            self.queue.move_to_top(item)
+            self.resolver.bump(item)
+            if item.treeiter:
+                self.liststore.move_after(item.treeiter, None)
+        else:
+            self.queue.move_to_bottom(item)
+            if item.treeiter:
+                self.liststore.move_before(item.treeiter, None)
+        if self.journal:
+            self.journal.record_priority(item)
+        return False
+
+    def _set_item_priority(self, item, priority):
+        if priority == 'top':
+            return self._move_item(item, top=True)
+        if priority == 'bottom':
+            return self._move_item(item, top=False)
+        self.queue.set_priority(item, int(priority))
+        if self.journal:
+            self.journal.record_priority(item)
+        return False
+
     def on_hist_open_file_context(self, widget):
         item = self._get_selected_item()
         if item and item.dest_path and os.path.exists(item.dest_path):
@@ -1434,12 +1778,7 @@ class MainWindow(Gtk.Window):
         selection = self.treeview.get_selection()
         model, treeiter = selection.get_selected()
         if treeiter:
-            try:
-                idx = model.get_path(treeiter).get_indices()[0]
-                if idx < len(self.queue):
-                    return self.queue[idx]
-            except Exception:
-                pass
+            return self.queue.get(model[treeiter][8])
         return None
 
     def check_clipboard_periodic(self):
@@ -1471,162 +1810,216 @@ class MainWindow(Gtk.Window):
         return True
 
     def _start_control_server(self):
-        HOST, PORT = '127.0.0.1', 47653
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        try:
-            sock.bind((HOST, PORT))
-            sock.listen(5)
-        except Exception as e:
-            print(f"Control server bind failed: {e}")
-            return
-        print(f"Control server listening on {HOST}:{PORT}")
-        while True:
-            try:
-                conn, _ = sock.accept()
-            except Exception:
-                break
-            threading.Thread(target=self._handle_client, args=(conn,), daemon=True).start()
-
-    def _handle_client(self, conn):
-        try:
-            conn.settimeout(5.0)
-            buf = b''
-            while b'\n' not in buf and len(buf) < 65536:
+        # Binds on the calling thread; requests are handled on the server's pool threads
+        self.control = ControlServer(self._handle_control)
+        self.control.start()
+
+    def _handle_control(self, req):
+        """Answer one control request (see control_server); runs off the main loop."""
+        if req.get('action') == 'show':
+            def _bring():
                 try:
-                    chunk = conn.recv(4096)
-                except socket.timeout:
-                    break
-                if not chunk:
-                    break
-                buf += chunk
-            conn.settimeout(None)
-            if not buf:
-                return
-            if b'\n' in buf:
-                line_bytes = buf.split(b'\n', 1)[0]
+                    self.show_all()
+                    try:
+                        self.deiconify()
+                    except Exception:
+                        pass
+                    try:
+                        if hasattr(self, 'present_with_time'):
+                            self.present_with_time(Gdk.CURRENT_TIME)
+                        else:
+                            self.present()
+                        gdk_win = self.get_window()
+                        if gdk_win is not None:
+                            try:
+                                gdk_win.raise_()
+                            except Exception:
+                                pass
+                    except Exception:
+                        pass
+                    try:
+                        self.set_urgency_hint(True)
+                    except Exception:
+                        pass
+                except Exception:
+                    pass
+                return False
+            GLib.idle_add(_bring)
+            return {"status": "ok"}
+        if req.get('action') in ('probe', 'metadata') and req.get('url'):
+            # Served from the warm in-process extractor; runs on a control pool thread
+            if req['action'] == 'probe':
+                resp = self.metadata.probe(req['url'])
             else:
-                line_bytes = buf
-            line = line_bytes.decode('utf-8', errors='ignore').strip()
-            if not line:
-                return
+                title = self.metadata.title(req['url'])
+                resp = {"status": "ok", "title": title} if title else {"status": "error", "message": "No metadata available"}
+            return resp
+        if req.get('action') == 'sync' and req.get('url'):
+            # Mirror a playlist/channel: queue only entries missing from the archive
+            self.archive.reload()
+            GLib.idle_add(self.add_playlist, req['url'], req.get('folder'), None, True, False)
+            return {"status": "syncing"}
+        if req.get('action') == 'set_priority':
+            item = self.queue.get(req.get('id')) if req.get('id') else self.queue.find_url(req.get('url') or '')
+            prio = req.get('priority')
+            if item is None:
+                resp = {"status": "error", "message": "Unknown item"}
+            elif prio not in ('top', 'bottom') and not isinstance(prio, int):
+                resp = {"status": "error", "message": "priority must be an integer, 'top' or 'bottom'"}
+            else:
+                GLib.idle_add(self._set_item_priority, item, prio)
+                resp = {"status": "ok"}
+            return resp
+        if req.get('action') == 'set_playlist_priority':
+            key = req.get('playlist')
+            prio = req.get('priority')
+            if not key or not isinstance(prio, int):
+                resp = {"status": "error", "message": "playlist and integer priority required"}
+            else:
+                updated = self.queue.set_playlist_priority(str(key), prio)
+                resp = {"status": "ok", "updated": updated}
+            return resp
+        if req.get('action') == 'enqueue_batch':
+            # No dialogs and no widget juggling: entries carry their own options
+            defaults = {"format": self.config.get("default_format"),
+                        "quality": self.config.get("preferred_quality"),
+                        "subs": self.config.get("subs")}
             try:
-                req = json.loads(line)
-            except Exception:
-                req = {"action": "enqueue", "url": line}
-            if req.get('action') == 'show':
-                def _bring():
-                    try:
-                        self.show_all()
-                        try:
-                            self.deiconify()
-                        except Exception:
-                            pass
+                entries = batch_entries(req, defaults)
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
+            results = self._call_on_main(self._enqueue_batch, entries)
+            queued = sum(1 for r in results if r.get("status") == "queued")
+            return {"status": "ok", "queued": queued, "items": results}
+        if req.get('action') == 'enqueue' and req.get('url'):
+            fmt_id = req.get('formatId')
+            fmt = fmt_id or req.get('format') or self.format_combo.get_active_text()
+            qual = "" if fmt_id else (req.get('quality') or self.quality_entry.get_text())
+            subs = req.get('subs')
+
+            # Auto-detect generic file type from request
+            ft = req.get('fileType')
+            if ft in ('document', 'archive', 'program', 'image', 'other', 'unknown'):
+                 if not fmt_id and fmt not in ("Best Video + Audio", "Audio Only"):
+                     fmt = "Generic File"
+
+            if isinstance(subs, str):
+                subs_active = subs.lower().startswith('y') or subs.lower() == 'true'
+            else:
+                subs_active = bool(subs) if subs is not None else self.subs_check.get_active()
+
+            def _enqueue():
+                prev_fmt = self.format_combo.get_active_text()
+                prev_qual = self.quality_entry.get_text()
+                prev_subs = self.subs_check.get_active()
+                try:
+                    for i, label in enumerate(["Best Video + Audio", "Audio Only", "Best (default)"]):
+                        if label == fmt:
+                            self.format_combo.set_active(i)
+                            break
+                    self.quality_entry.set_text(qual or '')
+                    self.subs_check.set_active(subs_active)
+                    if req.get('confirm'):
                         try:
-                            if hasattr(self, 'present_with_time'):
-                                self.present_with_time(Gdk.CURRENT_TIME)
-                            else:
+                            if req.get('show'):
                                 self.present()
-                            gdk_win = self.get_window()
-                            if gdk_win is not None:
-                                try:
-                                    gdk_win.raise_()
-                                except Exception:
-                                    pass
+                                self.set_urgency_hint(True)
                         except Exception:
                             pass
+                        dlg = Gtk.MessageDialog(self, 0, Gtk.MessageType.QUESTION, Gtk.ButtonsType.NONE, "Start download?")
+                        title = req.get('title') or self.get_video_title(req['url']) or 'Unknown'
+                        details = f"Title: {title}\nFormat: {fmt}\nQuality: {qual or 'Best'}\nSubtitles: {'On' if subs_active else 'Off'}\n\nURL:\n{req['url']}"
+                        dlg.format_secondary_text(details)
+                        dlg.add_button("Cancel", Gtk.ResponseType.CANCEL)
+                        dlg.add_button("Start", Gtk.ResponseType.OK)
+                        resp = dlg.run()
+                        dlg.destroy()
+                        if resp != Gtk.ResponseType.OK:
+                            return
+                    self.add_url(req['url'], fmt=fmt, qual=qual, subs_active=subs_active)
+                    if not self.is_downloading:
+                        self.on_start_downloads(None)
+                    if req.get('show') and not req.get('confirm'):
+                        # User requested no disturbance, so we do not raise the window
+                        # System notification from background.js is sufficient
                         try:
-                            self.set_urgency_hint(True)
+                            # self.present()  # DISABLE raising window
+                            self.set_urgency_hint(True)  # Just flash entry in taskbar/dock
                         except Exception:
                             pass
-                    except Exception:
-                        pass
-                    return False
-                GLib.idle_add(_bring)
-                try:
-                    conn.sendall((json.dumps({"status": "ok"}) + '\n').encode('utf-8'))
-                except Exception:
-                    pass
-                return
-            if req.get('action') == 'enqueue' and req.get('url'):
-                fmt_id = req.get('formatId')
-                fmt = fmt_id or req.get('format') or self.format_combo.get_active_text()
-                qual = "" if fmt_id else (req.get('quality') or self.quality_entry.get_text())
-                subs = req.get('subs')
+                finally:
+                    for i, label in enumerate(["Best Video + Audio", "Audio Only", "Best (default)"]):
+                        if label == prev_fmt:
+                            self.format_combo.set_active(i)
+                            break
+                    self.quality_entry.set_text(prev_qual)
+                    self.subs_check.set_active(prev_subs)
 
-                # Auto-detect generic file type from request
-                ft = req.get('fileType')
-                if ft in ('document', 'archive', 'program', 'image', 'other', 'unknown'):
-                     if not fmt_id and fmt not in ("Best Video + Audio", "Audio Only"):
-                         fmt = "Generic File"
+            GLib.idle_add(_enqueue)
+            return {"status": "queued"}
+        return {"status": "error", "message": "Invalid request"}
 
-                if isinstance(subs, str):
-                    subs_active = subs.lower().startswith('y') or subs.lower() == 'true'
-                else:
-                    subs_active = bool(subs) if subs is not None else self.subs_check.get_active()
+    def _call_on_main(self, fn, *args, timeout=30.0):
+        """Run fn on the GTK main loop and wait for its result. Not for the main thread."""
+        done = threading.Event()
+        box = {}
 
-                def _enqueue():
-                    prev_fmt = self.format_combo.get_active_text()
-                    prev_qual = self.quality_entry.get_text()
-                    prev_subs = self.subs_check.get_active()
-                    try:
-                        for i, label in enumerate(["Best Video + Audio", "Audio Only", "Best (default)"]):
-                            if label == fmt:
-                                self.format_combo.set_active(i)
-                                break
-                        self.quality_entry.set_text(qual or '')
-                        self.subs_check.set_active(subs_active)
-                        if req.get('confirm'):
-                            try:
-                                if req.get('show'):
-                                    self.present()
-                                    self.set_urgency_hint(True)
-                            except Exception:
-                                pass
-                            dlg = Gtk.MessageDialog(self, 0, Gtk.MessageType.QUESTION, Gtk.ButtonsType.NONE, "Start download?")
-                            title = req.get('title') or self.get_video_title(req['url']) or 'Unknown'
-                            details = f"Title: {title}\nFormat: {fmt}\nQuality: {qual or 'Best'}\nSubtitles: {'On' if subs_active else 'Off'}\n\nURL:\n{req['url']}"
-                            dlg.format_secondary_text(details)
-                            dlg.add_button("Cancel", Gtk.ResponseType.CANCEL)
-                            dlg.add_button("Start", Gtk.ResponseType.OK)
-                            resp = dlg.run()
-                            dlg.destroy()
-                            if resp != Gtk.ResponseType.OK:
-                                return
-                        self.add_url(req['url'], fmt=fmt, qual=qual, subs_active=subs_active)
-                        if not self.is_downloading:
-                            self.on_start_downloads(None)
-                        if req.get('show') and not req.get('confirm'):
-                            # User requested no disturbance, so we do not raise the window
-                            # System notification from background.js is sufficient
-                            try:
-                                # self.present()  # DISABLE raising window
-                                self.set_urgency_hint(True)  # Just flash entry in taskbar/dock
-                            except Exception:
-                                pass
-                    finally:
-                        for i, label in enumerate(["Best Video + Audio", "Audio Only", "Best (default)"]):
-                            if label == prev_fmt:
-                                self.format_combo.set_active(i)
-                                break
-                        self.quality_entry.set_text(prev_qual)
-                        self.subs_check.set_active(prev_subs)
-
-                GLib.idle_add(_enqueue)
-                resp = {"status": "queued"}
-            else:
-                resp = {"status": "error", "message": "Invalid request"}
-            conn.sendall((json.dumps(resp) + '\n').encode('utf-8'))
-        except Exception as e:
-            try:
-                conn.sendall((json.dumps({"status": "error", "message": str(e)}) + '\n').encode('utf-8'))
-            except Exception:
-                pass
-        finally:
+        def _run():
             try:
-                conn.close()
-            except Exception:
-                pass
+                box['result'] = fn(*args)
+            except Exception as e:
+                box['error'] = e
+            finally:
+                done.set()
+            return False
+        GLib.idle_add(_run)
+        if not done.wait(timeout):
+            raise TimeoutError("main loop did not respond")
+        if 'error' in box:
+            raise box['error']
+        return box['result']
+
+    def _enqueue_batch(self, entries):
+        """Queue normalized batch entries (see batch_entries); one result dict per entry."""
+        results = []
+        added = 0
+        for entry in entries:
+            if 'error' in entry:
+                results.append({"url": entry.get('url'), "status": "error", "message": entry['error']})
+                continue
+            url = entry['url']
+            existing = self.queue.find_url(url)
+            if existing is not None and not is_terminal(existing.status):
+                results.append({"url": url, "status": "exists", "id": existing.id})
+                continue
+            if self._is_playlist_url(url):
+                # Entries get their own ids as the listing arrives
+                self.add_playlist(url, entry['folder'], entry['category'], notify=False)
+                results.append({"url": url, "status": "expanding"})
+                continue
+            generic = entry['generic'] or (self.config.get("enable_generic", True) and self._looks_like_direct_file(url))
+            if generic:
+                item = DownloadItem(url, entry['title'] or self._guess_filename(url))
+                item.kind = 'generic'
+                item.req_format = 'Generic File'
+            else:
+                item = DownloadItem(url, entry['title'] or "Fetching title...")
+                item.kind = 'media'
+                item.req_format = entry['format']
+                item.req_quality = entry['quality']
+                item.req_subs = entry['subs']
+            item.custom_folder = entry['folder']
+            item.custom_category = entry['category']
+            self._enqueue_item(item)
+            if entry['priority'] is not None:
+                self._set_item_priority(item, entry['priority'])
+            self.resolver.submit(item, self._probe_generic_metadata if generic else None)
+            results.append({"url": url, "status": "queued", "id": item.id})
+            added += 1
+        if added and self.config.get("auto_start", True) and not self.is_downloading:
+            self.on_start_downloads(None)
+        self.update_dashboard_counts()
+        return results
 
     def process_queue(self):
         folder = os.path.expanduser(self.config["download_folder"])
@@ -1652,43 +2045,39 @@ class MainWindow(Gtk.Window):
         self.is_downloading = False
 
     def on_pause_selected(self, widget):
-        selection = self.treeview.get_selection()
-        model, treeiter = selection.get_selected()
-        if treeiter is None:
-            return
-        url = model[treeiter][0]
-        for it in self.queue:
-            if it.url == url:
-                self._pause_item(it)
-                break
+        it = self._get_selected_item()
+        if it is not None:
+            self._pause_item(it)
 
     def on_resume_selected(self, widget):
-        selection = self.treeview.get_selection()
-        model, treeiter = selection.get_selected()
-        if treeiter is None:
-            return
-        url = model[treeiter][0]
-        for it in self.queue:
-            if it.url == url:
-                self._resume_item(it)
-                break
+        it = self._get_selected_item()
+        if it is not None:
+            self._resume_item(it)
 
     def _spooler(self):
         try:
             while self.is_downloading:
                 maxc = int(self.config.get('max_concurrent', 2))
-                active = sum(1 for it in self.queue if it.process and it.process.poll() is None)
-                for it in self.queue:
-                    if active >= maxc: break
-                    if it.status in ("Queued", "Paused") and (not it.process or it.process.poll() is not None):
-                        self._start_item_download(it); active += 1
-                if active == 0 and not any(it.status in ("Queued", "Paused") for it in self.queue): break
+                self.queue.set_limits(self.config.get('per_host_limit', 0), self.config.get('host_limits'))
+                active = self.queue.prune_running(lambda it: bool(it.process and it.process.poll() is None))
+                while active < maxc:
+                    it = self.queue.pop_next()
+                    if it is None: break
+                    if it.process and it.process.poll() is None:
+                        # Still shutting down after a pause; retry on the next tick
+                        self.queue.requeue(it); break
+                    self.queue.mark_running(it)
+                    self._start_item_download(it); active += 1
+                if active == 0 and not self.queue.has_ready(): break
                 GLib.usleep(200_000)
         finally:
             self.is_downloading = False
             self.update_dashboard_counts()
 
     def _start_item_download(self, item):
+        item.run_id += 1
+        run = item.run_id
+        item.stats.restart()
         self._set_status(item, "Downloading...")
     # Use FileOrganizer to determine path
         folder = os.path.expanduser(self.config["download_folder"])
@@ -1770,7 +2159,7 @@ class MainWindow(Gtk.Window):
                     out_name = self._guess_filename(item.url)
                     gid = self._aria2_add_uri(item.url, folder, out_name)
                     item.gid = gid
-                    threading.Thread(target=self._aria2_poll_item, args=(item,), daemon=True).start()
+                    self._aria2_watch(item)
                     return
                 except Exception as e:
                     print(f"[aria2rpc] fallback to process: {e}")
@@ -1798,10 +2187,12 @@ class MainWindow(Gtk.Window):
                     )
                     if success:
                         self._set_status(item, "Completed")
-                        self.append_history(item.title, item.url, "Completed", output_path)
+                        self.append_history(item.title, item.url, "Completed", output_path,
+                                            **self._transfer_info(item, "rust"))
                     else:
                         self._set_status(item, "Failed")
-                        self.append_history(item.title, item.url, "Failed", output_path)
+                        self.append_history(item.title, item.url, "Failed", output_path,
+                                            **self._transfer_info(item, "rust"))
                     return
                 except Exception as e:
                     print(f"[Rust engine failed]: {e}, fallback to aria2c")
@@ -1809,6 +2200,8 @@ class MainWindow(Gtk.Window):
             # Fallback to aria2c command
             cmd = ["aria2c", "-x", str(aria_conn), "-s", str(aria_splits), "-k", "1M", "--min-split-size=1M", "--file-allocation=none"] + speed_arg + ["-d", folder, "-o", out_name, item.url]
         else:
+            if self._start_worker_download(item, folder, fmt, qual, subs_flag):
+                return
             # For yt-dlp, we pass 'flat' to category_mode because we already determined the folder
             cmd = [
                 FAST_YTDL, item.url, folder,
@@ -1822,59 +2215,134 @@ class MainWindow(Gtk.Window):
                 "flat"  # Force flat mode in script since we handled organization here
             ]
         print("[Downloader]", " ".join(cmd))
-        def _reader(proc, it):
-            for line in iter(proc.stdout.readline, ""):
-                line = line.strip()
-                if line:
-                    print(f"[DL:{it.url[:20]}] {line}")
+        backend = "aria2c" if cmd[0] == "aria2c" else "fast_ytdl"
+        env = None
+        if backend == "fast_ytdl":
+            # fast_ytdl.sh hands this on to ytdl_worker.py --once
+            env = dict(os.environ, PY_ENV_PROGRESS_HZ=str(self.config.get("progress_hz", 4)))
+
+        def _on_lines(lines, it=item):
+            for line in lines:
+                print(f"[DL:{it.url[:20]}] {line}")
                 self._parse_item_progress(line, it)
-                # Modern popup update automatically strictly via update_status/progress text logic
+
+        def _on_eof(proc, it=item):
+            # IoLoop thread: only release the pipe, the rest must not block it
+            proc.stdout.close()
+            self._off_loop(_finish, proc, it)
+
+        def _finish(proc, it):
+            # stdout closes as the child exits, so this wait is short
             proc.wait()
-            if it.status == "Paused":
+            if it.run_id != run or it.status == "Paused":
+                # Paused, or paused and already restarted: this run's result is stale
                 return
             if proc.returncode == 0:
                 self._set_status(it, "Completed")
-                self.append_history(it.title, it.url, "Completed", it.dest_path or "")
+                self.append_history(it.title, it.url, "Completed", it.dest_path or "",
+                                    **self._transfer_info(it, backend))
             else:
                 self._set_status(it, "Failed")
-                self.append_history(it.title, it.url, "Failed", it.dest_path or "")
+                self.append_history(it.title, it.url, "Failed", it.dest_path or "",
+                                    **self._transfer_info(it, backend))
         try:
-            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, universal_newlines=True)
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
             item.process = proc
-            threading.Thread(target=_reader, args=(proc, item), daemon=True).start()
+            self.io.add(proc.stdout.fileno(), _on_lines, lambda p=proc: _on_eof(p))
         except Exception as e:
             self._set_status(item, f"Error: {e}")
-            self.append_history(item.title, item.url, f"Error: {e}", item.dest_path or "")
+            self.append_history(item.title, item.url, f"Error: {e}", item.dest_path or "", backend=backend)
 
-    def _set_status(self, item, status):
-        item.status = status
-        if item.treeiter:
-            GLib.idle_add(self.liststore.set, item.treeiter, 4, status)
-        try:
-            idx = self.queue.index(item)
-        except ValueError:
-            idx = None
-            
-        # Modern Popup Logic
-        if status == "Downloading..." and idx is not None:
-             GLib.idle_add(self._update_modern_popup, item)
-        elif status in ("Completed", "Failed", "Paused") and idx is not None:
-             GLib.idle_add(self._hide_modern_popup_if_item, item)
-             
-        self.update_dashboard_counts()
-        if status in ("Completed", "Failed"):
-            # Stream terminal status to native client and close connection
-            try:
-                self._stream_client_update(item, {
-                    "status": "finished" if status == "Completed" else "error",
-                    "url": item.url,
-                    "title": item.title
-                }, close_after=True)
-            except Exception:
-                pass
+    def _start_worker_download(self, item, folder, fmt, qual, subs_flag):
+        """Hand a media download to a warm worker. False if no worker is available."""
+        worker = self.workers.acquire()
+        if worker is None:
+            return False
+        speed_limit = str(self.config.get("speed_limit_kbps") or "")
+        job = {
+            "url": item.url,
+            "base_dir": folder,
+            "outtmpl": "%(title)s.%(ext)s",
+            "format": fmt,
+            "quality": qual,
+            "subs": subs_flag,
+            "speed_arg": f"--max-overall-download-limit={speed_limit}K" if speed_limit.isdigit() else "",
+            "aria_conn": self.config.get("aria_connections", 32),
+            "aria_splits": self.config.get("aria_splits", 32),
+            "frag_conc": self.config.get("fragment_concurrency", 16),
+            "parallel_streams": bool(self.config.get("parallel_streams", True)),
+            "defer_postprocess": bool(self.config.get("defer_postprocess", True)) and ffmpeg_available(),
+            "progress_hz": self.config.get("progress_hz", 4),
+        }
+        print(f"[Downloader] worker {worker.proc.pid}: {item.url}")
+        item.process = worker.proc
+        item.pp_tasks = []
+        run = item.run_id
+
+        def _on_line(line):
+            if line:
+                print(f"[DL:{item.url[:20]}] {line}")
+            self._parse_item_progress(line, item)
+
+        def _on_done(rc):
+            # The worker outlives the job, so it must no longer count as this item's process,
+            # unless the item was paused and restarted and the process is a newer run's
+            if item.run_id == run:
+                item.process = None
+            self._off_loop(_finish, rc)
+
+        def _finish(rc):
+            # Releasing may recycle (kill and reap) the worker
+            self.workers.release(worker)
+            if item.run_id != run or item.status == "Paused":
+                return
+            if rc == 0 and item.pp_tasks:
+                # Download slot is free again; ffmpeg work waits for a CPU slot
+                self._set_status(item, "Processing...")
+                self.postprocessor.submit(item, item.pp_tasks, self._on_postprocess_done, item.dest_path)
+            elif rc == 0:
+                self._set_status(item, "Completed")
+                self.append_history(item.title, item.url, "Completed", item.dest_path or "",
+                                    **self._transfer_info(item, "yt-dlp"))
+            else:
+                self._set_status(item, "Failed")
+                self.append_history(item.title, item.url, "Failed", item.dest_path or "",
+                                    **self._transfer_info(item, "yt-dlp"))
+        if not worker.start(job, _on_line, lambda ev: self._handle_event(item, ev), _on_done):
+            item.process = None
+            self.workers.release(worker)
+            return False
+        return True
+
+    def _on_postprocess_done(self, item, ok, final_path, error):
+        if final_path and final_path != item.dest_path:
+            item.dest_path = final_path
+            if self.journal and item in self.queue:
+                self.journal.record_dest(item, final_path)
+        if ok:
+            self._set_status(item, "Completed")
+            self.append_history(item.title, item.url, "Completed", item.dest_path or "",
+                                **self._transfer_info(item, "yt-dlp"))
         else:
-            GLib.idle_add(self._add_or_update_big_row, item)
-        GLib.idle_add(self._update_big_counts)
+            print(f"[postprocess] {item.url}: {error}")
+            self._set_status(item, f"Error: {error}")
+            self.append_history(item.title, item.url, "Failed", item.dest_path or "",
+                                **self._transfer_info(item, "yt-dlp"))
+
+    def _set_status(self, item, status):
+        if status == "Completed" and getattr(item, 'kind', 'media') == 'media':
+            key = item.archive_key or archive_key(item.url)
+            if key:
+                self.archive.add(*key)
+        self.queue.set_status(item, status)
+        in_queue = item in self.queue
+        if self.journal and in_queue:
+            self.journal.record_status(item, status)
+        self.ui_updates.mark(item, "status")
+        # Only completion paths get here with a terminal status; push it to subscribed control clients
+        final = terminal_event(status, url=item.url, title=item.title)
+        if final is not None:
+            self._stream_client_update(item, final)
         try:
             if _HAS_NOTIFY and status in ("Completed", "Failed"):
                 Notify.init("FastTube Downloader")
@@ -1883,7 +2351,61 @@ class MainWindow(Gtk.Window):
         except Exception:
             pass
 
+    def _show_live_status(self, item, status):
+        """Show a mid-run message (tool ERROR/WARNING lines) without ending the item.
+
+        yt-dlp reports errors for formats it then falls back from, so these are
+        neither journaled nor pushed; the run's completion sets the real status.
+        """
+        self.queue.set_status(item, status)
+        self.ui_updates.mark(item, "status")
+
+    def _off_loop(self, fn, *args):
+        """Run fn on the finisher thread; for IoLoop handlers, which must not block."""
+        def _run():
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[finish] {getattr(fn, '__name__', fn)} failed: {e}")
+        self._finisher.submit(_run)
+
+    def _handle_event(self, item, ev):
+        """Apply one structured worker event (see progress_protocol.py) to an item."""
+        kind = ev.get('ev')
+        if kind == 'progress':
+            done = int(ev.get('downloaded') or 0)
+            item.stats.update(done=done, total=ev.get('total') or None)
+            item.stats.hint(speed=ev.get('speed'), eta=ev.get('eta'))
+            pct = int(event_percent(ev))
+            if done and self.journal:
+                self.journal.record_bytes(item, done, pct)
+            self._update_item_progress(item, pct)
+        elif kind == 'title':
+            title = (ev.get('title') or '').strip()
+            if title and title != 'Unknown' and title != item.title:
+                self._update_item_title(item, title)
+        elif kind == 'file':
+            path = ev.get('path')
+            if path and path != item.dest_path:
+                item.dest_path = path
+                if self.journal:
+                    self.journal.record_dest(item, path)
+        elif kind == 'postprocess':
+            if isinstance(ev.get('task'), dict):
+                item.pp_tasks.append(ev['task'])
+        elif kind == 'error':
+            print(f"[DL:{item.url[:20]}] ERROR: {ev.get('message')}")
+            self._off_loop(self._show_live_status, item, f"Error: {ev.get('message') or 'Error'}")
+        elif kind == 'retry':
+            print(f"[DL:{item.url[:20]}] trying format {ev.get('format')}")
+
     def _parse_item_progress(self, line, item):
+        if line.startswith("POSTPROCESS:"):
+            try:
+                item.pp_tasks.append(json.loads(line.split(":", 1)[1]))
+            except ValueError:
+                pass
+            return
         for marker in ("PROGRESS:", "TITLE:", "META:", "FILE:"):
             if marker in line and not line.startswith(marker):
                 seg = marker + line.split(marker, 1)[1]
@@ -1896,16 +2418,14 @@ class MainWindow(Gtk.Window):
                 msg = line.split(":",1)[1].strip()
             except Exception:
                 msg = "Error"
-            self._set_status(item, f"Error: {msg}")
-            GLib.idle_add(self._add_or_update_big_row, item)
+            self._off_loop(self._show_live_status, item, f"Error: {msg}")
             return
         if line.startswith("WARN:") or line.startswith("WARNING:"):
             try:
                 msg = line.split(":",1)[1].strip()
             except Exception:
                 msg = "Warning"
-            self._set_status(item, f"Warning: {msg}")
-            GLib.idle_add(self._add_or_update_big_row, item)
+            self._off_loop(self._show_live_status, item, f"Warning: {msg}")
         if line.startswith("META:"):
             try:
                 parts = line.split(":", 1)[1].strip().split()
@@ -1916,6 +2436,9 @@ class MainWindow(Gtk.Window):
                         elif k == 'eta': item.eta = v
                         elif k == 'total': item.total = v
                         elif k == 'downloaded': item.downloaded = v
+                done = item.stats.done
+                if done and self.journal:
+                    self.journal.record_bytes(item, done, item.progress)
                 # Trigger update
                 self._update_item_progress(item, item.progress)
             except Exception:
@@ -1929,6 +2452,18 @@ class MainWindow(Gtk.Window):
                 return
             except Exception:
                 pass
+        if line.startswith("TITLE:"):
+            title = line.split(":", 1)[1].strip()
+            if title and title != 'Unknown' and title != item.title:
+                self._update_item_title(item, title)
+            return
+        if line.startswith("FILE:"):
+            path = line.split(":", 1)[1].strip()
+            if path and path != item.dest_path:
+                item.dest_path = path
+                if self.journal:
+                    self.journal.record_dest(item, path)
+            return
         if line.startswith("[download]"):
             try:
                 # Standard yt-dlp output: [download]  12.3% of 10.00MiB at 1.23MiB/s ETA 00:05
@@ -2010,132 +2545,150 @@ class MainWindow(Gtk.Window):
         result = self._aria2_rpc_call('aria2.addUri', [[url], opts])
         return result
 
-    def _aria2_poll_item(self, item):
+    def _aria2_watch(self, item):
+        """Track an RPC download; one poller thread serves all of them."""
+        with self._aria2_lock:
+            self._aria2_items[item.gid] = item
+            if self._aria2_polling:
+                return
+            self._aria2_polling = True
+        threading.Thread(target=self._aria2_poller, daemon=True).start()
+
+    def _aria2_poller(self):
+        keys = ["status", "completedLength", "totalLength", "downloadSpeed"]
         try:
-            while item.status in ("Queued", "Downloading...") and item.gid and self.config.get('aria2_rpc_enabled', False):
+            while True:
+                with self._aria2_lock:
+                    for gid, it in list(self._aria2_items.items()):
+                        if it.gid != gid or it.status not in ("Queued", "Downloading..."):
+                            del self._aria2_items[gid]
+                    items = list(self._aria2_items.items())
+                    if not items or not self.config.get('aria2_rpc_enabled', False):
+                        self._aria2_items.clear()
+                        self._aria2_polling = False
+                        return
+                # One round trip for every active download
+                calls = [{"methodName": "aria2.tellStatus", "params": [gid, keys]} for gid, _ in items]
                 try:
-                    st = self._aria2_rpc_call('aria2.tellStatus', [item.gid, ["status", "completedLength", "totalLength", "downloadSpeed"]])
+                    results = self._aria2_rpc_call('system.multicall', [calls]) or []
                 except Exception:
-                    st = None
-                if not st:
-                    break
-                status = st.get('status','')
-                comp = st.get('completedLength') or '0'
-                total = st.get('totalLength') or '0'
-                try:
-                    comp_i = int(comp)
-                    total_i = int(total) if total.isdigit() else 0
-                    if total_i > 0:
-                        pct = int((comp_i/total_i)*100)
-                        item.downloaded = self._human_bytes(self._bytes_to_str(comp_i))
-                        item.total = self._human_bytes(self._bytes_to_str(total_i))
-                        self._update_item_progress(item, pct)
-                except Exception:
-                    pass
-                spd = st.get('downloadSpeed')
-                if spd and spd.isdigit():
-                    item.speed = self._human_bytes(self._bytes_to_str(int(spd))) + '/s'
-                self._update_progress_text(item)
-                if status == 'complete':
-                    self._set_status(item, 'Completed')
-                    break
-                if status == 'error':
-                    self._set_status(item, 'Failed')
-                    break
-                if item.status == 'Paused':
-                    break
+                    results = []
+                for (gid, it), res in zip(items, results):
+                    st = res[0] if isinstance(res, list) and res else None
+                    if not st:
+                        with self._aria2_lock:
+                            self._aria2_items.pop(gid, None)
+                        continue
+                    self._aria2_apply_status(it, st)
                 time.sleep(1.0)
         except Exception:
-            pass
+            with self._aria2_lock:
+                self._aria2_polling = False
 
-    def _bytes_to_str(self, val: int) -> str:
+    def _aria2_apply_status(self, item, st):
+        status = st.get('status','')
+        comp = st.get('completedLength') or '0'
+        total = st.get('totalLength') or '0'
         try:
-            units = ['B','KiB','MiB','GiB','TiB']
-            v = float(val)
-            u = 0
-            while v >= 1024 and u < len(units)-1:
-                v /= 1024.0; u += 1
-            return f"{v:.1f}{units[u]}"
+            comp_i = int(comp)
+            total_i = int(total) if total.isdigit() else 0
+            item.stats.update(done=comp_i, total=total_i or None)
+            if self.journal and comp_i:
+                self.journal.record_bytes(item, comp_i, item.progress)
+            if total_i > 0:
+                self._update_item_progress(item, int(item.stats.percent))
         except Exception:
-            return ''
+            pass
+        spd = st.get('downloadSpeed')
+        if spd and spd.isdigit():
+            item.stats.hint(speed=int(spd))
+        self._update_progress_text(item)
+        if status == 'complete':
+            self._set_status(item, 'Completed')
+        elif status == 'error':
+            self._set_status(item, 'Failed')
 
     def _update_item_progress(self, item, progress):
         item.progress = progress
-        if item.treeiter is None:
-            return
-        dots = '.' * ((progress // 5) % 3 + 1)
-        size_str = f"{item.downloaded}/{item.total}" if item.total else item.downloaded
-        GLib.idle_add(self.liststore.set, item.treeiter, 2, int(progress), 5, item.speed or "", 6, item.eta or "", 7, size_str or "")
-        self._update_progress_text(item)
-        # Stream progress to native client if attached
-        try:
-            self._stream_client_update(item, {
-                "status": "progress",
-                "percent": int(progress),
-                "url": item.url,
-                "title": item.title
-            })
-        except Exception:
-            pass
-        if self._mini_popup is not None and self._mini_idx is not None:
-            def _upd_bar():
-                try:
-                    try:
-                        idx = self.queue.index(item)
-                    except ValueError:
-                        return False
-                    if self._mini_popup is None or self._mini_idx != idx:
-                        return False
-                    bar = self._mini_popup.get_child().get_children()[1]
-                    bar.set_fraction(max(0.0, min(1.0, progress/100.0)))
-                    bar.set_text(f"{int(progress)}%")
-                except Exception:
-                    pass
-                return False
-            GLib.idle_add(_upd_bar)
+        self.ui_updates.mark(item, "progress")
+
+    def _flush_ui_updates(self, dirty):
+        """Repaint everything marked since the last frame (main loop, via ui_updates)."""
+        status_changed = progress_changed = False
+        for item, kinds in dirty.items():
+            if "title" in kinds:
+                self._paint_item_title(item)
+            if "progress" in kinds:
+                progress_changed = True
+                self._paint_item_progress(item)
+                if item in self._big_rows and "status" not in kinds:
+                    self._add_or_update_big_row(item)
+            if "status" in kinds:
+                status_changed = True
+                self._paint_item_status(item)
+        if status_changed:
+            self.update_dashboard_counts()
+        if status_changed or progress_changed:
+            self._update_big_counts()
+
+    def _paint_item_progress(self, item):
+        progress = int(item.progress or 0)
+        if item.treeiter is not None:
+            size_str = f"{item.downloaded}/{item.total}" if item.total else item.downloaded
+            self.liststore.set(item.treeiter, 2, progress, 5, item.speed or "", 6, item.eta or "", 7, size_str or "")
+        text = self._compose_progress_summary(item)
+        if item.treeiter is not None:
+            self.liststore.set(item.treeiter, 3, text)
+        # Stream progress to subscribed control clients (latest state wins for slow readers)
+        self._stream_client_update(item, {
+            "status": "progress",
+            "percent": progress,
+            "url": item.url,
+            "title": item.title
+        }, kind="progress")
+        if self._mini_popup is not None and self._mini_item is item:
+            try:
+                if self._mini_status_lbl is not None:
+                    self._mini_status_lbl.set_text(text)
+                bar = self._mini_popup.get_child().get_children()[1]
+                bar.set_fraction(max(0.0, min(1.0, progress/100.0)))
+                bar.set_text(f"{progress}%")
+            except Exception:
+                pass
 
-    def _stream_client_update(self, item, obj: dict, close_after: bool = False):
-        conn = getattr(item, 'client_conn', None)
-        if conn is None:
-            return
-        try:
-            payload = dict(obj)
-            if getattr(item, 'client_req_id', None) is not None:
-                payload['requestId'] = item.client_req_id
-            conn.sendall((json.dumps(payload) + '\n').encode('utf-8'))
-        except Exception:
-            pass
-        finally:
-            if close_after:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
-                try:
-                    item.client_conn = None
-                except Exception:
-                    pass
+    def _paint_item_status(self, item):
+        status = item.status
+        if item.treeiter:
+            self.liststore.set(item.treeiter, 4, status)
+        in_queue = item in self.queue
+        # Modern Popup Logic
+        if status == "Downloading..." and in_queue:
+            self._update_modern_popup(item)
+        elif status in ("Completed", "Failed", "Paused") and in_queue:
+            self._hide_modern_popup_if_item(item)
+        if status not in ("Completed", "Failed"):
+            self._add_or_update_big_row(item)
+
+    def _paint_item_title(self, item):
+        if item.treeiter is not None:
+            self.liststore.set(item.treeiter, 1, item.title)
+        if self._mini_popup is not None and self._mini_item is item:
+            try:
+                header = self._mini_popup.get_child().get_children()[0]
+                header.set_text(item.title)
+            except Exception:
+                pass
+
+    def _stream_client_update(self, item, obj: dict, kind: str = "status"):
+        control = getattr(self, 'control', None)
+        if control is not None:
+            control.publish(item.id, dict(obj, event=obj.get("status"), id=item.id), kind=kind)
 
     def _update_item_title(self, item, title):
         item.title = title
-        if item.treeiter is None:
-            return
-        GLib.idle_add(self.liststore.set, item.treeiter, 1, title)
-        if self._mini_popup is not None and self._mini_idx is not None:
-            def _upd_title():
-                try:
-                    try:
-                        idx = self.queue.index(item)
-                    except ValueError:
-                        return False
-                    if self._mini_popup is None or self._mini_idx != idx:
-                        return False
-                    header = self._mini_popup.get_child().get_children()[0]
-                    header.set_text(title)
-                except Exception:
-                    pass
-                return False
-            GLib.idle_add(_upd_title)
+        if self.journal and item in self.queue:
+            self.journal.record_title(item, title)
+        self.ui_updates.mark(item, "title")
 
     def parse_progress(self, line, idx):
         for marker in ("PROGRESS:", "TITLE:", "META:", "FILE:"):
@@ -2176,13 +2729,12 @@ class MainWindow(Gtk.Window):
                 pass
         try:
             if '%' in line and '(' in line and ')' in line and '[' in line:
-                import re as _re
-                pm = _re.search(r"\((\d+(?:\.\d+)?)%\)", line)
+                pm = ARIA_PERCENT.search(line)
                 if pm:
                     self.update_progress(idx, int(float(pm.group(1))))
-                sm = _re.search(r"DL:([^\] ]+)", line)
-                em = _re.search(r"ETA:([0-9:]+)", line)
-                dtm = _re.search(r"\s([0-9.]+[A-Za-z]+)\/((?:N\/A)|[0-9.]+[A-Za-z]+)\(", line)
+                sm = ARIA_SPEED.search(line)
+                em = ARIA_ETA.search(line)
+                dtm = ARIA_SIZES.search(line)
                 it = self.queue[idx]
                 if sm:
                     it.speed = sm.group(1)
@@ -2191,16 +2743,13 @@ class MainWindow(Gtk.Window):
                 if dtm:
                     it.downloaded = dtm.group(1)
                     it.total = dtm.group(2)
-                prog = f"{it.progress}%"
-                extra = " ".join([s for s in [it.speed or '', it.eta or ''] if s])
-                if extra and it.treeiter is not None:
-                    GLib.idle_add(self.liststore.set, it.treeiter, 3, f"{prog} • {extra}")
+                if sm or em or dtm:
+                    self.ui_updates.mark(it, "progress")
         except Exception:
             pass
         if "[download]" in line and "%" in line:
             try:
-                import re as _re
-                m = _re.search(r"(\d+(?:\.\d+)?)%", line)
+                m = PERCENT.search(line)
                 if m:
                     self.update_progress(idx, int(float(m.group(1))))
             except Exception:
@@ -2240,38 +2789,16 @@ class MainWindow(Gtk.Window):
                 pass
 
     def update_progress(self, idx, progress):
-        self.queue[idx].progress = progress
-        item = self.queue[idx]
-        if item.treeiter is None:
-            return
-        dots = '.' * ((progress // 5) % 3 + 1)
-        GLib.idle_add(self.liststore.set, item.treeiter, 2, int(progress))
-        self._update_progress_text(item)
-        if self._mini_idx == idx and self._mini_popup is not None:
-            try:
-                bar = self._mini_popup.get_child().get_children()[1]
-                bar.set_fraction(max(0.0, min(1.0, progress/100.0)))
-                bar.set_text(f"{int(progress)}%")
-            except Exception:
-                pass
-
-    def _human_bytes(self, val):
-        try:
-            if not val: return ''
-            return val
-        except Exception:
-            return ''
+        self._update_item_progress(self.queue[idx], progress)
 
     def _compose_progress_summary(self, item):
         pct = f"{item.progress}%"
+        st = item.stats
         size_part = ''
-        try:
-            if item.downloaded or item.total:
-                size_part = f"{self._human_bytes(item.downloaded)}/{self._human_bytes(item.total)}".strip('/')
-        except Exception:
-            size_part = ''
-        speed_part = item.speed or ''
-        eta_part = item.eta or ''
+        if st.done or st.total:
+            size_part = f"{format_bytes(st.done) if st.done else ''}/{format_bytes(st.total) if st.total else ''}".strip('/')
+        speed_part = format_speed(st.speed)
+        eta_part = format_eta(st.eta)
         pieces = [pct]
         if size_part:
             pieces.append(size_part)
@@ -2282,41 +2809,24 @@ class MainWindow(Gtk.Window):
         return ' • '.join(pieces)
 
     def _update_progress_text(self, item):
-        try:
-            text = self._compose_progress_summary(item)
-            if item.treeiter is not None:
-                GLib.idle_add(self.liststore.set, item.treeiter, 3, text)
-            if self._mini_popup is not None and self._mini_idx is not None:
-                try:
-                    if self.queue[self._mini_idx] is item and self._mini_status_lbl is not None:
-                        GLib.idle_add(self._mini_status_lbl.set_text, text)
-                except Exception:
-                    pass
-        except Exception:
-            pass
+        self.ui_updates.mark(item, "progress")
 
     def update_title(self, idx, title):
-        self.queue[idx].title = title
         item = self.queue[idx]
-        if item.treeiter is None:
-            return
-        GLib.idle_add(self.liststore.set, item.treeiter, 1, title)
-        if self._mini_idx == idx and self._mini_popup is not None:
-            try:
-                header = self._mini_popup.get_child().get_children()[0]
-                header.set_text(title)
-            except Exception:
-                pass
+        item.title = title
+        if self.journal:
+            self.journal.record_title(item, title)
+        self.ui_updates.mark(item, "title")
 
     def update_status(self, idx, status):
-        self.queue[idx].status = status
         item = self.queue[idx]
+        self.queue.set_status(item, status)
         if item.treeiter is None:
             return
         GLib.idle_add(self.liststore.set, item.treeiter, 4, status)
         if status == "Downloading...":
             GLib.idle_add(self._show_mini_popup, idx)
-        if status in ("Completed", "Failed") and self._mini_idx == idx:
+        if status in ("Completed", "Failed") and self._mini_item is item:
             GLib.idle_add(self._hide_mini_popup)
         self.update_dashboard_counts()
         try:
@@ -2387,7 +2897,7 @@ class MainWindow(Gtk.Window):
                     self._mini_title_lbl.set_text(item.title)
                 if self._mini_status_lbl is not None:
                     self._mini_status_lbl.set_text(self._compose_progress_summary(item))
-            self._mini_idx = idx
+            self._mini_item = item
             self._mini_popup.show_all()
             try:
                 self._mini_popup.present()
@@ -2417,7 +2927,7 @@ class MainWindow(Gtk.Window):
                 self._mini_popup.hide()
             except Exception:
                 pass
-            self._mini_idx = None
+            self._mini_item = None
             self._mini_title_lbl = None
             self._mini_status_lbl = None
             self._mini_progress_bar = None
@@ -2454,8 +2964,25 @@ class MainWindow(Gtk.Window):
         vbox.pack_start(controls, False, False, 0)
         sc = Gtk.ScrolledWindow()
         sc.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
-        listbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
-        sc.add(listbox)
+        # One model row per item; the view only renders the rows that are on screen
+        store = Gtk.ListStore(object, str, int, str, str)  # item, title/status markup, progress, bar text, action
+        tree = Gtk.TreeView(model=store)
+        tree.set_headers_visible(False)
+        tree.set_fixed_height_mode(True)
+        tree.get_style_context().add_class("rowbox")
+        for title, renderer, attrs, width in (
+            ("Download", Gtk.CellRendererText(ellipsize=Pango.EllipsizeMode.END), {"markup": 1}, 330),
+            ("Progress", Gtk.CellRendererProgress(), {"value": 2, "text": 3}, 140),
+            ("Action", Gtk.CellRendererText(foreground="#7fb4ff", xalign=0.5), {"text": 4}, 70),
+        ):
+            col = Gtk.TreeViewColumn(title, renderer, **attrs)
+            col.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            col.set_fixed_width(width)
+            col.set_expand(title == "Download")
+            tree.append_column(col)
+        self._big_action_col = tree.get_column(2)
+        tree.connect("button-press-event", self._on_big_row_click)
+        sc.add(tree)
         vbox.pack_start(sc, True, True, 0)
         win.add(vbox)
         css = Gtk.CssProvider()
@@ -2463,78 +2990,47 @@ class MainWindow(Gtk.Window):
         vbox.get_style_context().add_class("big-popup")
         Gtk.StyleContext.add_provider_for_screen(Gdk.Screen.get_default(), css, Gtk.STYLE_PROVIDER_PRIORITY_USER)
         self._big_popup = win
-        self._big_list = listbox
+        self._big_store = store
         self._update_big_counts()
 
     def _add_or_update_big_row(self, item):
         self._ensure_big_popup()
-        row = self._big_rows.get(item)
-        if not row:
-            box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
-            box.get_style_context().add_class("rowbox")
-            title = Gtk.Label(label=item.title or item.url)
-            title.set_halign(Gtk.Align.START)
-            title.get_style_context().add_class("rowtitle")
-            status = Gtk.Label(label=self._compose_progress_summary(item))
-            status.set_halign(Gtk.Align.START)
-            status.get_style_context().add_class("rowstatus")
-            hb = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
-            bar = Gtk.ProgressBar()
-            bar.set_show_text(True)
-            pb = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
-            btn_pause = Gtk.Button(label="Pause")
-            btn_resume = Gtk.Button(label="Start")
-            btn_pause.connect("clicked", lambda _b, it=item: self._pause_item(it))
-            btn_resume.connect("clicked", lambda _b, it=item: self._resume_item(it))
-            pb.pack_start(btn_pause, False, False, 0)
-            pb.pack_start(btn_resume, False, False, 0)
-            hb.pack_start(bar, True, True, 0)
-            hb.pack_end(pb, False, False, 0)
-            box.pack_start(title, False, False, 0)
-            box.pack_start(status, False, False, 0)
-            box.pack_start(hb, False, False, 0)
-            self._big_list.pack_start(box, False, False, 0)
-            self._big_rows[item] = {
-                'box': box,
-                'title': title,
-                'status': status,
-                'bar': bar,
-                'pause': btn_pause,
-                'resume': btn_resume
-            }
-            self._big_popup.show_all()
-        else:
-            box = row['box']
-            title = row['title']
-            status = row['status']
-            bar = row['bar']
-            btn_pause = row['pause']
-            btn_resume = row['resume']
-        row = self._big_rows[item]
-        row['title'].set_text(item.title or item.url)
-        row['status'].set_text(self._compose_progress_summary(item))
-        row['bar'].set_fraction(max(0.0, min(1.0, (item.progress or 0)/100.0)))
-        row['bar'].set_text(f"{int(item.progress or 0)}%")
-        
-        if item.status == "Downloading...":
-            row['bar'].get_style_context().add_class("pulse")
+        if self._big_store is None:
+            return
+        running = bool(item.process and item.process.poll() is None)
+        title = GLib.markup_escape_text(item.title or item.url)
+        summary = GLib.markup_escape_text(f"{item.status} • {self._compose_progress_summary(item)}")
+        values = (f"<b>{title}</b>\n<small>{summary}</small>", max(0, min(100, int(item.progress or 0))),
+                  f"{int(item.progress or 0)}%", "Pause" if running else "Start")
+        it = self._big_rows.get(item)
+        if it is None:
+            self._big_rows[item] = self._big_store.append((item,) + values)
+            if not self._big_popup.get_visible():
+                self._big_popup.show_all()
         else:
-            row['bar'].get_style_context().remove_class("pulse")
+            self._big_store.set(it, (1, 2, 3, 4), values)
 
-        running = bool(item.process and item.process.poll() is None)
-        row['pause'].set_sensitive(running)
-        row['resume'].set_sensitive(not running)
-        self._update_big_counts()
+    def _on_big_row_click(self, tree, event):
+        if event.button != 1:
+            return False
+        hit = tree.get_path_at_pos(int(event.x), int(event.y))
+        if not hit or hit[1] is not self._big_action_col:
+            return False
+        item = self._big_store[hit[0]][0]
+        if item.process and item.process.poll() is None:
+            self._pause_item(item)
+        else:
+            self._resume_item(item)
+        return True
 
     def _remove_big_row(self, item):
-        row = getattr(self, '_big_rows', {}).get(item)
-        if not row:
+        it = getattr(self, '_big_rows', {}).pop(item, None)
+        if it is None:
             return
         try:
-            self._big_list.remove(row['box'])
+            self._big_store.remove(it)
         except Exception:
             pass
-        self._big_rows.pop(item, None)
         if self._big_rows == {} and getattr(self, '_big_popup', None):
             try:
                 self._big_popup.hide()
@@ -2545,10 +3041,15 @@ class MainWindow(Gtk.Window):
     def _update_big_counts(self):
         if not getattr(self, '_big_header_label', None):
             return
-        queued = sum(1 for it in self.queue if it.status == 'Queued')
-        active = sum(1 for it in self.queue if it.status == 'Downloading...')
-        paused = sum(1 for it in self.queue if it.status == 'Paused')
+        queued = self.queue.count('Queued')
+        active = self.queue.count('Downloading...')
+        paused = self.queue.count('Paused')
         text = f"Active: {active} | Paused: {paused} | Queue: {queued}"
+        total = aggregate_stats(it.stats for it in self.queue.running())
+        if total['speed']:
+            text += f" | {format_speed(total['speed'])}"
+            if total['eta'] is not None:
+                text += f" (ETA {format_eta(total['eta'])})"
         try:
             self._big_header_label.set_text(text)
         except Exception:
@@ -2605,6 +3106,9 @@ class MainWindow(Gtk.Window):
     def clear_queue(self, widget):
         self.liststore.clear()
         self.queue.clear()
+        self.resolver.clear()
+        if self.journal:
+            self.journal.record_clear()
         for item in list(getattr(self, '_big_rows', {}).keys()):
             self._remove_big_row(item)
         self._update_big_counts()
@@ -2616,10 +3120,18 @@ class MainWindow(Gtk.Window):
         dialog.destroy()
 
     def quit_app(self, widget=None):
+        self.control.stop()
+        self.resolver.stop()
+        self.workers.shutdown()
+        self.postprocessor.shutdown()
+        self._finisher.shutdown(wait=False)
         if self.is_downloading:
             for item in self.queue:
                 if item.process:
                     item.process.terminate()
+        self._compact_journal()
+        if self.journal:
+            self.journal.close()
         Gtk.main_quit()
 
 def run_app():
@@ -0,0 +1,110 @@
+"""
+Bounded worker pool for resolving metadata of enqueued items.
+
+Replaces one-thread-per-item title lookups: a fixed number of worker
+threads pull items from a heap ordered by queue position, so adding a
+large playlist never starts more than `workers` yt-dlp lookups at once and
+the items that will download first get their titles first.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def queue_order(item) -> Tuple:
+    """Default ordering: same as the download queue dispatch order."""
+    return (-getattr(item, 'priority', 0), getattr(item, 'queue_seq', 0))
+
+
+class ResolverPool:
+    """Fixed-size pool of daemon threads running metadata lookups"""
+
+    def __init__(self, resolve: Callable, workers: int = 4, order_key: Callable = queue_order):
+        """
+        Args:
+            resolve: Default callable invoked as resolve(item) on a worker thread
+            workers: Maximum number of concurrent lookups
+            order_key: Sort key; items with the smallest key are resolved first
+        """
+        self.resolve = resolve
+        self.workers = max(1, int(workers))
+        self.order_key = order_key
+        self._cond = threading.Condition()
+        self._heap: List = []
+        self._pending: Dict[int, Tuple[object, Callable]] = {}
+        self._seq = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._busy = 0
+        self._stopped = False
+
+    def submit(self, item, func: Optional[Callable] = None) -> None:
+        """Schedule func(item) (default: resolve(item)); duplicates are ignored."""
+        with self._cond:
+            if self._stopped or id(item) in self._pending:
+                return
+            self._pending[id(item)] = (item, func or self.resolve)
+            heapq.heappush(self._heap, (self.order_key(item), next(self._seq), item))
+            if len(self._threads) < self.workers and self._busy + len(self._heap) > len(self._threads):
+                t = threading.Thread(target=self._worker, name=f"resolver-{len(self._threads)}", daemon=True)
+                self._threads.append(t)
+                t.start()
+            self._cond.notify()
+
+    def bump(self, item) -> None:
+        """Re-evaluate the position of a pending item (e.g. after move-to-top)."""
+        with self._cond:
+            if id(item) in self._pending:
+                heapq.heappush(self._heap, (self.order_key(item), next(self._seq), item))
+
+    def discard(self, item) -> None:
+        """Drop a pending item (e.g. removed from the queue); a running lookup is not interrupted."""
+        with self._cond:
+            self._pending.pop(id(item), None)
+
+    def clear(self) -> None:
+        """Drop every pending item."""
+        with self._cond:
+            self._heap.clear()
+            self._pending.clear()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                entry = None
+                while entry is None:
+                    if self._stopped:
+                        return
+                    while self._heap:
+                        _key, _seq, item = heapq.heappop(self._heap)
+                        # Skip stale duplicates left behind by bump()
+                        entry = self._pending.pop(id(item), None)
+                        if entry is not None:
+                            break
+                    if entry is None:
+                        self._cond.wait()
+                self._busy += 1
+            item, func = entry
+            try:
+                func(item)
+            except Exception as e:
+                print(f"[resolver] lookup failed for {getattr(item, 'url', item)}: {e}")
+            finally:
+                with self._cond:
+                    self._busy -= 1
+
+
+__all__ = ["ResolverPool", "queue_order"]
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+In-process yt-dlp metadata service.
+
+Keeps warm yt_dlp.YoutubeDL instances (one per thread, extractors already
+loaded) and answers title, format and playlist lookups without starting a
+new interpreter per call. Results are cached with a TTL. Falls back to the
+yt-dlp CLI when the yt_dlp module cannot be imported.
+"""
+from __future__ import annotations
+
+import json
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+try:
+    import yt_dlp
+    HAS_YT_DLP = True
+except ImportError:
+    HAS_YT_DLP = False
+    yt_dlp = None
+
+_BASE_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'skip_download': True,
+    'noprogress': True,
+}
+
+
+def summarize_formats(info: Dict) -> Dict:
+    """Build the probe reply sent to the browser extension from an info dict."""
+    fmts = info.get('formats') or []
+    heights = sorted({f.get('height') for f in fmts if f.get('height')}, reverse=True)
+    qualities = [h for h in heights if isinstance(h, int)]
+    audio_only = any((f.get('vcodec') in (None, 'none')) for f in fmts)
+
+    def _size_mb(f):
+        sz = f.get('filesize') or f.get('filesize_approx')
+        return round(sz / 1024 / 1024, 1) if isinstance(sz, (int, float)) else None
+
+    fmt_list = []
+    for f in fmts:
+        fid = f.get('format_id')
+        if not fid:
+            continue
+        vcodec = f.get('vcodec')
+        acodec = f.get('acodec')
+        fmt_list.append({
+            'id': str(fid),
+            'height': f.get('height'),
+            'ext': f.get('ext'),
+            'fps': f.get('fps'),
+            'sizeMB': _size_mb(f),
+            'vcodec': vcodec,
+            'acodec': acodec,
+            'progressive': (vcodec not in (None, 'none')) and (acodec not in (None, 'none')),
+        })
+    return {'status': 'ok', 'qualities': qualities, 'audio_only': audio_only, 'formats': fmt_list}
+
+
+class MetadataService:
+    """Cached title / format / playlist lookups backed by warm YoutubeDL instances"""
+
+    def __init__(self, cache_size: int = 512, ttl: float = 1800.0):
+        """
+        Args:
+            cache_size: Maximum number of cached lookups
+            ttl: Seconds a cached lookup stays valid
+        """
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # -- public API -------------------------------------------------------
+
+    def warm(self) -> None:
+        """Load yt_dlp's extractor classes ahead of the first lookup.
+
+        Only the process-wide part is warmed: the thread calling this keeps
+        nothing, and each lookup thread still builds its own YoutubeDL (cheap
+        once the extractors are loaded) on first use.
+        """
+        if HAS_YT_DLP:
+            try:
+                yt_dlp.YoutubeDL(dict(_BASE_OPTS))
+            except Exception as e:
+                print(f"[metadata] warm-up failed: {e}")
+
+    def title(self, url: str) -> Optional[str]:
+        info = self.info(url)
+        title = (info or {}).get('title')
+        return title.strip() if isinstance(title, str) and title.strip() else None
+
+    def info(self, url: str) -> Optional[Dict]:
+        """Unprocessed info dict for a single video (playlists are not expanded)."""
+        return self._cached(('info', url), lambda: self._extract(url, flat=False))
+
+    def probe(self, url: str) -> Dict:
+        """Format summary for the extension's quality picker."""
+        info = self.info(url)
+        if not info:
+            return {'status': 'error', 'message': 'No metadata available'}
+        if not info.get('formats') and HAS_YT_DLP:
+            # process=False leaves formats unresolved for some extractors
+            info = self._cached(('processed', url), lambda: self._extract(url, flat=False, process=True))
+        return summarize_formats(info or {})
+
+    def playlist(self, url: str) -> Optional[Dict]:
+        """Playlist id, title and flat entry list."""
+        return self._cached(('playlist', url), lambda: self._extract_playlist(url))
+
+    def playlist_title(self, url: str) -> Optional[str]:
+        """Playlist title only; entries are not enumerated when yt_dlp is importable."""
+        if HAS_YT_DLP:
+            def _title():
+                info = self._extract_raw(url, flat=True, process=False)
+                return (info or {}).get('title') or (info or {}).get('playlist_title')
+            title = self._cached(('playlist_title', url), _title)
+        else:
+            title = (self.playlist(url) or {}).get('title')
+        return title if title and title != 'NA' else None
+
+    def invalidate(self, url: Optional[str] = None) -> None:
+        with self._lock:
+            if url is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[1] == url]:
+                    del self._cache[key]
+
+    # -- internals --------------------------------------------------------
+
+    def _cached(self, key: tuple, compute):
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and now - hit[0] < self.ttl:
+                self._cache.move_to_end(key)
+                return hit[1]
+        value = compute()
+        if value is not None:
+            with self._lock:
+                self._cache[key] = (now, value)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return value
+
+    def _ydl(self, flat: bool):
+        attr = 'flat' if flat else 'video'
+        ydl = getattr(self._local, attr, None)
+        if ydl is None:
+            opts = dict(_BASE_OPTS)
+            if flat:
+                opts.update({'extract_flat': 'in_playlist', 'noplaylist': False})
+            else:
+                opts.update({'noplaylist': True})
+            ydl = yt_dlp.YoutubeDL(opts)
+            setattr(self._local, attr, ydl)
+        return ydl
+
+    def _extract(self, url: str, flat: bool, process: bool = False) -> Optional[Dict]:
+        if not HAS_YT_DLP:
+            return self._extract_cli(url)
+        info = self._extract_raw(url, flat, process)
+        return self._ydl(flat).sanitize_info(info) if info else None
+
+    def _extract_raw(self, url: str, flat: bool, process: bool) -> Optional[Dict]:
+        try:
+            ydl = self._ydl(flat)
+            info = ydl.extract_info(url, download=False, process=process)
+            # Follow redirects (e.g. watch?v=..&list=RD.. -> playlist tab)
+            for _ in range(3):
+                if not info or info.get('_type') not in ('url', 'url_transparent'):
+                    break
+                info = ydl.extract_info(info['url'], download=False, process=process, ie_key=info.get('ie_key'))
+            return info
+        except Exception as e:
+            print(f"[metadata] lookup failed for {url}: {e}")
+            return None
+
+    def _extract_playlist(self, url: str) -> Optional[Dict]:
+        if not HAS_YT_DLP:
+            return self._extract_playlist_cli(url)
+        info = self._extract(url, flat=True, process=True)
+        if not info:
+            return None
+        return {
+            'id': info.get('id'),
+            'title': info.get('title') or info.get('playlist_title'),
+            'entries': self._flat_entries(info.get('entries') or []),
+        }
+
+    @staticmethod
+    def _flat_entries(entries) -> List[Dict]:
+        out = []
+        for e in entries:
+            if isinstance(e, dict) and (e.get('id') or e.get('url')):
+                out.append({'id': e.get('id') or e.get('url'), 'url': e.get('url'), 'title': e.get('title')})
+        return out
+
+    def _extract_cli(self, url: str) -> Optional[Dict]:
+        try:
+            p = subprocess.run(['yt-dlp', '-J', '--no-warnings', '--no-playlist', url],
+                               capture_output=True, text=True, timeout=45)
+            if p.returncode != 0:
+                return None
+            return json.loads(p.stdout)
+        except Exception as e:
+            print(f"[metadata] yt-dlp CLI lookup failed for {url}: {e}")
+            return None
+
+    def _extract_playlist_cli(self, url: str) -> Optional[Dict]:
+        try:
+            p = subprocess.run(['yt-dlp', '-J', '--no-warnings', '--flat-playlist', '--yes-playlist', url],
+                               capture_output=True, text=True, timeout=120)
+            if p.returncode != 0:
+                return None
+            info = json.loads(p.stdout)
+        except Exception as e:
+            print(f"[metadata] yt-dlp CLI playlist lookup failed for {url}: {e}")
+            return None
+        return {
+            'id': info.get('id'),
+            'title': info.get('title') or info.get('playlist_title'),
+            'entries': self._flat_entries(info.get('entries') or []),
+        }
+
+
+# Global instance
+_service = None
+
+
+def get_service() -> MetadataService:
+    """Get the global metadata service instance"""
+    global _service
+    if _service is None:
+        _service = MetadataService()
+    return _service
+
+
+__all__ = ["MetadataService", "get_service", "summarize_formats", "HAS_YT_DLP"]
@@ -0,0 +1,132 @@
+"""
+Persistent playlist metadata cache keyed by playlist ID.
+
+Stores title, entry count and entry IDs per playlist so enqueue paths do
+not each run their own yt-dlp lookup. Concurrent lookups of the same
+playlist are collapsed into one fetch. Expired records are served
+immediately while a single background fetch revalidates them; a record
+whose fingerprint (hash of title and entry IDs) did not change only gets
+its timestamp refreshed.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+
+def fingerprint(title: Optional[str], entry_ids: Optional[Iterable[str]]) -> str:
+    h = hashlib.sha1((title or '').encode('utf-8'))
+    for vid in entry_ids or ():
+        h.update(b'\0' + str(vid).encode('utf-8'))
+    return h.hexdigest()
+
+
+class PlaylistCache:
+    """playlist_id -> {title, count, entry_ids, fetched_at, fingerprint}"""
+
+    def __init__(self, path: str, ttl: float = 6 * 3600, max_entries: int = 500):
+        """
+        Args:
+            path: JSON file the cache is persisted to
+            ttl: Seconds after which a record is revalidated
+            max_entries: Oldest records beyond this count are dropped
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Dict]] = None
+        self._inflight: Dict[str, threading.Event] = {}
+
+    def get(self, playlist_id: str) -> Optional[Dict]:
+        """Cached record regardless of age, or None."""
+        with self._lock:
+            rec = self._load_locked().get(playlist_id)
+            return dict(rec) if rec else None
+
+    def is_fresh(self, rec: Optional[Dict]) -> bool:
+        return bool(rec) and time.time() - rec.get('fetched_at', 0) < self.ttl
+
+    def title(self, playlist_id: str, fetch: Callable[[], Optional[str]]) -> Optional[str]:
+        """Playlist title, calling fetch() at most once per playlist at a time."""
+        if not playlist_id:
+            return fetch()
+        rec = self.get(playlist_id)
+        if rec and rec.get('title'):
+            if not self.is_fresh(rec):
+                threading.Thread(target=self._fetch_title, args=(playlist_id, fetch), daemon=True).start()
+            return rec['title']
+        return self._fetch_title(playlist_id, fetch)
+
+    def update(self, playlist_id: str, title: Optional[str] = None, entry_ids: Optional[list] = None) -> bool:
+        """Store fresh metadata. Returns True if the fingerprint changed."""
+        with self._lock:
+            data = self._load_locked()
+            rec = data.get(playlist_id) or {}
+            title = title or rec.get('title')
+            if entry_ids is None:
+                entry_ids = rec.get('entry_ids')
+            fp = fingerprint(title, entry_ids)
+            changed = fp != rec.get('fingerprint')
+            rec = dict(rec)
+            rec['fetched_at'] = time.time()
+            if changed:
+                rec.update({
+                    'title': title,
+                    'entry_ids': list(entry_ids) if entry_ids is not None else None,
+                    'count': len(entry_ids) if entry_ids is not None else rec.get('count'),
+                    'fingerprint': fp,
+                })
+            data[playlist_id] = rec
+            if len(data) > self.max_entries:
+                for old in sorted(data, key=lambda k: data[k].get('fetched_at', 0))[:len(data) - self.max_entries]:
+                    del data[old]
+            self._save_locked()
+            return changed
+
+    def _fetch_title(self, playlist_id: str, fetch: Callable[[], Optional[str]]) -> Optional[str]:
+        with self._lock:
+            ev = self._inflight.get(playlist_id)
+            leader = ev is None
+            if leader:
+                ev = self._inflight[playlist_id] = threading.Event()
+        if not leader:
+            ev.wait(60)
+            rec = self.get(playlist_id)
+            return rec.get('title') if rec else None
+        try:
+            title = fetch()
+            if title:
+                self.update(playlist_id, title=title)
+            return title
+        finally:
+            with self._lock:
+                self._inflight.pop(playlist_id, None)
+            ev.set()
+
+    def _load_locked(self) -> Dict[str, Dict]:
+        if self._data is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as fh:
+                    data = json.load(fh)
+                self._data = data if isinstance(data, dict) else {}
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _save_locked(self) -> None:
+        tmp = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(self._data, fh)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[playlist-cache] save failed: {e}")
+
+
+__all__ = ["PlaylistCache", "fingerprint"]
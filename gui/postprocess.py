@@ -0,0 +1,134 @@
+"""
+CPU-bound post-processing stage.
+
+Download workers hand ffmpeg work (audio extraction, subtitle conversion,
+stream merging) to this pool instead of running it while holding a
+download slot. The pool size follows the number of CPU cores so
+transcodes don't pile onto the CPU, and network and CPU work overlap.
+
+Tasks are dicts as emitted by ytdl_worker (one "POSTPROCESS: <json>" line
+each):
+    {"op": "merge", "inputs": [video, audio], "output": path}
+    {"op": "extract_audio", "input": path, "codec": "mp3"}
+    {"op": "convert_subs", "inputs": [paths], "format": "srt"}
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# ffmpeg audio codec / extension / quality per yt-dlp preferredcodec
+_AUDIO_CODECS = {
+    'mp3': ('libmp3lame', 'mp3', ['-q:a', '5']),
+    'aac': ('aac', 'm4a', ['-q:a', '1.5']),
+    'm4a': ('aac', 'm4a', ['-q:a', '1.5']),
+    'opus': ('libopus', 'opus', []),
+    'flac': ('flac', 'flac', []),
+    'wav': ('pcm_s16le', 'wav', []),
+}
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which('ffmpeg') is not None
+
+
+def _run_ffmpeg(args: List[str]) -> None:
+    proc = subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-nostdin'] + args,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        lines = (proc.stderr or '').strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f'ffmpeg exited with {proc.returncode}')
+
+
+def _replace_ext(path: str, ext: str) -> str:
+    return os.path.splitext(path)[0] + '.' + ext
+
+
+def _remove(paths) -> None:
+    for p in paths:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def merge(inputs: List[str], output: str) -> str:
+    tmp = _replace_ext(output, 'temp.' + output.rsplit('.', 1)[-1])
+    args = []
+    for p in inputs:
+        args += ['-i', p]
+    args += ['-c', 'copy', '-map', '0:v:0', '-map', '1:a:0']
+    if output.endswith(('.mp4', '.m4a', '.mov')):
+        args += ['-movflags', '+faststart']
+    _run_ffmpeg(args + [tmp])
+    os.replace(tmp, output)
+    _remove(inputs)
+    return output
+
+
+def extract_audio(path: str, codec: str = 'mp3') -> str:
+    acodec, ext, quality = _AUDIO_CODECS.get(codec, _AUDIO_CODECS['mp3'])
+    output = _replace_ext(path, ext)
+    if output == path:
+        return path
+    _run_ffmpeg(['-i', path, '-vn', '-codec:a', acodec] + quality + [output])
+    _remove([path])
+    return output
+
+
+def convert_subs(paths: List[str], fmt: str = 'srt') -> List[str]:
+    out = []
+    for p in paths:
+        target = _replace_ext(p, fmt)
+        if target != p:
+            _run_ffmpeg(['-i', p, '-f', fmt, target])
+            _remove([p])
+        out.append(target)
+    return out
+
+
+def run_tasks(tasks: List[Dict], media_path: Optional[str] = None) -> Optional[str]:
+    """Run an item's tasks in order; returns the final media path."""
+    for task in tasks:
+        op = task.get('op')
+        if op == 'merge':
+            media_path = merge(task['inputs'], task['output'])
+        elif op == 'extract_audio':
+            media_path = extract_audio(task.get('input') or media_path, task.get('codec') or 'mp3')
+        elif op == 'convert_subs':
+            convert_subs(task.get('inputs') or [], task.get('format') or 'srt')
+        else:
+            raise ValueError(f'unknown post-processing op: {op}')
+    return media_path
+
+
+class PostProcessPool:
+    """Runs post-processing jobs on a fixed number of threads (one ffmpeg each)"""
+
+    def __init__(self, workers: int = 0):
+        """
+        Args:
+            workers: Concurrent ffmpeg jobs; 0 means one per CPU core
+        """
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 2)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='postprocess')
+
+    def submit(self, item, tasks: List[Dict], done: Callable[[object, bool, Optional[str], Optional[str]], None],
+               media_path: Optional[str] = None) -> None:
+        """Run tasks for item, then call done(item, ok, final_path, error)."""
+        def _job():
+            try:
+                final, err = run_tasks(tasks, media_path), None
+            except Exception as e:
+                final, err = media_path, str(e)
+            done(item, err is None, final, err)
+        self._executor.submit(_job)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+__all__ = ["PostProcessPool", "run_tasks", "ffmpeg_available", "merge", "extract_audio", "convert_subs"]
@@ -0,0 +1,198 @@
+"""
+Numeric transfer progress.
+
+Items keep raw byte counts and monotonic timestamps. Speed is an
+exponentially weighted moving average of measured throughput and ETA is
+derived from it, the same way for every backend (yt-dlp workers, aria2c
+console or RPC, fast_ytdl.sh). Numbers are only turned into strings when
+they are drawn, so values from different tools are comparable and can be
+summed into aggregate throughput.
+
+Speeds/ETAs reported by the tools themselves are kept as hints and only
+shown until enough samples have been measured.
+"""
+from __future__ import annotations
+
+import math
+import re
+import time
+from typing import Dict, Iterable, Optional
+
+SIZE = re.compile(r"~?\s*([0-9.]+)\s*([KMGT]?i?B)?")
+_SIZE_UNITS = {'': 1, 'B': 1, 'KiB': 1024, 'MiB': 1024**2, 'GiB': 1024**3, 'TiB': 1024**4,
+               'KB': 1000, 'MB': 1000**2, 'GB': 1000**3, 'TB': 1000**4}
+_ETA_HMS = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?$")
+
+# Seconds over which the speed average forgets old samples
+SPEED_TAU = 3.0
+# Shortest interval one rate sample may span (coalesced updates arrive in bursts)
+MIN_SAMPLE = 0.25
+
+
+def size_to_bytes(val) -> int:
+    """'12.5MiB' / '~3GB' -> bytes (0 if unparseable)."""
+    m = SIZE.match(str(val or '').strip())
+    if not m:
+        return 0
+    try:
+        return int(float(m.group(1)) * _SIZE_UNITS.get(m.group(2) or '', 1))
+    except ValueError:
+        return 0
+
+
+def parse_eta(val) -> Optional[int]:
+    """'01:05' / '1:02:03' / '27s' / '1m5s' -> seconds (None if unparseable)."""
+    text = str(val or '').strip()
+    if not text:
+        return None
+    try:
+        if ':' in text:
+            secs = 0
+            for part in text.split(':'):
+                secs = secs * 60 + int(part)
+            return secs
+        m = _ETA_HMS.match(text)
+        if m and any(m.groups()):
+            h, mi, s = (int(g or 0) for g in m.groups())
+            return h * 3600 + mi * 60 + s
+        return int(float(text))
+    except ValueError:
+        return None
+
+
+def format_bytes(n) -> str:
+    n = float(n or 0)
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if n < 1024 or unit == 'GiB':
+            return f'{n:.2f}{unit}'
+        n /= 1024.0
+
+
+def format_speed(bps) -> str:
+    return f'{format_bytes(bps)}/s' if bps else ''
+
+
+def format_eta(seconds) -> str:
+    if seconds is None:
+        return ''
+    seconds = int(seconds)
+    h, rest = divmod(seconds, 3600)
+    if h:
+        return f'{h}:{rest // 60:02d}:{rest % 60:02d}'
+    return f'{rest // 60:02d}:{rest % 60:02d}'
+
+
+class TransferStats:
+    """Byte counters of one download with EWMA speed and derived ETA"""
+
+    __slots__ = ('done', 'total', 'started', 'updated', 'tau', '_speed', '_measured',
+                 '_t0', '_d0', '_hint_speed', '_hint_eta', '_active', '_segment')
+
+    def __init__(self, tau: float = SPEED_TAU):
+        """
+        Args:
+            tau: Smoothing time constant of the speed average, in seconds
+        """
+        self.tau = tau
+        self.reset()
+
+    def reset(self) -> None:
+        self.done = 0
+        self.total = 0
+        self.started: Optional[float] = None
+        self.updated: Optional[float] = None
+        self._d0 = 0
+        # Seconds spent in earlier runs, and when the current run started
+        self._active = 0.0
+        self._segment: Optional[float] = None
+        self.restart()
+
+    def restart(self) -> None:
+        """Keep the counters but forget timing, e.g. when a paused download resumes.
+
+        The run so far is banked in elapsed; the next update starts a new one,
+        so time spent paused is not counted.
+        """
+        if self._segment is not None and self.updated is not None:
+            self._active += self.updated - self._segment
+        self._segment = None
+        self._speed = 0.0
+        self._measured = False
+        self._t0 = None
+        self._hint_speed = 0.0
+        self._hint_eta = None
+
+    def update(self, done: Optional[int] = None, total: Optional[int] = None,
+               now: Optional[float] = None) -> None:
+        """Record new counters; speed is re-estimated from the bytes since the last sample."""
+        now = time.monotonic() if now is None else now
+        if total:
+            self.total = int(total)
+        if done is None:
+            return
+        done = int(done)
+        if self._t0 is None or done < self._d0:
+            # First sample, or the transfer restarted: new baseline
+            self._t0, self._d0 = now, done
+        elif now - self._t0 >= MIN_SAMPLE:
+            dt = now - self._t0
+            rate = (done - self._d0) / dt
+            if self._measured:
+                alpha = 1.0 - math.exp(-dt / self.tau)
+                self._speed += alpha * (rate - self._speed)
+            else:
+                self._speed = rate
+                self._measured = True
+            self._t0, self._d0 = now, done
+        if self.started is None:
+            self.started = now
+        if self._segment is None:
+            self._segment = now
+        self.done = done
+        self.updated = now
+
+    def hint(self, speed: Optional[float] = None, eta: Optional[int] = None) -> None:
+        """Tool-reported speed (B/s) / ETA (s), used until a rate has been measured."""
+        if speed is not None:
+            self._hint_speed = float(speed)
+        if eta is not None:
+            self._hint_eta = int(eta)
+
+    @property
+    def speed(self) -> float:
+        return self._speed if self._measured else self._hint_speed
+
+    @property
+    def eta(self) -> Optional[int]:
+        speed = self.speed
+        if self.total > self.done and speed > 0:
+            return int((self.total - self.done) / speed)
+        return None if self._measured else self._hint_eta
+
+    @property
+    def elapsed(self) -> float:
+        """Active transfer time: each run's first to latest update, summed over restarts."""
+        if self._segment is None or self.updated is None:
+            return self._active
+        return self._active + self.updated - self._segment
+
+    @property
+    def percent(self) -> float:
+        if self.total <= 0:
+            return 0.0
+        return min(100.0, 100.0 * self.done / self.total)
+
+
+def aggregate(stats: Iterable[TransferStats]) -> Dict[str, float]:
+    """Summed counters and throughput over several transfers."""
+    done = total = speed = 0
+    for st in stats:
+        done += st.done
+        total += st.total
+        speed += st.speed
+    return {'done': done, 'total': total, 'speed': speed,
+            'eta': int((total - done) / speed) if speed > 0 and total > done else None}
+
+
+__all__ = ["TransferStats", "aggregate", "size_to_bytes", "parse_eta",
+           "format_bytes", "format_speed", "format_eta"]
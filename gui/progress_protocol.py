@@ -0,0 +1,158 @@
+"""
+Structured progress events between download workers and the GUI.
+
+Workers write one JSON object per line to a dedicated pipe (its fd number
+is passed in FASTTUBE_EVENT_FD) while stdout stays a plain text log, so
+progress can no longer be garbled by interleaved aria2c/ffmpeg output and
+the GUI reads numbers instead of scraping strings.
+
+Every event carries the protocol version and its type:
+    {"v": 1, "ev": "progress", "downloaded": 41943040, "total": 104857600,
+     "speed": 3145728.0, "eta": 20}    ("percent" added when only fragment counts are known)
+    {"v": 1, "ev": "title", "title": "..."}
+    {"v": 1, "ev": "file", "path": "/abs/path"}
+    {"v": 1, "ev": "retry", "format": "bestvideo+bestaudio"}
+    {"v": 1, "ev": "postprocess", "task": {...}}
+    {"v": 1, "ev": "error", "message": "..."}
+    {"v": 1, "ev": "done", "rc": 0}
+
+Without an event fd (fast_ytdl.sh, `ytdl_worker.py --once`) events are
+rendered as the legacy marker lines (PROGRESS:, META:, TITLE:, ...).
+
+The precompiled patterns for aria2c and yt-dlp console output used by the
+text parsers also live here; number parsing/formatting is in progress_model.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .progress_model import SIZE, format_bytes, format_eta, size_to_bytes
+except ImportError:
+    from progress_model import SIZE, format_bytes, format_eta, size_to_bytes
+
+PROTOCOL_VERSION = 1
+EVENT_FD_ENV = 'FASTTUBE_EVENT_FD'
+
+# aria2c: "[#2089b0 12MiB/100MiB(12%) CN:16 DL:3.2MiB ETA:27s]"
+ARIA_PERCENT = re.compile(r"\((\d+(?:\.\d+)?)%\)")
+ARIA_SPEED = re.compile(r"DL:([^\] ]+)")
+ARIA_ETA = re.compile(r"ETA:([0-9:hms]+)")
+ARIA_SIZES = re.compile(r"\s([0-9.]+[A-Za-z]+)/((?:N/A)|[0-9.]+[A-Za-z]+)\(")
+# yt-dlp: "[download]  12.3% of 10.00MiB at 1.23MiB/s ETA 00:05"
+PERCENT = re.compile(r"(\d+(?:\.\d+)?)%")
+
+
+def percent(ev: Dict) -> float:
+    """Completion percentage of a progress event (0 if the size is unknown)."""
+    if ev.get('percent') is not None:
+        return float(ev['percent'])
+    total = ev.get('total') or 0
+    if total <= 0:
+        return 0.0
+    return min(100.0, 100.0 * (ev.get('downloaded') or 0) / total)
+
+
+def encode(ev: str, **fields) -> str:
+    """One event as a JSON line (with trailing newline)."""
+    obj = {'v': PROTOCOL_VERSION, 'ev': ev}
+    obj.update(fields)
+    return json.dumps(obj, separators=(',', ':')) + '\n'
+
+
+def decode(line) -> Optional[Dict]:
+    """Parse an event line; None for anything that isn't a known-version event."""
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='replace')
+    try:
+        obj = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(obj, dict) or obj.get('v') != PROTOCOL_VERSION or 'ev' not in obj:
+        return None
+    return obj
+
+
+def to_markers(ev: Dict) -> List[str]:
+    """Render an event as the legacy text marker lines."""
+    kind = ev.get('ev')
+    if kind == 'progress':
+        lines = [f'PROGRESS: {percent(ev):.1f}%']
+        meta = []
+        if ev.get('speed'):
+            meta.append(f"speed={format_bytes(ev['speed'])}/s")
+        if ev.get('eta') is not None:
+            meta.append(f"eta={format_eta(ev['eta'])}")
+        if ev.get('downloaded'):
+            meta.append(f"downloaded={format_bytes(ev['downloaded'])}")
+        if ev.get('total'):
+            meta.append(f"total={format_bytes(ev['total'])}")
+        if meta:
+            lines.append('META: ' + ' '.join(meta))
+        return lines
+    if kind == 'title':
+        return [f"TITLE: {ev.get('title') or 'Unknown'}"]
+    if kind == 'file':
+        return [f"FILE: {ev.get('path')}"]
+    if kind == 'retry':
+        return [f"RETRY: format={ev.get('format')}"]
+    if kind == 'postprocess':
+        return ['POSTPROCESS: ' + json.dumps(ev.get('task'))]
+    if kind == 'error':
+        return [f"ERROR: {ev.get('message')}"]
+    if kind == 'done':
+        return [f"DONE: {ev.get('rc')}"]
+    return []
+
+
+class EventWriter:
+    """Worker-side sink: text log lines go to `text`, events to the event fd.
+
+    Calling the writer logs a text line; `event()` sends a structured event,
+    falling back to marker lines on the text log when there is no event fd.
+    """
+
+    def __init__(self, text: Callable[[str], None], fd: Optional[int] = None):
+        """
+        Args:
+            text: Writes one line of the text log
+            fd: Event pipe; None renders events as marker lines instead
+        """
+        self.text = text
+        self.fd = fd
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, text: Callable[[str], None]) -> 'EventWriter':
+        try:
+            fd = int(os.environ[EVENT_FD_ENV])
+            os.fstat(fd)
+        except (KeyError, ValueError, OSError):
+            fd = None
+        return cls(text, fd)
+
+    def __call__(self, line: str) -> None:
+        self.text(line)
+
+    def event(self, ev: str, **fields) -> None:
+        if self.fd is None:
+            for line in to_markers(dict(fields, ev=ev)):
+                self.text(line)
+            return
+        data = encode(ev, **fields).encode('utf-8')
+        with self._lock:
+            try:
+                while data:
+                    data = data[os.write(self.fd, data):]
+            except OSError:
+                # GUI side went away; keep the text log working
+                self.fd = None
+
+
+__all__ = ["PROTOCOL_VERSION", "EVENT_FD_ENV", "EventWriter", "encode", "decode", "to_markers",
+           "size_to_bytes", "format_bytes", "format_eta", "percent",
+           "ARIA_PERCENT", "ARIA_SPEED", "ARIA_ETA", "ARIA_SIZES", "PERCENT", "SIZE"]
@@ -0,0 +1,197 @@
+"""
+Append-only journal that makes the download queue survive crashes.
+
+Every queue mutation is appended as one JSON line (enqueue, status, title,
+destination path, bytes done, priority, removal). At startup the journal is
+replayed to rebuild the queue, then compacted into one snapshot record per
+live item so it never grows without bound.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+# DownloadItem attributes persisted in "enqueue" records
+ITEM_FIELDS = (
+    'id', 'url', 'title', 'status', 'kind', 'req_format', 'req_quality', 'req_subs',
+    'playlist_name', 'playlist_id', 'custom_folder', 'custom_category', 'priority',
+    'dest_path', 'bytes_done', 'progress',
+)
+
+# Minimum seconds between two "bytes" records for the same item
+BYTES_INTERVAL = 5.0
+
+
+def is_terminal(status: Optional[str]) -> bool:
+    """True for statuses that need no resuming after a restart."""
+    status = status or ''
+    return status in ('Completed', 'Failed') or status.startswith('Error')
+
+
+def snapshot(item) -> Dict:
+    """Serializable view of a DownloadItem."""
+    return {k: getattr(item, k, None) for k in ITEM_FIELDS}
+
+
+class QueueJournal:
+    """Append-only, replayable log of queue state"""
+
+    def __init__(self, path: str, compact_every: int = 1000):
+        """
+        Args:
+            path: Journal file location
+            compact_every: Appended records after which needs_compaction() is True
+        """
+        self.path = path
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._fh = None
+        self._appended = 0
+        self._last_bytes: Dict[str, float] = {}
+
+    # -- reading ----------------------------------------------------------
+
+    def replay(self) -> List[Dict]:
+        """Rebuild the latest state of every item still in the queue, in order.
+
+        A torn final line (crash mid-write) or any malformed line is skipped.
+        """
+        items: Dict[str, Dict] = {}
+        try:
+            fh = open(self.path, 'r', encoding='utf-8')
+        except OSError:
+            return []
+        with fh:
+            for raw in fh:
+                try:
+                    rec = json.loads(raw)
+                except ValueError:
+                    continue
+                if not isinstance(rec, dict):
+                    continue
+                op = rec.get('op')
+                item_id = rec.get('id')
+                if op == 'clear':
+                    items.clear()
+                elif op == 'enqueue' and item_id:
+                    items[item_id] = {k: rec.get(k) for k in ITEM_FIELDS}
+                elif item_id in items:
+                    cur = items[item_id]
+                    if op == 'remove':
+                        del items[item_id]
+                    elif op == 'status':
+                        cur['status'] = rec.get('status')
+                    elif op == 'title':
+                        cur['title'] = rec.get('title')
+                    elif op == 'dest':
+                        cur['dest_path'] = rec.get('path')
+                    elif op == 'bytes':
+                        cur['bytes_done'] = rec.get('done')
+                        cur['progress'] = rec.get('progress', cur.get('progress'))
+                    elif op == 'priority':
+                        cur['priority'] = rec.get('priority')
+        return list(items.values())
+
+    # -- writing ----------------------------------------------------------
+
+    def record_enqueue(self, item) -> None:
+        rec = snapshot(item)
+        rec['op'] = 'enqueue'
+        self._append(rec, sync=True)
+
+    def record_status(self, item, status: str) -> None:
+        self._append({'op': 'status', 'id': item.id, 'status': status}, sync=True)
+
+    def record_title(self, item, title: str) -> None:
+        self._append({'op': 'title', 'id': item.id, 'title': title})
+
+    def record_dest(self, item, path: str) -> None:
+        self._append({'op': 'dest', 'id': item.id, 'path': path}, sync=True)
+
+    def record_bytes(self, item, done: int, progress: Optional[int] = None) -> None:
+        """Record bytes done, at most once per BYTES_INTERVAL per item."""
+        now = time.monotonic()
+        if now - self._last_bytes.get(item.id, 0.0) < BYTES_INTERVAL:
+            return
+        self._last_bytes[item.id] = now
+        self._append({'op': 'bytes', 'id': item.id, 'done': int(done), 'progress': progress})
+
+    def record_priority(self, item) -> None:
+        self._append({'op': 'priority', 'id': item.id, 'priority': item.priority})
+
+    def record_remove(self, item) -> None:
+        self._last_bytes.pop(item.id, None)
+        self._append({'op': 'remove', 'id': item.id}, sync=True)
+
+    def record_clear(self) -> None:
+        self._last_bytes.clear()
+        self._append({'op': 'clear'}, sync=True)
+
+    def needs_compaction(self) -> bool:
+        return self._appended >= self.compact_every
+
+    def compact(self, records: Iterable[Dict]) -> None:
+        """Atomically replace the journal with one enqueue record per live item."""
+        tmp = self.path + '.tmp'
+        with self._lock:
+            self._close_locked()
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                for rec in records:
+                    if is_terminal(rec.get('status')):
+                        continue
+                    rec = dict(rec)
+                    rec['op'] = 'enqueue'
+                    fh.write(json.dumps(rec) + '\n')
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+            self._fsync_dir()
+            self._appended = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    # -- internals --------------------------------------------------------
+
+    def _append(self, rec: Dict, sync: bool = False) -> None:
+        line = json.dumps(rec) + '\n'
+        with self._lock:
+            try:
+                if self._fh is None:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                    self._fh = open(self.path, 'a', encoding='utf-8')
+                self._fh.write(line)
+                self._fh.flush()
+                if sync:
+                    os.fsync(self._fh.fileno())
+                self._appended += 1
+            except OSError as e:
+                print(f"[journal] write failed: {e}")
+
+    def _close_locked(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except OSError:
+                pass
+            self._fh = None
+
+    def _fsync_dir(self) -> None:
+        try:
+            fd = os.open(os.path.dirname(self.path) or '.', os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+__all__ = ["QueueJournal", "ITEM_FIELDS", "is_terminal", "snapshot"]
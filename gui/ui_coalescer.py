@@ -0,0 +1,62 @@
+"""
+Frame-coalesced UI updates.
+
+Download threads mark items dirty ("progress", "title", "status") instead
+of queueing one GLib idle callback per event. A single timer on the main
+loop drains the dirty set a fixed number of times per second and hands it
+to one flush callback, so the idle queue can't outgrow what GTK draws and
+each row is repainted at most once per frame with its latest state. The
+timer only runs while there is something to flush.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Set
+
+
+class UpdateCoalescer:
+    """Collects dirty items from any thread and flushes them in batches"""
+
+    def __init__(self, flush: Callable[[Dict[object, Set[str]]], None],
+                 schedule: Callable[[int, Callable[[], bool]], object], hz: int = 20):
+        """
+        Args:
+            flush: Called on the main loop with {item: {kinds}} in marking order
+            schedule: Timer registration, e.g. GLib.timeout_add(interval_ms, callback);
+                the callback returns False to stop the timer
+            hz: Flushes per second
+        """
+        self.flush = flush
+        self.schedule = schedule
+        self.interval_ms = max(1, int(1000 / max(1, hz)))
+        self._lock = threading.Lock()
+        self._dirty: Dict[object, Set[str]] = {}
+        self._scheduled = False
+
+    def mark(self, item, *kinds: str) -> None:
+        """Record that item needs the given kinds of repaint."""
+        with self._lock:
+            self._dirty.setdefault(item, set()).update(kinds)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.schedule(self.interval_ms, self._tick)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._dirty)
+
+    def _tick(self) -> bool:
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                self._scheduled = False
+                return False
+        try:
+            self.flush(dirty)
+        except Exception as e:
+            print(f"[ui] flush failed: {e}")
+        return True
+
+
+__all__ = ["UpdateCoalescer"]
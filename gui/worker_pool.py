@@ -0,0 +1,288 @@
+"""
+Pool of pre-forked yt-dlp download workers.
+
+Each worker is a `ytdl_worker.py --serve` process that has already imported
+yt_dlp. A download is handed to an idle worker as one JSON line; the worker
+reports structured events (progress_protocol.py) on a private pipe, keeps
+stdout as its text log, and finishes with a done event. Both pipes of all
+workers are read by one IoLoop thread rather than a thread per download.
+A worker that dies
+(e.g. terminated by pause/stop) is discarded and replaced in the background,
+and workers are recycled after `max_jobs` downloads.
+"""
+from __future__ import annotations
+
+import json
+import os
+import selectors
+import subprocess
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .io_loop import IoLoop, get_loop
+    from .progress_protocol import EVENT_FD_ENV, decode, to_markers
+except ImportError:
+    from io_loop import IoLoop, get_loop
+    from progress_protocol import EVENT_FD_ENV, decode, to_markers
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ytdl_worker.py")
+# Seconds a new worker may take to import yt_dlp and report READY
+READY_TIMEOUT = 15.0
+
+
+def _readline(fd: int, timeout: Optional[float] = None) -> Optional[str]:
+    """Blocking read of one line (startup handshake, before the fd joins the loop)."""
+    buf = b""
+    with selectors.DefaultSelector() as sel:
+        sel.register(fd, selectors.EVENT_READ)
+        while b"\n" not in buf:
+            if not sel.select(timeout):
+                return None
+            data = os.read(fd, 1)
+            if not data:
+                return None
+            buf += data
+    return buf.decode("utf-8", errors="replace").strip()
+
+
+class Worker:
+    """One long-lived worker process whose pipes are read by the shared IoLoop"""
+
+    def __init__(self, proc: subprocess.Popen, event_fd: Optional[int] = None, loop: Optional[IoLoop] = None):
+        """
+        Args:
+            proc: The worker process (binary pipes)
+            event_fd: Read end of the worker's event pipe; None for text-only workers
+            loop: Reader loop for stdout and events (defaults to the shared one)
+        """
+        self.proc = proc
+        self.jobs = 0
+        self.out_fd = proc.stdout.fileno()
+        self.event_fd = event_fd
+        self.loop = loop or get_loop()
+        self._lock = threading.Lock()
+        self._job = None
+        self._attached = False
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def start(self, job: dict, on_line: Callable[[str], None],
+              on_event: Optional[Callable[[Dict], None]] = None,
+              on_done: Optional[Callable[[Optional[int]], None]] = None) -> bool:
+        """Send a job without waiting; callbacks run on the reader loop thread.
+
+        Log lines go to on_line and events to on_event (rendered as marker
+        lines for on_line when on_event is None). on_done gets the job's exit
+        code, or None if the worker died mid-job. Returns False if the job
+        could not be sent.
+        """
+        self.jobs += 1
+        with self._lock:
+            self._job = (on_line, on_event, on_done)
+        if not self._attached:
+            self._attached = True
+            self.loop.add(self.out_fd, self._on_output, self._on_eof)
+            if self.event_fd is not None:
+                self.loop.add(self.event_fd, self._on_events, self._on_eof)
+        try:
+            self.proc.stdin.write((json.dumps(job) + "\n").encode("utf-8"))
+            self.proc.stdin.flush()
+        except (OSError, ValueError):
+            with self._lock:
+                self._job = None
+            return False
+        return True
+
+    def run(self, job: dict, on_line: Callable[[str], None],
+            on_event: Optional[Callable[[Dict], None]] = None) -> Optional[int]:
+        """Blocking form of start(): returns the exit code (None if the worker died)."""
+        finished = threading.Event()
+        result = []
+
+        def _done(rc):
+            result.append(rc)
+            finished.set()
+        if not self.start(job, on_line, on_event, _done):
+            return None
+        finished.wait()
+        return result[0]
+
+    def _finish(self, rc: Optional[int]) -> None:
+        with self._lock:
+            job, self._job = self._job, None
+        if job is not None and job[2] is not None:
+            job[2](rc)
+
+    def _on_output(self, lines: List[str]) -> None:
+        for line in lines:
+            if line.startswith("DONE:"):
+                try:
+                    rc = int(line.split(":", 1)[1])
+                except ValueError:
+                    rc = 1
+                self._finish(rc)
+                continue
+            job = self._job
+            if job is not None:
+                job[0](line)
+
+    def _on_events(self, lines: List[str]) -> None:
+        for line in lines:
+            ev = decode(line)
+            job = self._job
+            if ev is None or job is None:
+                continue
+            if ev["ev"] == "done":
+                # The log was written before the done event; don't leave it behind
+                self.loop.drain(self.out_fd)
+                try:
+                    rc = int(ev.get("rc", 1))
+                except (TypeError, ValueError):
+                    rc = 1
+                self._finish(rc)
+            elif job[1] is not None:
+                job[1](ev)
+            else:
+                for marker in to_markers(ev):
+                    job[0](marker)
+
+    def _on_eof(self) -> None:
+        self._finish(None)
+
+    def kill(self) -> None:
+        try:
+            if self.alive():
+                self.proc.kill()
+            self.proc.wait(timeout=5)
+        except Exception:
+            pass
+        if self._attached:
+            self.loop.remove(self.out_fd)
+        for pipe in (self.proc.stdin, self.proc.stdout):
+            try:
+                pipe.close()
+            except Exception:
+                pass
+        if self.event_fd is not None:
+            if self._attached:
+                self.loop.remove(self.event_fd)
+            try:
+                os.close(self.event_fd)
+            except OSError:
+                pass
+            self.event_fd = None
+
+
+class WorkerPool:
+    """Keeps `size` idle workers warm and hands them out per download"""
+
+    def __init__(self, size: int = 2, max_jobs: int = 50, cmd: Optional[List[str]] = None,
+                 loop: Optional[IoLoop] = None, ready_timeout: float = READY_TIMEOUT):
+        """
+        Args:
+            size: Number of idle workers kept warm
+            max_jobs: Downloads after which a worker is replaced
+            cmd: Worker command line (defaults to this interpreter + ytdl_worker.py --serve)
+            loop: Reader loop for worker output (defaults to the shared one)
+            ready_timeout: Seconds to wait for a new worker's READY line
+        """
+        self.loop = loop
+        self.ready_timeout = ready_timeout
+        self.size = max(0, int(size))
+        self.max_jobs = max_jobs
+        self.cmd = cmd or [sys.executable, WORKER_SCRIPT, "--serve"]
+        self.available = self.size > 0
+        self._idle: List[Worker] = []
+        self._lock = threading.Lock()
+        self._spawning = 0
+        self._closed = False
+
+    def prefork(self) -> None:
+        """Top the idle list up to `size` workers in the background."""
+        with self._lock:
+            missing = self.size - len(self._idle) - self._spawning
+            if self._closed or not self.available or missing <= 0:
+                return
+            self._spawning += missing
+        for _ in range(missing):
+            threading.Thread(target=self._spawn_idle, daemon=True).start()
+
+    def acquire(self) -> Optional[Worker]:
+        """Return a ready worker, spawning one if none is idle. None if unavailable."""
+        w = None
+        dead = []
+        with self._lock:
+            while self._idle and w is None:
+                cand = self._idle.pop()
+                if cand.alive():
+                    w = cand
+                else:
+                    dead.append(cand)
+        for d in dead:
+            d.kill()
+        if w is None and self.available and not self._closed:
+            w = self._spawn()
+        self.prefork()
+        return w
+
+    def release(self, worker: Worker) -> None:
+        """Return a worker after a job; dead or worn-out workers are replaced."""
+        keep = worker.alive() and worker.jobs < self.max_jobs
+        with self._lock:
+            if keep and not self._closed and len(self._idle) < self.size:
+                self._idle.append(worker)
+                worker = None
+        if worker is not None:
+            worker.kill()
+        self.prefork()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for w in idle:
+            try:
+                w.proc.stdin.close()
+            except Exception:
+                pass
+            w.kill()
+
+    def _spawn(self) -> Optional[Worker]:
+        ev_read, ev_write = os.pipe()
+        env = dict(os.environ)
+        env[EVENT_FD_ENV] = str(ev_write)
+        try:
+            proc = subprocess.Popen(self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, env=env, pass_fds=(ev_write,))
+        except OSError as e:
+            print(f"[workers] spawn failed: {e}")
+            os.close(ev_read)
+            self.available = False
+            return None
+        finally:
+            os.close(ev_write)
+        worker = Worker(proc, ev_read, self.loop)
+        first = _readline(worker.out_fd, self.ready_timeout)
+        if first != "READY":
+            # yt_dlp missing, broken or hung: stop trying, callers fall back to fast_ytdl.sh
+            print(f"[workers] worker unavailable: {first or 'no READY within %gs' % self.ready_timeout}")
+            self.available = False
+            worker.kill()
+            return None
+        return worker
+
+    def _spawn_idle(self) -> None:
+        w = self._spawn()
+        with self._lock:
+            self._spawning -= 1
+            if w is not None and not self._closed and len(self._idle) < self.size:
+                self._idle.append(w)
+                w = None
+        if w is not None:
+            w.kill()
+
+
+__all__ = ["WorkerPool", "Worker", "WORKER_SCRIPT", "READY_TIMEOUT"]
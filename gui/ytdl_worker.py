@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+yt-dlp download worker.
+
+Runs media downloads with yt_dlp imported once per process and reports
+progress as structured events (see progress_protocol.py): on the event fd
+named by FASTTUBE_EVENT_FD when the GUI provides one, otherwise as the
+marker lines the GUI's text parser reads (PROGRESS:, TITLE:, META:, FILE:,
+RETRY:, ERROR:). With job['defer_postprocess'] the ffmpeg steps are not
+run here but reported as postprocess tasks for the GUI's post-processing
+pool (see postprocess.py).
+
+Modes:
+    --serve       Long-lived worker: prints READY once yt_dlp is loaded, then
+                  reads one JSON job per line on stdin and answers each with
+                  events followed by a done event ("DONE: <exit code>").
+    --once URL    Single download configured through PY_ENV_* variables
+                  (used by fast_ytdl.sh); exits with the download's code,
+                  EXTRACT_FAILED (3) if yt_dlp could not extract at all.
+"""
+import copy
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+try:
+    from .progress_protocol import EventWriter
+except ImportError:
+    from progress_protocol import EventWriter
+
+try:
+    import yt_dlp
+except Exception as e:
+    yt_dlp = None
+    _IMPORT_ERROR = e
+
+# Default cap on progress events per second and download
+PROGRESS_HZ = 4
+
+# Exit code meaning "the Python path could not extract": only then is the
+# yt-dlp CLI worth trying (a format/download failure would fail there too)
+EXTRACT_FAILED = 3
+
+
+def _coerce(val, default):
+    try:
+        iv = int(val)
+        return iv if iv > 0 else default
+    except Exception:
+        return default
+
+
+def _coerce_hz(val):
+    try:
+        return max(0.0, float(val))
+    except (TypeError, ValueError):
+        return PROGRESS_HZ
+
+
+def job_from_env(url):
+    """Build a job dict from the PY_ENV_* variables set by fast_ytdl.sh."""
+    return {
+        'url': url,
+        'outtmpl': os.environ.get('PY_ENV_OUTTMPL', '%(title)s.%(ext)s'),
+        'format': os.environ.get('PY_ENV_FORMAT', 'Best (default)'),
+        'quality': os.environ.get('PY_ENV_QUALITY', ''),
+        'subs': os.environ.get('PY_ENV_SUBS', 'n'),
+        'speed_arg': os.environ.get('PY_ENV_SPEED_ARG', ''),
+        'aria_conn': os.environ.get('PY_ENV_ARIA_CONN', '32'),
+        'aria_splits': os.environ.get('PY_ENV_ARIA_SPLITS', '32'),
+        'frag_conc': os.environ.get('PY_ENV_FRAG_CONC', '16'),
+        'base_dir': os.environ.get('PY_ENV_BASE_DIR', os.getcwd()),
+        'progress_hz': os.environ.get('PY_ENV_PROGRESS_HZ', PROGRESS_HZ),
+    }
+
+
+def deferred_ops(job):
+    """ffmpeg steps this job leaves to the GUI's post-processing pool.
+
+    Only with job['defer_postprocess']; returns {op: argument}.
+    """
+    if not job.get('defer_postprocess'):
+        return {}
+    ops = {'merge': True}
+    if str(job.get('subs') or 'n').lower() in ('y', 'yes', 'true', '1'):
+        ops['convert_subs'] = 'srt'
+    if (job.get('format') or '').strip() == 'Audio Only':
+        ops['extract_audio'] = 'mp3'
+    return ops
+
+
+def build_options(job):
+    """Return (ydl_opts, format_chain) for a job."""
+    fmt_clean = (job.get('format') or 'Best (default)').strip()
+    fmt_lower = fmt_clean.lower()
+    quality = str(job.get('quality') or '')
+    subs_flag = str(job.get('subs') or 'n').lower()
+    speed_arg = job.get('speed_arg') or ''
+    aria_conn = str(_coerce(job.get('aria_conn'), 32))
+    aria_splits = str(_coerce(job.get('aria_splits'), 32))
+    frag_conc = _coerce(job.get('frag_conc'), 16)
+
+    external_args = None
+    # Only configure aria2c if present, else let yt-dlp use its internal downloader
+    if shutil.which('aria2c'):
+        external_args = ['-x', aria_conn, '-s', aria_splits, '-k', '1M', '--min-split-size=1M', '--file-allocation=none']
+        if speed_arg:
+            external_args.append(speed_arg)
+
+    ydl_opts = {
+        'outtmpl': job.get('outtmpl') or '%(title)s.%(ext)s',
+        'paths': {'home': job.get('base_dir') or os.getcwd()},
+        **({'external_downloader': 'aria2c', 'external_downloader_args': external_args} if external_args else {}),
+        'continuedl': True,
+        'ignoreerrors': True,
+        'yesplaylist': True,
+        'concurrent_fragment_downloads': frag_conc,
+    }
+
+    defer = deferred_ops(job)
+    if subs_flag in ('y', 'yes', 'true', '1'):
+        ydl_opts['writesubtitles'] = True
+        ydl_opts['subtitleslangs'] = ['en']
+        if 'convert_subs' not in defer:
+            pp = ydl_opts.get('postprocessors', [])
+            pp.append({'key': 'FFmpegSubtitlesConvertor', 'format': 'srt'})
+            ydl_opts['postprocessors'] = pp
+
+    qual_digits = ''.join(ch for ch in quality if ch.isdigit())
+    if fmt_clean == 'Best Video + Audio':
+        ydl_opts['format'] = 'bestvideo+bestaudio'
+        ydl_opts['merge_output_format'] = 'mp4'
+    elif fmt_clean == 'Audio Only':
+        ydl_opts['format'] = 'bestaudio/best'
+        if 'extract_audio' not in defer:
+            pp = ydl_opts.get('postprocessors', [])
+            pp.append({'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3'})
+            ydl_opts['postprocessors'] = pp
+    elif fmt_clean and fmt_clean != 'Best (default)':
+        ydl_opts['format'] = fmt_clean
+    elif qual_digits and 'audio' not in fmt_lower:
+        ydl_opts['format'] = f'best[height<={qual_digits}]'
+
+    # Graceful format fallback: retry with safer formats if the requested one isn't available
+    candidates = []
+    if ydl_opts.get('format'):
+        candidates.append(ydl_opts['format'])
+    if fmt_clean == 'Audio Only':
+        candidates += ['bestaudio/best', 'best']
+    else:
+        candidates += ['bestvideo+bestaudio/best', 'best']
+    seen = set()
+    fmt_chain = []
+    for f in candidates:
+        if f and f not in seen:
+            seen.add(f)
+            fmt_chain.append(f)
+    return ydl_opts, fmt_chain
+
+
+def _progress_fields(d):
+    """Numeric progress of one yt-dlp hook call."""
+    fields = {
+        'downloaded': d.get('downloaded_bytes') or 0,
+        'total': d.get('total_bytes') or d.get('total_bytes_estimate') or 0,
+        'speed': d.get('speed') or 0,
+        'eta': int(d['eta']) if d.get('eta') is not None else None,
+    }
+    if not fields['total'] and d.get('fragment_count'):
+        # HLS/DASH without a size: fragments are the only measure of progress
+        fields['percent'] = round(100.0 * (d.get('fragment_index') or 0) / d['fragment_count'], 1)
+    return fields
+
+
+def make_hook(emit, base_dir, hz=PROGRESS_HZ):
+    """Progress hook sending progress/title/file events through emit (an EventWriter).
+
+    yt-dlp calls the hook for every chunk of every fragment thread, so
+    progress is sent at most `hz` times per second (0 = unthrottled); the
+    final state of each file always goes out immediately, and the title
+    only when it changes. While hook.state['parallel'] is set (several
+    streams downloading at once) the per-stream numbers are summed into
+    one progress event.
+    """
+    state = {'parallel': False, 'streams': {}, 'last': 0.0, 'title': None}
+    lock = threading.Lock()
+    interval = 1.0 / hz if hz and hz > 0 else 0.0
+
+    def _aggregate(d):
+        key = d.get('filename') or (d.get('info_dict') or {}).get('format_id')
+        streams = state['streams']
+        streams[key] = _progress_fields(d)
+        down = sum(s['downloaded'] for s in streams.values())
+        total = sum(s['total'] for s in streams.values())
+        speed = sum(s['speed'] for s in streams.values())
+        eta = int((total - down) / speed) if speed and total > down else None
+        return {'downloaded': down, 'total': total, 'speed': speed, 'eta': eta}
+
+    def _send(fields, force=False):
+        now = time.monotonic()
+        if not force and now - state['last'] < interval:
+            return
+        state['last'] = now
+        emit.event('progress', **fields)
+
+    def hook(d):
+        st = d.get('status')
+        with lock:
+            if st == 'downloading':
+                title = d.get('title') or (d.get('info_dict') or {}).get('title') or 'Unknown'
+                if title != state['title']:
+                    state['title'] = title
+                    emit.event('title', title=title)
+                fields = _aggregate(d) if state['parallel'] else _progress_fields(d)
+                _send(fields)
+            elif st == 'finished':
+                done = dict(d, downloaded_bytes=d.get('total_bytes') or d.get('downloaded_bytes'))
+                _send(_aggregate(done) if state['parallel'] else _progress_fields(done), force=True)
+                fn = d.get('filename') or (d.get('info_dict') or {}).get('_filename') or ''
+                if fn and not os.path.isabs(fn):
+                    fn = os.path.join(base_dir, fn)
+                if fn:
+                    emit.event('file', path=fn)
+    hook.state = state
+    return hook
+
+
+def part_filename(temp_filename, info, fmt):
+    """Name yt-dlp gives one stream of a merged download (see YoutubeDL.process_info)."""
+    base, real_ext = os.path.splitext(temp_filename)
+    if real_ext[1:] not in (info.get('ext'), fmt['ext']):
+        base = temp_filename
+    base, ext = f"{base}.{fmt['ext']}", fmt['ext']
+    name, real_ext = os.path.splitext(base)
+    # prepend_extension: "name.f137.mp4"
+    if real_ext[1:] == ext:
+        return f"{name}.f{fmt['format_id']}.{ext}"
+    return f"{base}.f{fmt['format_id']}"
+
+
+def prefetch_streams(ydl, ydl_opts, info, hook):
+    """Download the streams of a merged format concurrently.
+
+    Each stream goes to the part file yt-dlp itself would use, so the normal
+    download pass that follows finds them complete and only merges. Returns
+    the part paths written (best effort; [] when not applicable).
+    """
+    fmts = info.get('requested_formats') or []
+    if len(fmts) < 2 or info.get('is_live'):
+        return []
+    # Protocols yt-dlp hands to ffmpeg as a whole can't be split this way
+    if any(str(f.get('protocol') or '').startswith(('m3u8', 'rtmp', 'rtsp', 'f4m')) and f.get('protocol') != 'm3u8_native'
+           for f in fmts):
+        return []
+    temp = ydl.prepare_filename(info, 'temp')
+    jobs = []
+    for f in fmts:
+        new_info = dict(info)
+        new_info.pop('requested_formats', None)
+        new_info.update(f)
+        jobs.append((part_filename(temp, info, f), new_info))
+    results = [False] * len(jobs)
+
+    def _fetch(i, name, new_info):
+        try:
+            os.makedirs(os.path.dirname(name) or '.', exist_ok=True)
+            with yt_dlp.YoutubeDL(ydl_opts) as y:
+                results[i] = bool(y.dl(name, new_info)[0])
+        except Exception as e:
+            print(f'[parallel] stream {new_info.get("format_id")} failed: {e}', file=sys.stderr)
+
+    hook.state['parallel'] = True
+    hook.state['streams'].clear()
+    threads = [threading.Thread(target=_fetch, args=(i, name, new_info), daemon=True)
+               for i, (name, new_info) in enumerate(jobs)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        hook.state['parallel'] = False
+    return [name for (name, _), ok in zip(jobs, results) if ok]
+
+
+def _apply_format(ydl, f):
+    """Point an existing YoutubeDL at another format spec."""
+    ydl.params['format'] = f
+    # Only enforce mp4 merge when asking explicit bestvideo+bestaudio
+    if 'bestvideo+bestaudio' in f:
+        ydl.params['merge_output_format'] = 'mp4'
+    else:
+        ydl.params.pop('merge_output_format', None)
+    ydl.format_selector = ydl.build_format_selector(f)
+
+
+def extract(ydl, url):
+    """Run extraction once (no format processing). Returns the ie_result or None."""
+    ie = ydl.extract_info(url, download=False, process=False)
+    # Follow plain redirects here so retries don't repeat them
+    for _ in range(3):
+        if not ie or ie.get('_type') != 'url':
+            break
+        ie = ydl.extract_info(ie['url'], download=False, process=False, ie_key=ie.get('ie_key'))
+    return ie
+
+
+def _remove_leftovers(paths):
+    """Delete prefetched parts yt-dlp did not consume (its merge removes the rest)."""
+    for p in paths:
+        try:
+            if os.path.exists(p):
+                os.remove(p)
+        except OSError:
+            pass
+
+
+def _copy_result(ydl, url, ie):
+    """Fresh copy of a cached ie_result (processing mutates it)."""
+    try:
+        return copy.deepcopy(ie)
+    except Exception:
+        # Some extractors attach uncopyable objects; re-extracting is the only option then
+        return extract(ydl, url)
+
+
+def _recorder(ydl, sink, subtitles):
+    """PostProcessor that only records file paths (media or subtitle files) into sink."""
+    from yt_dlp.postprocessor import PostProcessor
+
+    class _Recorder(PostProcessor):
+        def run(self, info):
+            if subtitles:
+                for sub in (info.get('requested_subtitles') or {}).values():
+                    if sub.get('filepath') and sub['filepath'] not in sink:
+                        sink.append(sub['filepath'])
+            elif info.get('filepath'):
+                sink.append(info['filepath'])
+            return [], info
+    return _Recorder(ydl)
+
+
+def emit_tasks(emit, defer, media_files, sub_files, merge=None):
+    """Report the deferred post-processing tasks as postprocess events."""
+    tasks = []
+    if merge:
+        tasks.append(dict(merge, op='merge'))
+    if 'extract_audio' in defer:
+        for path in media_files:
+            tasks.append({'op': 'extract_audio', 'input': path, 'codec': defer['extract_audio']})
+    if 'convert_subs' in defer and sub_files:
+        tasks.append({'op': 'convert_subs', 'inputs': list(sub_files), 'format': defer['convert_subs']})
+    for task in tasks:
+        emit.event('postprocess', task=task)
+
+
+def run_job(job, emit):
+    """Download one job, reporting through emit (an EventWriter).
+
+    Returns 0, 1 (download failed) or EXTRACT_FAILED.
+
+    Extraction runs once; each format in the fallback chain is then tried
+    against the cached ie_result instead of re-extracting.
+    """
+    url = job.get('url')
+    if not url:
+        emit.event('error', message='no URL in job')
+        return 1
+    base_dir = job.get('base_dir') or os.getcwd()
+    try:
+        os.makedirs(base_dir, exist_ok=True)
+        ydl_opts, fmt_chain = build_options(job)
+        hook = make_hook(emit, base_dir, _coerce_hz(job.get('progress_hz')))
+        ydl_opts['progress_hooks'] = [hook]
+    except Exception as e:
+        emit.event('error', message=str(e))
+        return 1
+    defer = deferred_ops(job)
+    media_files, sub_files = [], []
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        if defer:
+            ydl.add_post_processor(_recorder(ydl, sub_files, subtitles=True), when='before_dl')
+            ydl.add_post_processor(_recorder(ydl, media_files, subtitles=False), when='post_process')
+        try:
+            ie = extract(ydl, url)
+        except Exception as e:
+            ie = None
+            emit.event('error', message=str(e))
+        if not ie:
+            return EXTRACT_FAILED
+        if ie.get('_type') in ('playlist', 'multi_video'):
+            # Entries are extracted lazily, so fall back per entry via the format spec itself
+            fmt_chain = ['/'.join(fmt_chain)]
+        last_err = None
+        for f in fmt_chain:
+            emit.event('retry', format=f)
+            prefetched = []
+            del media_files[:], sub_files[:]
+            try:
+                _apply_format(ydl, f)
+                ydl._download_retcode = 0
+                if '+' in f and job.get('parallel_streams', True) and ie.get('_type', 'video') == 'video':
+                    # Select formats without downloading, fetch video and audio side by side,
+                    # then let the regular pass below find the parts and merge them
+                    selected = ydl.process_ie_result(_copy_result(ydl, url, ie), download=False)
+                    if ydl._download_retcode != 0:
+                        last_err = f'format {f} not available'
+                        continue
+                    prefetched = prefetch_streams(ydl, ydl_opts, selected, hook)
+                    if defer and prefetched and len(prefetched) == len(selected.get('requested_formats') or []):
+                        # Bytes are on disk: write subtitles etc. but leave the merge to the pool
+                        ydl.params['skip_download'] = True
+                        try:
+                            ydl.process_ie_result(_copy_result(ydl, url, ie), download=True)
+                        finally:
+                            ydl.params['skip_download'] = False
+                        if ydl._download_retcode == 0:
+                            emit_tasks(emit, defer, [], sub_files,
+                                       merge={'inputs': prefetched, 'output': ydl.prepare_filename(selected)})
+                            return 0
+                ydl.process_ie_result(_copy_result(ydl, url, ie) if len(fmt_chain) > 1 or prefetched else ie, download=True)
+                if ydl._download_retcode == 0:
+                    _remove_leftovers(prefetched)
+                    emit_tasks(emit, defer, media_files, sub_files)
+                    return 0
+                last_err = f'yt-dlp exited with code {ydl._download_retcode}'
+            except Exception as e:
+                last_err = str(e)
+        emit.event('error', message=last_err)
+        return 1
+
+
+def cli_args(job):
+    """yt-dlp command line equivalent of a job, for the last-resort CLI fallback."""
+    ydl_opts, _ = build_options(dict(job, defer_postprocess=False))
+    args = ['yt-dlp', '--yes-playlist', '--ignore-errors', '--newline', '--progress',
+            '--paths', ydl_opts['paths']['home'], '--output', ydl_opts['outtmpl'],
+            '--concurrent-fragments', str(ydl_opts['concurrent_fragment_downloads'])]
+    if ydl_opts.get('format'):
+        args += ['-f', ydl_opts['format']]
+    if ydl_opts.get('merge_output_format'):
+        args += ['--merge-output-format', ydl_opts['merge_output_format']]
+    for pp in ydl_opts.get('postprocessors', []):
+        if pp['key'] == 'FFmpegExtractAudio':
+            args += ['-x', '--audio-format', pp['preferredcodec']]
+        elif pp['key'] == 'FFmpegSubtitlesConvertor':
+            args += ['--write-subs', '--sub-lang', 'en', '--convert-subs', pp['format']]
+    if ydl_opts.get('external_downloader'):
+        args += ['--external-downloader', 'aria2c',
+                 '--external-downloader-args', ' '.join(ydl_opts['external_downloader_args'])]
+    return args + [job['url']]
+
+
+def run_cli_fallback(job, emit):
+    """Retry a failed job through the yt-dlp CLI, forwarding its output."""
+    import subprocess
+    emit('[FastTube] Python path failed; attempting CLI fallback...')
+    try:
+        proc = subprocess.Popen(cli_args(job), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    except OSError as e:
+        emit.event('error', message=str(e))
+        return 1
+    for line in iter(proc.stdout.readline, ''):
+        emit(line.rstrip())
+    return proc.wait()
+
+
+def _emit(line):
+    sys.stdout.write(line + '\n')
+    sys.stdout.flush()
+
+
+def serve():
+    # Load the extractor classes now so the first job doesn't pay for it
+    yt_dlp.YoutubeDL({'quiet': True})
+    emit = EventWriter.from_env(_emit)
+    _emit('READY')
+    for raw in sys.stdin:
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            job = json.loads(raw)
+        except ValueError as e:
+            emit.event('error', message=f'bad job: {e}')
+            emit.event('done', rc=2)
+            continue
+        rc = run_job(job, emit)
+        if rc == EXTRACT_FAILED:
+            rc = run_cli_fallback(job, emit)
+        emit.event('done', rc=rc)
+    return 0
+
+
+def main(argv):
+    if yt_dlp is None:
+        print(f"ERROR: yt-dlp not installed: {_IMPORT_ERROR}", file=sys.stderr)
+        return EXTRACT_FAILED
+    if len(argv) >= 2 and argv[1] == '--serve':
+        return serve()
+    if len(argv) >= 3 and argv[1] == '--once':
+        return run_job(job_from_env(argv[2]), EventWriter(_emit))
+    print(f"usage: {os.path.basename(argv[0])} --serve | --once URL", file=sys.stderr)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import sys
 import json
+import itertools
 import socket
 import struct
 import threading
@@ -11,6 +12,9 @@ import os
 HOST = '127.0.0.1'
 PORT = 47653
 LAUNCH_RETRY_SECONDS = 15.0  # extended to allow slower GUI startup
+PROBE_TIMEOUT = 20.0  # GUI probe runs a real extraction on a cache miss
+REQUEST_TIMEOUT = 10.0
+CONNECT_TIMEOUT = 0.5
 LOG_PATH = os.environ.get('FASTTUBE_BRIDGE_LOG', '/tmp/fasttube-bridge.log')
 
 def _log(msg: str):
@@ -22,11 +26,16 @@ def _log(msg: str):
         pass
 
 
+_stdout_lock = threading.Lock()
+
+
 def send_native_message(msg: dict):
+    # Called from request threads and the GUI link's reader thread
     data = json.dumps(msg).encode('utf-8')
-    sys.stdout.buffer.write(struct.pack('<I', len(data)))
-    sys.stdout.buffer.write(data)
-    sys.stdout.flush()
+    with _stdout_lock:
+        sys.stdout.buffer.write(struct.pack('<I', len(data)))
+        sys.stdout.buffer.write(data)
+        sys.stdout.flush()
     _log(f"sent {msg.get('status','?')} len={len(data)}")
 
 
@@ -52,209 +61,312 @@ def read_native_message():
         return None
 
 
-def _connect_and_send(payload: dict, timeout: float = 2.0):
-    # Open a socket to the GUI control server, send the payload and stream any
-    # JSON-lines received back to the connected extension process.
-    last = None
-    try:
-        s = socket.create_connection((HOST, PORT), timeout=timeout)
-    except Exception as e:
-        _log(f"connect GUI failed: {e}")
-        raise
-    try:
-        s.sendall((json.dumps(payload) + '\n').encode('utf-8'))
-        _log('sent payload to GUI')
-        # Read repeatedly until the GUI closes the connection. Each line is
-        # expected to be a JSON object followed by a newline. Forward each
-        # parsed object to the browser extension via native messaging.
-        s.settimeout(0.5)
+def _launch_gui():
+    """Start the GUI in the background. Returns an error status if it could not be started."""
+    launcher = '/usr/bin/fasttube-downloader'
+    env = os.environ.copy()
+    if not env.get('DISPLAY'):
+        env['DISPLAY'] = ':0'
+    if not env.get('XDG_RUNTIME_DIR'):
+        uid = os.getuid()
+        candidate = f"/run/user/{uid}"
+        if os.path.isdir(candidate):
+            env['XDG_RUNTIME_DIR'] = candidate
+    _log(f"launch env DISPLAY={env.get('DISPLAY')} XDG_RUNTIME_DIR={env.get('XDG_RUNTIME_DIR')}")
+
+    if os.path.exists(launcher) and os.access(launcher, os.X_OK):
+        try:
+            subprocess.Popen([launcher], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True, env=env)
+        except Exception as e:
+            _log(f"launcher exec failed: {e}")
+            return {"status": "error", "message": f"Launcher exec failed: {e}"}
+    else:
+        # Fallback to running from source tree (development mode)
+        script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        gui_path = os.path.join(script_dir, 'gui', 'main_window.py')
+        try:
+            subprocess.Popen(['python3', gui_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True, env=env)
+        except Exception as e:
+            _log(f"GUI launch failed: {e}")
+            return {"status": "error", "message": f"GUI launch failed: {e}"}
+    return None
+
+
+class GuiLink:
+    """
+    The bridge's one connection to the GUI control server.
+
+    Requests are tagged with a requestId, so several can be outstanding at
+    once; a reader thread blocks on the socket and hands each response to
+    the caller waiting for it. After subscribe(), pushed item events are
+    passed to on_event as they arrive (also after reconnecting). A dropped
+    connection is re-established by the next request, launching the GUI
+    first if nothing is listening.
+    """
+
+    def __init__(self, on_event, host=HOST, port=PORT):
+        self.on_event = on_event
+        self.host = host
+        self.port = port
+        self._lock = threading.Lock()  # connecting and sending
+        self._sock = None
+        self._ids = itertools.count(1)
+        self._pending = {}  # requestId -> [event, response, socket]
+        self._subscribed = False
+
+    def request(self, payload: dict, timeout: float = REQUEST_TIMEOUT, launch: bool = True) -> dict:
+        """Send payload and wait for its response. Raises OSError if the GUI can't be reached."""
+        rid = next(self._ids)
+        waiter = [threading.Event(), None, None]
+        self._pending[rid] = waiter
+        try:
+            self._send(dict(payload, requestId=rid), waiter, launch)
+            if not waiter[0].wait(timeout):
+                raise TimeoutError("GUI did not answer")
+            if waiter[1] is None:
+                raise ConnectionError("GUI connection lost")
+            resp = dict(waiter[1])
+            resp.pop('requestId', None)
+            return resp
+        finally:
+            self._pending.pop(rid, None)
+
+    def subscribe(self):
+        """Start forwarding progress and completion of every download item."""
+        if self._subscribed:
+            return
+        self._subscribed = True
+        with self._lock:
+            if self._sock is not None:
+                self._send_subscribe(self._sock)
+
+    def close(self):
+        with self._lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except Exception:
+                pass
+
+    def _send(self, obj: dict, waiter, launch: bool):
+        data = (json.dumps(obj) + '\n').encode('utf-8')
+        with self._lock:
+            sock = self._sock or self._connect(launch)
+            waiter[2] = sock
+            try:
+                sock.sendall(data)
+            except OSError as e:
+                _log(f"send to GUI failed: {e}")
+                self._sock = None
+                raise
+
+    def _connect(self, launch: bool):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+        except OSError as e:
+            if not launch:
+                raise
+            _log(f"GUI not reachable ({e}); launching")
+            err = _launch_gui()
+            if err:
+                raise ConnectionError(err['message'])
+            # Early status so the extension can surface feedback
+            send_native_message({"status": "launching"})
+            sock = self._wait_for_gui()
+        sock.settimeout(None)
+        self._sock = sock
+        threading.Thread(target=self._read, args=(sock,), daemon=True).start()
+        if self._subscribed:
+            self._send_subscribe(sock)
+        _log('connected to GUI')
+        return sock
+
+    def _send_subscribe(self, sock):
+        # The reply carries an id nobody waits for and is dropped by _dispatch
+        try:
+            sock.sendall((json.dumps({'action': 'subscribe', 'items': '*', 'requestId': next(self._ids)}) + '\n').encode('utf-8'))
+        except OSError as e:
+            _log(f"subscribe failed: {e}")
+
+    def _wait_for_gui(self):
+        _log(f"retrying connect for up to {LAUNCH_RETRY_SECONDS}s")
+        deadline = time.time() + LAUNCH_RETRY_SECONDS
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return socket.create_connection((self.host, self.port), timeout=1.6)
+            except OSError as e:
+                if time.time() >= deadline:
+                    raise ConnectionError(f"GUI unreachable after {attempt} attempts: {e}")
+                time.sleep(0.4)
+
+    def _read(self, sock):
         buf = b''
         while True:
             try:
-                chunk = s.recv(4096)
-                if not chunk:
-                    break
-                buf += chunk
-                while b'\n' in buf:
-                    line, buf = buf.split(b'\n', 1)
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        obj = json.loads(line.decode('utf-8'))
-                        last = obj
-                        send_native_message(obj)
-                        _log(f"forwarded from GUI: {obj.get('status')}")
-                    except Exception:
-                        # ignore malformed lines
-                        pass
-            except socket.timeout:
-                # continue reading until closed
-                continue
-            except Exception as e:
-                _log(f"recv error: {e}")
-                raise
-    finally:
+                chunk = sock.recv(65536)
+            except OSError:
+                chunk = b''
+            if not chunk:
+                break
+            buf += chunk
+            while b'\n' in buf:
+                line, buf = buf.split(b'\n', 1)
+                self._dispatch(line)
+        _log('GUI connection closed')
+        with self._lock:
+            if self._sock is sock:
+                self._sock = None
         try:
-            s.close()
+            sock.close()
         except Exception:
             pass
-    return last or {"status": "queued"}
-
-def _retry_connect(payload: dict, total_wait: float = 5.0):
-    deadline = time.time() + total_wait
-    attempt = 0
-    last_err = None
-    while time.time() < deadline:
-        attempt += 1
+        # Anyone still waiting on this connection gets "connection lost"
+        for waiter in list(self._pending.values()):
+            if waiter[2] is sock:
+                waiter[0].set()
+
+    def _dispatch(self, line: bytes):
         try:
-            return _connect_and_send(payload, timeout=1.6)
-        except Exception as e:
-            last_err = e
-            time.sleep(0.4)
-    # If we never connected, propagate an error status (so extension can surface problem)
-    return {"status": "error", "message": f"GUI unreachable after {attempt} attempts: {last_err}"}
+            obj = json.loads(line.decode('utf-8'))
+        except ValueError:
+            return  # ignore malformed lines
+        if not isinstance(obj, dict):
+            return
+        waiter = self._pending.get(obj.get('requestId'))
+        if waiter is not None:
+            waiter[1] = obj
+            waiter[0].set()
+        elif obj.get('event'):
+            try:
+                self.on_event(obj)
+            except Exception as e:
+                _log(f"event forward failed: {e}")
 
 
-def forward_to_gui(payload: dict) -> dict:
+def forward_to_gui(link: GuiLink, payload: dict) -> dict:
     """
-    Forward a request to the GUI control server.
+    Forward a request to the GUI control server over the persistent link.
 
-    Behaviour:
-    - If a GUI instance is already listening on HOST:PORT, send the payload and
-      stream responses back to the browser.
-    - If not reachable, attempt to launch the GUI and then retry connecting for
-      a short period.
+    If no GUI instance is listening, it is launched and the request is sent
+    once it accepts connections.
     """
-    # Quick reachability probe (separate from _connect_and_send, which swallows errors)
     try:
-        s = socket.create_connection((HOST, PORT), timeout=0.2)
-        try:
-            s.close()
-        except Exception:
-            pass
-        # Server is up; use the streaming helper
-        _log('GUI reachable; streaming')
-        return _connect_and_send(payload, timeout=0.2)
-    except Exception:
-        # Not reachable; try to launch the GUI
-        try:
-            launcher = '/usr/bin/fasttube-downloader'
-            launched = False
-            env = os.environ.copy()
-            if not env.get('DISPLAY'):
-                env['DISPLAY'] = ':0'
-            if not env.get('XDG_RUNTIME_DIR'):
-                uid = os.getuid()
-                candidate = f"/run/user/{uid}"
-                if os.path.isdir(candidate):
-                    env['XDG_RUNTIME_DIR'] = candidate
-            _log(f"launch env DISPLAY={env.get('DISPLAY')} XDG_RUNTIME_DIR={env.get('XDG_RUNTIME_DIR')}")
-
-            if os.path.exists(launcher) and os.access(launcher, os.X_OK):
-                try:
-                    subprocess.Popen([launcher], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True, env=env)
-                    launched = True
-                except Exception as e:
-                    _log(f"launcher exec failed: {e}")
-                    return {"status": "error", "message": f"Launcher exec failed: {e}"}
-            else:
-                # Fallback to running from source tree (development mode)
-                script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                gui_path = os.path.join(script_dir, 'gui', 'main_window.py')
-                try:
-                    subprocess.Popen(['python3', gui_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True, env=env)
-                    launched = True
-                except Exception as e:
-                    _log(f"GUI launch failed: {e}")
-                    return {"status": "error", "message": f"GUI launch failed: {e}"}
-
-            # Send early status so extension can surface feedback
-            if launched:
-                _log('GUI launching...')
-                send_native_message({"status": "launching"})
-            # After launching, wait a bit longer and retry connecting
-            _log(f"retrying connect for up to {LAUNCH_RETRY_SECONDS}s")
-            return _retry_connect(payload, total_wait=LAUNCH_RETRY_SECONDS)
-        except Exception as e:
-            _log(f"GUI launch wrapper failed: {e}")
-            return {"status": "error", "message": f"GUI launch wrapper failed: {e}"}
+        return link.request(payload)
+    except OSError as e:
+        _log(f"forward failed: {e}")
+        return {"status": "error", "message": str(e)}
+
+
+def _probe_via_gui(link: GuiLink, url: str):
+    """Ask an already running GUI to probe url. Returns None if it is not reachable."""
+    try:
+        resp = link.request({'action': 'probe', 'url': url}, timeout=PROBE_TIMEOUT, launch=False)
+        return resp if isinstance(resp, dict) else None
+    except OSError as e:
+        _log(f"probe via GUI failed: {e}")
+        return None
+
+
+def _probe_local(url: str) -> dict:
+    try:
+        p = subprocess.run(['yt-dlp', '-J', '--no-warnings', '--no-playlist', url], capture_output=True, text=True, timeout=15)
+        if p.returncode != 0:
+            raise RuntimeError(p.stderr.strip() or 'yt-dlp failed')
+        info = json.loads(p.stdout)
+        fmts = info.get('formats') or []
+        heights = sorted({ f.get('height') for f in fmts if f.get('height') }, reverse=True)
+        qualities = [h for h in heights if isinstance(h, int)]
+        audio_only = any((f.get('vcodec') in (None, 'none')) for f in fmts)
+        def _size_mb(f):
+            sz = f.get('filesize') or f.get('filesize_approx')
+            return round(sz/1024/1024, 1) if isinstance(sz, (int,float)) else None
+        fmt_list = []
+        for f in fmts:
+            fid = f.get('format_id')
+            if not fid:
+                continue
+            h = f.get('height')
+            ext = f.get('ext')
+            vcodec = f.get('vcodec')
+            acodec = f.get('acodec')
+            fps = f.get('fps')
+            size = _size_mb(f)
+            progressive = (vcodec not in (None,'none')) and (acodec not in (None,'none'))
+            fmt_list.append({
+                'id': str(fid),
+                'height': h,
+                'ext': ext,
+                'fps': fps,
+                'sizeMB': size,
+                'vcodec': vcodec,
+                'acodec': acodec,
+                'progressive': progressive
+            })
+        return { 'status': 'ok', 'qualities': qualities, 'audio_only': audio_only, 'formats': fmt_list }
+    except Exception as e:
+        _log(f"probe error: {e}")
+        return { 'status': 'error', 'message': str(e) }
+
+
+def handle_request(link: GuiLink, req):
+    _log(f"handling action={req.get('action') if isinstance(req, dict) else None}")
+    if not isinstance(req, dict):
+        send_native_message({"status": "error", "message": "Invalid request"})
+        return
+    if not req.get('action') and req.get('url'):
+        req['action'] = 'enqueue'
+        _log('action missing; defaulting to enqueue')
+    # Probe: ask the running GUI (warm extractor + cache), else run yt-dlp here
+    if req.get('action') == 'probe' and req.get('url'):
+        resp = _probe_via_gui(link, req['url'])
+        if resp is None:
+            resp = _probe_local(req['url'])
+        send_native_message(resp)
+        return
+
+    # Normalize enqueue fields
+    payload = {
+        'action': 'enqueue',
+        'url': req.get('url'),
+        'title': req.get('title'),
+        'format': req.get('format'),
+        'formatId': req.get('formatId'),
+        'quality': req.get('quality'),
+        'subs': req.get('subs'),
+        'show': True,
+        'confirm': bool(req.get('confirm'))
+    }
+    if not payload['url']:
+        send_native_message({"status": "error", "message": "No URL"})
+        return
+    _log('forwarding to GUI...')
+    result = forward_to_gui(link, payload)
+    _log(f"forward result: {result.get('status')}")
+    if req.get('requestId') is not None:
+        result['requestId'] = req['requestId']
+    send_native_message(result)
+    # Only now: a one-shot sendNativeMessage caller takes the first message as its reply
+    if result.get('status') != 'error':
+        link.subscribe()
 
 
 def main():
+    link = GuiLink(send_native_message)
+    workers = []
     while True:
         req = read_native_message()
         if req is None:
             break
-        _log(f"handling action={req.get('action')}")
-        if not isinstance(req, dict):
-            send_native_message({"status": "error", "message": "Invalid request"})
-            continue
-        if not req.get('action') and req.get('url'):
-            req['action'] = 'enqueue'
-            _log('action missing; defaulting to enqueue')
-        # Handle probe request via yt-dlp JSON output
-        if req.get('action') == 'probe' and req.get('url'):
-            try:
-                import subprocess, json as _json
-                p = subprocess.run(['yt-dlp', '-J', '--no-warnings', '--no-playlist', req['url']], capture_output=True, text=True, timeout=15)
-                if p.returncode != 0:
-                    raise RuntimeError(p.stderr.strip() or 'yt-dlp failed')
-                info = _json.loads(p.stdout)
-                fmts = info.get('formats') or []
-                heights = sorted({ f.get('height') for f in fmts if f.get('height') }, reverse=True)
-                qualities = [h for h in heights if isinstance(h, int)]
-                audio_only = any((f.get('vcodec') in (None, 'none')) for f in fmts)
-                def _size_mb(f):
-                    sz = f.get('filesize') or f.get('filesize_approx')
-                    return round(sz/1024/1024, 1) if isinstance(sz, (int,float)) else None
-                fmt_list = []
-                for f in fmts:
-                    fid = f.get('format_id')
-                    if not fid:
-                        continue
-                    h = f.get('height')
-                    ext = f.get('ext')
-                    vcodec = f.get('vcodec')
-                    acodec = f.get('acodec')
-                    fps = f.get('fps')
-                    size = _size_mb(f)
-                    progressive = (vcodec not in (None,'none')) and (acodec not in (None,'none'))
-                    fmt_list.append({
-                        'id': str(fid),
-                        'height': h,
-                        'ext': ext,
-                        'fps': fps,
-                        'sizeMB': size,
-                        'vcodec': vcodec,
-                        'acodec': acodec,
-                        'progressive': progressive
-                    })
-                send_native_message({ 'status': 'ok', 'qualities': qualities, 'audio_only': audio_only, 'formats': fmt_list })
-            except Exception as e:
-                _log(f"probe error: {e}")
-                send_native_message({ 'status': 'error', 'message': str(e) })
-            continue
-
-        # Normalize enqueue fields
-        payload = {
-            'action': 'enqueue',
-            'url': req.get('url'),
-            'title': req.get('title'),
-            'format': req.get('format'),
-            'formatId': req.get('formatId'),
-            'quality': req.get('quality'),
-            'subs': req.get('subs'),
-            'show': True,
-            'confirm': bool(req.get('confirm'))
-        }
-        if not payload['url']:
-            send_native_message({"status": "error", "message": "No URL"})
-            continue
-        _log('forwarding to GUI...')
-        result = forward_to_gui(payload)
-        _log(f"forward result: {result.get('status')}")
-        send_native_message(result)
+        # Messages are handled concurrently; a slow probe doesn't hold up enqueues
+        t = threading.Thread(target=handle_request, args=(link, req), daemon=True)
+        t.start()
+        workers = [w for w in workers if w.is_alive()] + [t]
+    for t in workers:
+        t.join(PROBE_TIMEOUT)
+    link.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for the native host's persistent connection to the GUI.
+Run with: python3 -m tests.test_bridge_link
+"""
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("FASTTUBE_BRIDGE_LOG", os.path.join(tempfile.mkdtemp(), "bridge.log"))
+
+from gui.control_server import ControlServer
+from native_host import bridge
+
+
+def handler(req):
+    if req.get("action") == "probe":
+        time.sleep(0.3)
+        return {"status": "ok", "qualities": [1080]}
+    return {"status": "queued", "url": req.get("url")}
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.time() + timeout
+    while not cond():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+server = ControlServer(handler, port=0)
+assert server.start()
+port = server.port
+events = []
+link = bridge.GuiLink(events.append, port=port)
+
+# Overlapping requests share one connection and each gets its own answer
+results = {}
+
+
+def call(name, payload, timeout):
+    results[name] = link.request(payload, timeout=timeout, launch=False)
+
+
+threads = [threading.Thread(target=call, args=("probe", {"action": "probe", "url": "u"}, 5)),
+           threading.Thread(target=call, args=("enqueue", {"action": "enqueue", "url": "v"}, 5))]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+assert results == {"probe": {"status": "ok", "qualities": [1080]}, "enqueue": {"status": "queued", "url": "v"}}
+assert len(server._conns) == 1
+
+# Pushed item events arrive once subscribed, and again after reconnecting
+server.publish("abc", {"event": "progress", "status": "progress", "id": "abc", "url": "v"}, kind="progress")
+time.sleep(0.1)
+assert events == []
+link.subscribe()
+wait_for(lambda: server._subscribers == 1)
+server.publish("abc", {"event": "finished", "status": "finished", "id": "abc", "url": "v"})
+wait_for(lambda: events)
+assert events[0]["status"] == "finished" and events[0]["url"] == "v"
+
+# The GUI goes away: nothing to launch here, then a new instance is picked up again
+server.stop()
+wait_for(lambda: link._sock is None)
+try:
+    link.request({"action": "enqueue", "url": "w"}, launch=False)
+    raise AssertionError("expected the GUI to be unreachable")
+except OSError:
+    pass
+server = ControlServer(handler, port=port)
+assert server.start()
+assert link.request({"action": "enqueue", "url": "w"}, launch=False) == {"status": "queued", "url": "w"}
+assert bridge.forward_to_gui(link, {"action": "enqueue", "url": "x"})["status"] == "queued"
+wait_for(lambda: server._subscribers == 1)
+server.publish("def", {"event": "error", "status": "error", "id": "def", "url": "x"})
+wait_for(lambda: len(events) == 2)
+link.close()
+server.stop()
+
+print("PASS: bridge keeps one multiplexed GUI connection, forwards pushes and reconnects")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for the asyncio control server.
+Run with: python3 -m tests.test_control_server
+"""
+import json
+import socket
+import threading
+import time
+
+from gui.control_server import MAX_BATCH, ControlServer, batch_entries, parse_request, terminal_event
+
+assert parse_request("https://youtu.be/x") == {"action": "enqueue", "url": "https://youtu.be/x"}
+assert parse_request('"str"') == {} and parse_request('{"action": "show"}') == {"action": "show"}
+
+# enqueue_batch entries: request-level options apply to all, entries override, defaults fill in
+defaults = {"format": "Best (default)", "quality": "1080", "subs": False}
+got = batch_entries({"format": "Audio Only", "subs": "y", "entries": [
+    "https://youtu.be/a",
+    {"url": " https://youtu.be/b ", "format": "Best Video + Audio", "quality": 720, "priority": "top"},
+    {"url": "https://example.com/f.pdf", "fileType": "document", "format": "Best (default)"},
+    {"url": "https://youtu.be/c", "formatId": "137+140", "quality": "480"},
+    {"title": "no url"},
+    {"url": "https://youtu.be/d", "priority": "high"},
+]}, defaults)
+assert got[0] == {"url": "https://youtu.be/a", "format": "Audio Only", "quality": "1080", "subs": True,
+                  "title": None, "folder": None, "category": None, "priority": None, "generic": False}
+assert (got[1]["url"], got[1]["format"], got[1]["quality"], got[1]["priority"]) == ("https://youtu.be/b", "Best Video + Audio", "720", "top")
+assert got[2]["generic"] and got[2]["format"] == "Generic File"
+assert (got[3]["format"], got[3]["quality"]) == ("137+140", "")
+assert got[4] == {"error": "No URL"} and "priority" in got[5]["error"]
+assert batch_entries({"urls": ["x"]}, {})[0]["subs"] is False
+for bad in ({}, {"entries": []}, {"entries": "x"}, {"entries": ["u"] * (MAX_BATCH + 1)}):
+    try:
+        batch_entries(bad, defaults)
+        raise AssertionError(bad)
+    except ValueError:
+        pass
+
+seen = []
+
+
+def handler(req):
+    seen.append(req)
+    if req.get("action") == "slow":
+        time.sleep(0.3)
+    return {"status": "ok", "echo": req.get("url") or req.get("action")}
+
+
+server = ControlServer(handler, port=0)
+assert server.start() and server.port
+
+
+def connect():
+    return socket.create_connection(("127.0.0.1", server.port), timeout=5)
+
+
+def read_lines(sock, n):
+    buf, out = b"", []
+    while len(out) < n:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+        while b"\n" in buf:
+            line, buf = buf.split(b"\n", 1)
+            out.append(json.loads(line))
+    return out
+
+
+# Untagged request: one response, then the server closes (original protocol)
+s = connect()
+s.sendall(b"https://example.com/a.zip\n")
+assert read_lines(s, 1) == [{"status": "ok", "echo": "https://example.com/a.zip"}]
+assert s.recv(10) == b""
+s.close()
+
+# Tagged requests share one connection and complete out of order
+s = connect()
+s.sendall(b'{"action": "slow", "requestId": 1}\n{"action": "fast", "requestId": 2}\n')
+resp = read_lines(s, 2)
+assert [r["requestId"] for r in resp] == [2, 1] and resp[1]["echo"] == "slow"
+
+# Subscriptions: pushes are coalesced to the latest state per item and kind
+s.sendall(b'{"action": "subscribe", "items": ["7"], "requestId": 3}\n')
+assert read_lines(s, 1)[0] == {"status": "subscribed", "items": ["7"], "requestId": 3}
+for pct in range(200):
+    server.publish("7", {"event": "progress", "id": "7", "percent": pct}, kind="progress")
+server.publish("8", {"event": "progress", "id": "8", "percent": 1}, kind="progress")
+server.publish("7", {"event": "finished", "id": "7"})
+pushed = []
+while not pushed or pushed[-1].get("event") != "finished":
+    pushed += read_lines(s, 1)
+progress = [p["percent"] for p in pushed if p["event"] == "progress"]
+assert progress[-1] == 199 and len(progress) < 200 and progress == sorted(progress)
+assert all(p["id"] == "7" for p in pushed)
+
+# Every terminal status is pushed: "Error: ..." statuses as errors carrying the message
+assert terminal_event("Downloading...", url="u") is None and terminal_event("Paused") is None
+assert terminal_event("Completed", url="u") == {"url": "u", "status": "finished"}
+assert terminal_event("Failed")["message"] == "Failed"
+server.publish("7", dict(terminal_event("Error: HTTP Error 403: Forbidden", url="u"), event="error", id="7"))
+[err] = read_lines(s, 1)
+assert (err["status"], err["message"], err["url"]) == ("error", "HTTP Error 403: Forbidden", "u")
+s.close()
+
+# A burst of clients beyond the old listen(5) backlog is served in full
+results = []
+
+
+def burst(n):
+    c = connect()
+    c.sendall(json.dumps({"action": "enqueue", "url": f"u{n}"}).encode() + b"\n")
+    results.append(read_lines(c, 1)[0]["echo"])
+    c.close()
+
+
+threads = [threading.Thread(target=burst, args=(n,)) for n in range(100)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+assert sorted(results) == sorted(f"u{n}" for n in range(100))
+
+# A second server cannot take the same port
+assert not ControlServer(handler, port=server.port).start()
+server.stop()
+
+print("PASS: control server multiplexes tagged requests, coalesces pushes, normalizes batches and keeps the legacy protocol")
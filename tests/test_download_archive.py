@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for the download archive used by playlist sync.
+Run with: python3 -m tests.test_download_archive
+"""
+import os
+import tempfile
+
+from gui.download_archive import DownloadArchive, archive_key
+
+assert archive_key("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL1") == ("youtube", "dQw4w9WgXcQ")
+assert archive_key("https://youtu.be/dQw4w9WgXcQ?t=3") == ("youtube", "dQw4w9WgXcQ")
+assert archive_key("https://m.youtube.com/shorts/abcdefghijk") == ("youtube", "abcdefghijk")
+assert archive_key("https://www.youtube.com/playlist?list=PL1") is None
+assert archive_key("https://example.com/file.zip") is None
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "archive.txt")
+    # Existing yt-dlp archive lines are honoured
+    with open(path, "w") as fh:
+        fh.write("youtube AAAAAAAAAAA\n\n")
+    a = DownloadArchive(path)
+    assert ("youtube", "AAAAAAAAAAA") in a and len(a) == 1
+    assert a.add("Youtube", "BBBBBBBBBBB")
+    assert not a.add("youtube", "BBBBBBBBBBB"), "duplicates must not be appended"
+    assert a.add_url("https://youtu.be/CCCCCCCCCCC")
+    with open(path) as fh:
+        assert fh.read().split("\n")[-3:] == ["youtube BBBBBBBBBBB", "youtube CCCCCCCCCCC", ""]
+    # Changes made by another writer become visible after reload()
+    with open(path, "a") as fh:
+        fh.write("vimeo 12345\n")
+    assert not a.contains("vimeo", "12345")
+    a.reload()
+    assert a.contains("vimeo", "12345") and len(a) == 4
+
+print("PASS: DownloadArchive reads/writes yt-dlp archive format and dedupes")
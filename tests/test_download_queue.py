@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for priority dispatch in the download queue.
+Run with: python3 -m tests.test_download_queue
+"""
+from gui.download_queue import DownloadQueue
+
+
+class FakeItem:
+    def __init__(self, name, status="Queued", playlist_id=None, url=None):
+        self.name = name
+        self.id = name
+        self.url = url or f"https://example.com/{name}.zip"
+        self.kind = "media"
+        self.host = None
+        self.extractor = None
+        self.status = status
+        self.playlist_id = playlist_id
+        self.playlist_name = None
+        self.priority = 0
+        self.queue_seq = 0
+        self.heap_token = None
+
+
+def drain(q):
+    out = []
+    while True:
+        it = q.pop_next()
+        if it is None:
+            return out
+        out.append(it.name)
+
+
+# FIFO within equal priority; non-ready items are skipped
+q = DownloadQueue()
+a, b, c = FakeItem("a"), FakeItem("b"), FakeItem("c", status="Resolving")
+for it in (a, b, c):
+    q.append(it)
+assert drain(q) == ["a", "b"], "equal priority must dispatch in enqueue order"
+q.set_status(c, "Queued")
+assert drain(q) == ["c"]
+
+# Move to top / bottom and explicit priority
+q = DownloadQueue()
+items = [FakeItem(n) for n in "abcde"]
+for it in items:
+    q.append(it)
+q.move_to_top(items[3])
+q.move_to_bottom(items[0])
+q.set_priority(items[2], 5)
+assert [it.name for it in q] == ["d", "b", "c", "e", "a"], "display order follows moves"
+assert drain(q) == ["c", "d", "b", "e", "a"], "unexpected dispatch order"
+
+# Per-playlist priority applies to existing and future members
+q = DownloadQueue()
+q.append(FakeItem("solo"))
+q.append(FakeItem("p1", playlist_id="PL"))
+assert q.set_playlist_priority("PL", 3) == 1
+q.append(FakeItem("p2", playlist_id="PL"))
+assert drain(q) == ["p1", "p2", "solo"]
+
+# Removed and no-longer-ready items are never dispatched
+q = DownloadQueue()
+x, y = FakeItem("x"), FakeItem("y")
+q.append(x)
+q.append(y)
+q.remove(x)
+q.set_status(y, "Downloading...")
+assert not q.has_ready() and q.pop_next() is None
+assert len(q) == 1 and y in q and x not in q
+
+# Id / URL indexes and incremental status counters
+q = DownloadQueue()
+m1, m2, m3 = FakeItem("m1"), FakeItem("m2", status="Resolving"), FakeItem("m3", url="https://example.com/m1.zip")
+for it in (m1, m2, m3):
+    q.append(it)
+assert q.get("m2") is m2 and q.get("nope") is None
+assert q.find_url("https://example.com/m1.zip") is m1
+assert q.count("Queued") == 2 and q.count("Resolving") == 1
+q.set_status(m2, "Queued")
+q.set_status(m1, "Downloading...")
+assert q.counts() == {"Queued": 2, "Downloading...": 1}
+q.remove(m1)
+assert q.find_url("https://example.com/m1.zip") is m3
+assert q.counts() == {"Queued": 2}
+q.clear()
+assert q.counts() == {} and len(q) == 0
+
+# Per-host / per-extractor caps let other hosts fill idle slots
+q = DownloadQueue()
+q.set_limits(per_host=0, limits={"youtube": 1})
+yt1 = FakeItem("yt1", url="https://www.youtube.com/watch?v=1")
+yt2 = FakeItem("yt2", url="https://youtu.be/2")
+other = FakeItem("other", url="https://files.example.org/big.iso")
+for it in (yt1, yt2, other):
+    q.append(it)
+first = q.pop_next()
+q.mark_running(first)
+assert first is yt1 and yt1.extractor == "youtube" and yt2.extractor == "youtube"
+assert q.pop_next() is other, "capped extractor must not block other hosts"
+assert q.pop_next() is None and q.has_ready()
+assert q.prune_running(lambda it: False) == 0
+assert q.pop_next() is yt2
+
+print("PASS: DownloadQueue priority dispatch, reordering, host caps and indexes")
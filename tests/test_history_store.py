@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for the SQLite history store: paged search, daily totals,
+retention compaction and history.json migration.
+Run with: python3 -m tests.test_history_store
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from gui.history_store import HistoryStore
+
+tmp = tempfile.mkdtemp()
+legacy = os.path.join(tmp, "history.json")
+with open(legacy, "w") as fh:
+    json.dump([
+        {"time": "2024-01-02 03:04:05", "title": "Old", "url": "https://youtu.be/abc", "status": "Completed", "path": "/d/old.mp4"},
+        {"time": "2024-01-03 03:04:05", "title": "Broken", "url": "https://example.com/x.zip", "status": "Failed", "path": ""},
+    ], fh)
+
+# First open imports history.json once and moves it aside
+db = os.path.join(tmp, "history.db")
+store = HistoryStore(db, legacy_json=legacy)
+assert len(store) == 2 and not os.path.exists(legacy) and os.path.exists(legacy + ".migrated")
+rows = list(store.rows())
+assert rows[0]["time"] == "2024-01-02 03:04:05" and rows[0]["host"] == "youtu.be"
+
+# Appends from many threads, counted through the status index
+threads = [threading.Thread(target=lambda n=n: store.add(f"T{n}", f"https://e.com/{n}", "Completed", f"/d/{n}"))
+           for n in range(50)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+assert store.count("Completed") == 51 and store.count("Failed") == 1
+assert store.find_url("https://e.com/7")[0]["path"] == "/d/7"
+store.close()
+
+# Durable across reopen; a missing legacy file is a no-op
+store = HistoryStore(db, legacy_json=legacy)
+assert len(store) == 52
+
+# Paged, newest first, filtered by words, status and time range (FTS5 and LIKE)
+store.add("Lo-fi Beats Mix", "https://www.youtube.com/watch?v=lofi", "Completed", ts=2e9)
+for fts in (store.fts, False):
+    store.fts = fts
+    first = store.page(0, 10)
+    assert len(first) == 10 and first[0]["title"] == "Lo-fi Beats Mix"
+    assert [r["id"] for r in store.page(10, 10)] != [r["id"] for r in first]
+    assert len(store.page(0, 100)) == 53 and store.page(100, 10) == []
+    assert [r["title"] for r in store.page(query="beats LO")] == ["Lo-fi Beats Mix"]
+    assert [r["title"] for r in store.page(query="example.com")] == ["Broken"]
+    assert [r["title"] for r in store.page(status="Failed")] == ["Broken"]
+    assert [r["title"] for r in store.page(until=1704330000)] == ["Broken", "Old"]
+    assert store.page(query="beats", since=2e9 + 1) == []
+# Per-day totals are kept by the insert trigger and survive compaction
+day = time.mktime((2030, 5, 1, 12, 0, 0, 0, 0, -1))
+store.add("A", "https://cdn.example.org/a.iso", "Completed", ts=day, size=4000, duration=2.0, backend="aria2c")
+store.add("B", "https://cdn.example.org/b.iso", "Completed", ts=day + 60, size=6000, duration=3.0, backend="aria2c")
+store.add("C", "https://cdn.example.org/c.iso", "Failed", ts=day + 120, size=500, backend="aria2c")
+[cdn] = store.daily(host="cdn.example.org")
+assert cdn["day"] == "2030-05-01" and cdn["backend"] == "aria2c"
+assert (cdn["completed"], cdn["failed"], cdn["bytes"]) == (2, 1, 10500) and cdn["throughput"] == 2000.0
+before = store.totals()
+assert before["completed"] == store.count("Completed") == 54
+assert store.compact(30, now=day + 86400) == 52 and len(store) == 4
+assert store.totals() == before and store.compact(0) == 0
+store.close()
+
+# A database from before the stats columns is upgraded and summarized on open
+old = os.path.join(tmp, "old.db")
+con = sqlite3.connect(old)
+con.execute("CREATE TABLE history (id INTEGER PRIMARY KEY, ts REAL NOT NULL, title TEXT NOT NULL DEFAULT '', "
+            "url TEXT NOT NULL DEFAULT '', status TEXT NOT NULL DEFAULT '', path TEXT NOT NULL DEFAULT '', "
+            "host TEXT NOT NULL DEFAULT '')")
+con.execute("INSERT INTO history (ts, title, url, status, host) VALUES (1e9, 'x', 'https://a.b/x', 'Completed', 'a.b')")
+con.commit()
+con.close()
+upgraded = HistoryStore(old)
+assert upgraded.totals()["completed"] == 1 and upgraded.page(query="x")[0]["backend"] == ""
+upgraded.close()
+
+store = HistoryStore(db)
+store.clear()
+assert len(store) == 0 and store.totals()["completed"] == 0 and store.daily() == []
+store.close()
+
+print("PASS: HistoryStore pages, searches, keeps daily totals through compaction and migrates")
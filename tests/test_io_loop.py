@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for the shared child-process reader loop.
+Run with: python3 -m tests.test_io_loop
+"""
+import subprocess
+import sys
+import threading
+
+from gui.io_loop import IoLoop, LineSplitter
+
+# Carriage-return redraws split like newlines; partial lines wait for their end
+sp = LineSplitter()
+assert sp.feed(b"[#1 1MiB/9MiB(11%)]\r[#1 2MiB/9MiB(22%)]\r[#1 3Mi") == ["[#1 1MiB/9MiB(11%)]", "[#1 2MiB/9MiB(22%)]"]
+assert sp.feed(b"B/9MiB(33%)]\r\n\n  done  \n") == ["[#1 3MiB/9MiB(33%)]", "done"]
+assert sp.feed("café".encode()[:4]) == [] and sp.feed("café\n".encode()[4:]) == ["café"]
+assert sp.feed(b"tail") == [] and sp.flush() == ["tail"]
+
+# Many children, one reader thread
+CHILD = r"""
+import sys, time
+for i in range(5):
+    sys.stdout.write("line %d\r" % i); sys.stdout.flush(); time.sleep(0.01)
+print("bye")
+"""
+loop = IoLoop()
+before = threading.active_count()
+got, finished, lock = {}, threading.Event(), threading.Lock()
+procs = [subprocess.Popen([sys.executable, "-c", CHILD], stdout=subprocess.PIPE) for _ in range(12)]
+
+def _eof(n):
+    with lock:
+        got.setdefault(n, []).append("EOF")
+        if sum(1 for v in got.values() if v[-1] == "EOF") == len(procs):
+            finished.set()
+
+for n, proc in enumerate(procs):
+    loop.add(proc.stdout.fileno(), lambda lines, n=n: got.setdefault(n, []).extend(lines), lambda n=n: _eof(n))
+assert finished.wait(20), got
+assert threading.active_count() <= before + 1, "one thread regardless of child count"
+for n in range(len(procs)):
+    assert got[n] == ["line 0", "line 1", "line 2", "line 3", "line 4", "bye", "EOF"], got[n]
+for proc in procs:
+    proc.wait()
+    proc.stdout.close()
+loop.stop()
+
+print("PASS: IoLoop multiplexes child output on one thread and splits on CR/LF")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for the bounded metadata resolver pool.
+Run with: python3 -m tests.test_metadata_resolver
+"""
+import threading
+import time
+
+from gui.metadata_resolver import ResolverPool
+
+
+class Item:
+    def __init__(self, name, priority=0, seq=0):
+        self.url = name
+        self.priority = priority
+        self.queue_seq = seq
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.time() + timeout
+    while not cond():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+gate = threading.Event()
+lock = threading.Lock()
+running = 0
+peak = 0
+order = []
+
+
+def resolve(item):
+    global running, peak
+    with lock:
+        running += 1
+        peak = max(peak, running)
+    gate.wait()
+    with lock:
+        running -= 1
+        order.append(item.url)
+
+
+# Never more lookups at once than workers, however many items are queued
+pool = ResolverPool(resolve, workers=2)
+items = [Item(f"u{n}", seq=n) for n in range(10)]
+for it in items:
+    pool.submit(it)
+pool.submit(items[5])  # duplicates are ignored
+wait_for(lambda: running == 2)
+time.sleep(0.1)
+assert running == 2 and len(pool._threads) == 2 and pool.pending() == 8
+gate.set()
+wait_for(lambda: len(order) == 10)
+assert peak == 2 and sorted(order) == sorted(it.url for it in items)
+pool.stop()
+
+# Head of the queue first; bump() moves an item up, discard() skips it
+order.clear()
+gate.clear()
+pool = ResolverPool(resolve, workers=1)
+blocker = Item("blocker", seq=-1)
+pool.submit(blocker)
+wait_for(lambda: running == 1)
+late = [Item(f"q{n}", seq=n) for n in range(5)]
+for it in reversed(late):
+    pool.submit(it)
+late[4].priority = 10
+pool.bump(late[4])
+pool.discard(late[2])
+assert pool.pending() == 4
+gate.set()
+wait_for(lambda: len(order) == 5)
+time.sleep(0.1)
+assert order == ["blocker", "q4", "q0", "q1", "q3"], order
+
+# clear() drops everything pending; a stopped pool takes no more work
+gate.clear()
+order.clear()
+pool.submit(Item("busy"))
+wait_for(lambda: running == 1)
+pool.submit(Item("dropped"))
+pool.clear()
+gate.set()
+wait_for(lambda: order == ["busy"])
+pool.stop()
+pool.submit(Item("after-stop"))
+time.sleep(0.1)
+assert order == ["busy"] and pool.pending() == 0
+
+print("PASS: ResolverPool bounds lookups, resolves the queue head first, honours bump() and skips removed items")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for metadata service caching and probe summaries.
+Run with: python3 -m tests.test_metadata_service
+"""
+from gui.metadata_service import MetadataService, summarize_formats
+
+
+class CountingService(MetadataService):
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self.calls = 0
+
+    def _extract(self, url, flat, process=False):
+        self.calls += 1
+        return {
+            'title': f" Title of {url} ",
+            'formats': [
+                {'format_id': '18', 'height': 360, 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'mp4a', 'filesize': 10 * 1024 * 1024},
+                {'format_id': '137', 'height': 1080, 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'none'},
+                {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a'},
+            ],
+        }
+
+
+svc = CountingService(cache_size=2, ttl=60)
+assert svc.title("u1") == "Title of u1"
+probe = svc.probe("u1")
+assert svc.calls == 1, "title and probe must share one extraction"
+assert probe['qualities'] == [1080, 360] and probe['audio_only'] is True
+assert probe['formats'][0] == {'id': '18', 'height': 360, 'ext': 'mp4', 'fps': None, 'sizeMB': 10.0,
+                               'vcodec': 'avc1', 'acodec': 'mp4a', 'progressive': True}
+assert probe == summarize_formats(svc.info("u1"))
+
+# LRU eviction and explicit invalidation
+svc.title("u2")
+svc.title("u3")
+assert svc.calls == 3
+svc.title("u1")
+assert svc.calls == 4, "oldest entry must have been evicted"
+svc.invalidate("u1")
+svc.title("u1")
+assert svc.calls == 5
+
+# Expired entries are refetched
+svc = CountingService(ttl=0)
+svc.title("x")
+svc.title("x")
+assert svc.calls == 2
+
+print("PASS: MetadataService caches lookups and summarizes formats")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for the playlist metadata cache.
+Run with: python3 -m tests.test_playlist_cache
+"""
+import os
+import tempfile
+import threading
+import time
+
+from gui.playlist_cache import PlaylistCache
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "playlist_cache.json")
+    cache = PlaylistCache(path, ttl=60)
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "My Mix"
+
+    # 20 items of the same playlist resolving concurrently cost one lookup
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.title("RD1", slow_fetch))) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and results == ["My Mix"] * 20, (calls, results)
+    assert cache.title("RD1", slow_fetch) == "My Mix" and len(calls) == 1
+
+    # Full listings record count/IDs; unchanged listings keep their fingerprint
+    assert cache.update("PL", "Lectures", ["a", "b", "c"])
+    assert not cache.update("PL", "Lectures", ["a", "b", "c"])
+    assert cache.update("PL", None, ["a", "b", "c", "d"]), "new entry must change the fingerprint"
+    rec = PlaylistCache(path).get("PL")
+    assert rec["title"] == "Lectures" and rec["count"] == 4 and rec["entry_ids"][-1] == "d"
+
+    # Expired records are served stale while one background fetch revalidates
+    stale = PlaylistCache(path, ttl=0)
+    done = threading.Event()
+    assert stale.title("PL", lambda: (done.set(), "Lectures 2024")[1]) == "Lectures"
+    assert done.wait(2)
+    for _ in range(100):
+        if stale.get("PL")["title"] != "Lectures":
+            break
+        time.sleep(0.01)
+    assert stale.get("PL")["title"] == "Lectures 2024"
+
+    # Oldest records are evicted past max_entries
+    small = PlaylistCache(os.path.join(tmp, "small.json"), max_entries=2)
+    for pid in ("x", "y", "z"):
+        small.update(pid, pid.upper())
+        time.sleep(0.01)
+    assert small.get("x") is None and small.get("z")["title"] == "Z"
+
+print("PASS: PlaylistCache collapses concurrent lookups, persists and revalidates")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for the post-processing pool and deferred task emission.
+Run with: python3 -m tests.test_postprocess
+"""
+import json
+import threading
+
+from gui.postprocess import PostProcessPool, run_tasks
+from gui.progress_protocol import EventWriter
+from gui.ytdl_worker import build_options, deferred_ops, emit_tasks
+
+# Deferred jobs leave ffmpeg steps out of yt-dlp's own postprocessors
+job = {"url": "u", "format": "Audio Only", "subs": "y", "defer_postprocess": True}
+assert deferred_ops(job) == {"merge": True, "convert_subs": "srt", "extract_audio": "mp3"}
+opts, _ = build_options(job)
+assert "postprocessors" not in opts and opts["writesubtitles"]
+opts, _ = build_options(dict(job, defer_postprocess=False))
+assert [pp["key"] for pp in opts["postprocessors"]] == ["FFmpegSubtitlesConvertor", "FFmpegExtractAudio"]
+
+lines = []
+emit_tasks(EventWriter(lines.append), deferred_ops(job), ["/d/a.webm"], ["/d/a.en.vtt"],
+           merge={"inputs": ["/d/a.f1.mp4", "/d/a.f2.m4a"], "output": "/d/a.mp4"})
+tasks = [json.loads(l.split(":", 1)[1]) for l in lines]
+assert [t["op"] for t in tasks] == ["merge", "extract_audio", "convert_subs"]
+assert tasks[1] == {"op": "extract_audio", "input": "/d/a.webm", "codec": "mp3"}
+
+# Without deferral nothing is emitted
+lines = []
+emit_tasks(EventWriter(lines.append), deferred_ops({"format": "Audio Only"}), ["/d/a.webm"], [])
+assert lines == []
+
+# The pool reports every job exactly once, failures included
+pool = PostProcessPool(workers=2)
+assert PostProcessPool().workers >= 1
+results = []
+done = threading.Event()
+
+def on_done(item, ok, path, err):
+    results.append((item, ok, path, err))
+    if len(results) == 2:
+        done.set()
+
+pool.submit("ok", [], on_done, media_path="/d/x.mp4")
+pool.submit("bad", [{"op": "nope"}], on_done, media_path="/d/y.mp4")
+assert done.wait(5)
+pool.shutdown()
+by_item = {r[0]: r for r in results}
+assert by_item["ok"] == ("ok", True, "/d/x.mp4", None)
+assert by_item["bad"][1] is False and "unknown post-processing op" in by_item["bad"][3]
+assert run_tasks([], "/d/z.mkv") == "/d/z.mkv"
+
+print("PASS: post-processing tasks are deferred, emitted and run on the pool")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for numeric progress (EWMA speed/ETA, parsing, aggregation).
+Run with: python3 -m tests.test_progress_model
+"""
+from gui.progress_model import (TransferStats, aggregate, format_eta, format_speed, parse_eta,
+                                size_to_bytes)
+
+MiB = 1024 * 1024
+
+# Tool strings parse into numbers
+assert size_to_bytes("~1.5MiB") == int(1.5 * MiB) and size_to_bytes("2KB") == 2000 and size_to_bytes("N/A") == 0
+assert parse_eta("01:05") == 65 and parse_eta("1:02:03") == 3723 and parse_eta("1m5s") == 65
+assert parse_eta("27s") == 27 and parse_eta("") is None and parse_eta("N/A") is None
+assert format_eta(3723) == "1:02:03" and format_speed(3 * MiB) == "3.00MiB/s" and format_speed(0) == ""
+
+# Tool hints show until a rate is measured
+st = TransferStats(tau=2.0)
+st.hint(speed=5 * MiB, eta=90)
+st.update(done=0, total=100 * MiB, now=0.0)
+assert st.speed == 5 * MiB and st.eta == 20
+
+# Steady 2 MiB/s; bursts closer than MIN_SAMPLE fold into the next sample
+t = 0.0
+for _ in range(20):
+    t += 0.1
+    st.update(done=int(t * 2 * MiB), now=t)
+assert abs(st.speed - 2 * MiB) < 64, st.speed
+assert st.eta == int((100 * MiB - st.done) / st.speed)
+
+# A slowdown moves the average gradually, not in one jump
+for _ in range(2):
+    t += 0.5
+    st.update(done=st.done + int(0.5 * MiB * 0.5), now=t)
+assert 0.5 * MiB < st.speed < 2 * MiB, st.speed
+
+# Resuming forgets the old timing but keeps the counters
+done = st.done
+assert abs(st.elapsed - t) < 1e-9
+ran = st.elapsed
+st.restart()
+st.update(done=done + MiB, now=t + 600)
+assert st.done == done + MiB and st.speed == 0 and st.eta is None
+
+# Elapsed counts only active time: the 600 s pause is left out
+assert abs(st.elapsed - ran) < 1e-9
+st.update(done=done + 3 * MiB, now=t + 602)
+assert abs(st.elapsed - (ran + 2)) < 1e-9
+st.restart()
+assert abs(st.elapsed - (ran + 2)) < 1e-9
+st.reset()
+assert st.elapsed == 0.0
+
+# Aggregate throughput across transfers
+a, b = TransferStats(), TransferStats()
+for s, rate in ((a, MiB), (b, 3 * MiB)):
+    s.update(done=0, total=40 * MiB, now=0.0)
+    s.update(done=rate, now=1.0)
+agg = aggregate([a, b])
+assert agg["speed"] == 4 * MiB and agg["done"] == 4 * MiB and agg["eta"] == 19
+
+print("PASS: TransferStats averages speed, derives ETA and aggregates throughput")
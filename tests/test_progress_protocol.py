@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for the worker -> GUI progress event protocol.
+Run with: python3 -m tests.test_progress_protocol
+"""
+import os
+import sys
+
+from gui.progress_protocol import ARIA_PERCENT, ARIA_SIZES, ARIA_SPEED, EventWriter, decode, encode, to_markers
+from gui.worker_pool import WorkerPool
+
+MiB = 1024 * 1024
+
+# Round trip; foreign versions and plain log lines are not events
+ev = decode(encode("progress", downloaded=40 * MiB, total=100 * MiB, speed=3 * MiB, eta=20))
+assert ev["ev"] == "progress" and ev["downloaded"] == 40 * MiB
+assert decode('{"v": 99, "ev": "progress"}') is None
+assert decode("[download]  12.3% of 10.00MiB") is None
+assert to_markers(ev) == ["PROGRESS: 40.0%", "META: speed=3.00MiB/s eta=00:20 downloaded=40.00MiB total=100.00MiB"]
+assert to_markers({"ev": "progress", "percent": 12.5}) == ["PROGRESS: 12.5%"]
+assert to_markers({"ev": "done", "rc": 3}) == ["DONE: 3"]
+
+# Text-only writers render markers; with an fd, events bypass the text log
+log = []
+EventWriter(log.append).event("title", title="Clip")
+assert log == ["TITLE: Clip"]
+r, w = os.pipe()
+writer = EventWriter(log.append, w)
+writer.event("file", path="/d/Clip.mp4")
+writer("plain log line")
+os.close(w)
+assert decode(os.read(r, 4096))["path"] == "/d/Clip.mp4" and log[-1] == "plain log line"
+os.close(r)
+
+# Console patterns
+aria = "[#2089b0 12MiB/100MiB(12%) CN:16 DL:3.2MiB ETA:27s]"
+assert ARIA_PERCENT.search(aria).group(1) == "12" and ARIA_SPEED.search(aria).group(1) == "3.2MiB"
+assert ARIA_SIZES.search(aria).groups() == ("12MiB", "100MiB")
+
+# A pool worker reports events on its private pipe; noise on stdout stays in the log
+EVENT_WORKER = r"""
+import json, os, sys
+fd = int(os.environ["FASTTUBE_EVENT_FD"])
+def ev(obj):
+    os.write(fd, (json.dumps(dict(obj, v=1)) + "\n").encode())
+print("READY", flush=True)
+for raw in sys.stdin:
+    job = json.loads(raw)
+    print("[download]  PROGRESS: garbage 99%", flush=True)
+    ev({"ev": "progress", "downloaded": 5, "total": 10})
+    ev({"ev": "title", "title": job["url"]})
+    print("last log line", flush=True)
+    ev({"ev": "done", "rc": 0})
+"""
+pool = WorkerPool(size=1, cmd=[sys.executable, "-c", EVENT_WORKER])
+worker = pool.acquire()
+lines, events = [], []
+assert worker.run({"url": "a"}, lines.append, events.append) == 0
+assert [e["ev"] for e in events] == ["progress", "title"] and events[1]["title"] == "a"
+assert lines == ["[download]  PROGRESS: garbage 99%", "last log line"], lines
+# Without an event handler, events arrive as marker lines
+lines = []
+assert worker.run({"url": "b"}, lines.append) == 0
+assert "PROGRESS: 50.0%" in lines and "TITLE: b" in lines
+pool.release(worker)
+pool.shutdown()
+
+print("PASS: progress events travel on their own pipe and render as legacy markers")
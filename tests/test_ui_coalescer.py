@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for frame-coalesced UI updates.
+Run with: python3 -m tests.test_ui_coalescer
+"""
+import threading
+
+from gui.ui_coalescer import UpdateCoalescer
+
+timers, flushed = [], []
+ui = UpdateCoalescer(flushed.append, lambda ms, cb: timers.append((ms, cb)), hz=20)
+
+# Thousands of events from several threads arm a single timer
+def _spam(name):
+    for pct in range(1000):
+        ui.mark(name, "progress")
+threads = [threading.Thread(target=_spam, args=(f"item{i}",)) for i in range(8)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+ui.mark("item0", "status")
+assert len(timers) == 1 and timers[0][0] == 50 and ui.pending() == 8
+
+# One tick flushes each item once with all of its kinds
+ms, tick = timers[0]
+assert tick() is True
+assert len(flushed) == 1 and len(flushed[0]) == 8
+assert flushed[0]["item0"] == {"progress", "status"}
+
+# An idle tick stops the timer; the next mark arms a new one
+assert tick() is False and len(flushed) == 1
+ui.mark("item3", "title")
+assert len(timers) == 2
+assert timers[1][1]() is True and flushed[-1] == {"item3": {"title"}}
+
+# A failing flush doesn't stop the timer or lose later updates
+ui = UpdateCoalescer(lambda d: 1 / 0, lambda ms, cb: timers.append((ms, cb)))
+ui.mark("x", "progress")
+assert timers[-1][1]() is True and ui.pending() == 0
+
+print("PASS: UI updates are coalesced per item and flushed once per frame")
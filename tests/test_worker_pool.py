@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Lightweight test for the warm download worker pool and job options.
+Run with: python3 -m tests.test_worker_pool
+"""
+import sys
+import time
+
+from gui.progress_protocol import EventWriter
+from gui.worker_pool import WorkerPool
+from gui.ytdl_worker import build_options, cli_args, make_hook, part_filename
+
+# Stand-in for "ytdl_worker.py --serve" that speaks the same line protocol
+ECHO_WORKER = r"""
+import json, sys
+print("READY", flush=True)
+for raw in sys.stdin:
+    job = json.loads(raw)
+    print("TITLE: " + job["url"], flush=True)
+    print("DONE: %d" % job.get("rc", 0), flush=True)
+"""
+
+pool = WorkerPool(size=1, max_jobs=2, cmd=[sys.executable, "-c", ECHO_WORKER])
+w = pool.acquire()
+lines = []
+assert w.run({"url": "a"}, lines.append) == 0 and lines == ["TITLE: a"]
+pid = w.proc.pid
+pool.release(w)
+w = pool.acquire()
+assert w.proc.pid == pid, "idle worker must be reused"
+assert w.run({"url": "b", "rc": 3}, lines.append) == 3
+pool.release(w)  # second job: recycled
+w = pool.acquire()
+assert w.proc.pid != pid, "worn-out worker must be replaced"
+w.proc.terminate()
+w.proc.wait()
+assert w.run({"url": "c"}, lines.append) is None, "dead worker reports no exit code"
+pool.release(w)
+pool.shutdown()
+
+# A worker that never becomes READY disables the pool
+broken = WorkerPool(size=1, cmd=[sys.executable, "-c", "print('ERROR: yt-dlp not installed')"])
+assert broken.acquire() is None and not broken.available
+
+# ... and so does one that hangs before READY; it is killed rather than waited on
+hung = WorkerPool(size=1, cmd=[sys.executable, "-c", "import time; time.sleep(60)"], ready_timeout=0.5)
+start = time.time()
+assert hung.acquire() is None and not hung.available
+assert time.time() - start < 5
+
+# Job options mirror the fast_ytdl.sh presets
+opts, chain = build_options({"url": "u", "format": "Audio Only", "base_dir": "/tmp/x"})
+assert opts["format"] == "bestaudio/best" and chain == ["bestaudio/best", "best"]
+assert opts["paths"] == {"home": "/tmp/x"}
+opts, chain = build_options({"url": "u", "format": "Best (default)", "quality": "720p", "subs": "y"})
+assert chain == ["best[height<=720]", "bestvideo+bestaudio/best", "best"]
+assert opts["writesubtitles"] and opts["postprocessors"][0]["key"] == "FFmpegSubtitlesConvertor"
+args = cli_args({"url": "u", "format": "Best Video + Audio", "base_dir": "/tmp/x"})
+assert args[-1] == "u" and "--merge-output-format" in args
+
+# Merged-format parts use yt-dlp's naming; parallel streams report one combined progress
+info = {"ext": "mp4"}
+assert part_filename("/d/Clip.temp.mp4", info, {"ext": "webm", "format_id": "251"}) == "/d/Clip.temp.f251.webm"
+assert part_filename("/d/Clip.mp4", info, {"ext": "mp4", "format_id": "137"}) == "/d/Clip.f137.mp4"
+out = []
+hook = make_hook(EventWriter(out.append), "/d", hz=0)
+hook.state["parallel"] = True
+MiB = 1024 * 1024
+hook({"status": "downloading", "filename": "v", "downloaded_bytes": 30 * MiB, "total_bytes": 80 * MiB, "speed": 2 * MiB})
+hook({"status": "downloading", "filename": "a", "downloaded_bytes": 10 * MiB, "total_bytes": 20 * MiB, "speed": 1 * MiB})
+assert out[-2:] == ["PROGRESS: 40.0%",
+                    "META: speed=3.00MiB/s eta=00:20 downloaded=40.00MiB total=100.00MiB"], out[-2:]
+
+# Progress is rate-limited and the title sent once; a finished file reports at once
+out = []
+hook = make_hook(EventWriter(out.append), "/d", hz=1)
+for i in range(1, 51):
+    hook({"status": "downloading", "title": "Clip", "filename": "f", "downloaded_bytes": i * MiB, "total_bytes": 50 * MiB})
+assert out.count("TITLE: Clip") == 1 and sum(l.startswith("PROGRESS:") for l in out) == 1, out
+hook({"status": "finished", "filename": "/d/Clip.mp4", "total_bytes": 50 * MiB})
+assert out[-3:-1] == ["PROGRESS: 100.0%", "META: downloaded=50.00MiB total=50.00MiB"] and out[-1] == "FILE: /d/Clip.mp4", out
+
+print("PASS: WorkerPool reuses, recycles and replaces workers; job options match presets")